@@ -0,0 +1,155 @@
+"""
+Machine à états des alertes d'humidité, par lieu surveillé.
+
+Niveaux : 0 normal, 1 alerte (humidité > ALERT_THRESHOLD), 2 critique
+(> ALERT_CRITICAL_THRESHOLD). Hystérésis : un lieu ne redescend d'un niveau que
+lorsque l'humidité passe sous le seuil de ce niveau moins ALERT_HYSTERESIS, pour
+ne pas osciller autour du seuil d'une heure à l'autre.
+
+Un SMS n'est envoyé qu'à la montée de niveau, et pas si ce niveau (ou un niveau
+supérieur) a déjà été annoncé il y a moins de ALERT_COOLDOWN_HOURS. Tant que le
+niveau ne change pas, rien n'est envoyé ni écrit : les états sont gardés en mémoire
+et la table alert_states n'est mise à jour que lors d'une transition.
+"""
+import os
+import threading
+from datetime import timedelta
+
+from sqlalchemy import select
+
+from app.core import metrics
+from app.models.alert_state import AlertState
+
+LEVEL_NAMES = {0: "normal", 1: "alerte", 2: "critique"}
+STATE_COLUMNS = ["departement", "level", "humidity", "since", "notified_at", "notified_level"]
+
+TRANSITIONS = metrics.counter("alert_transitions", "Changements de niveau d'alerte (up / down)", ("direction",))
+SUPPRESSED = metrics.counter("alerts_suppressed", "Montées de niveau sans SMS (cooldown)")
+
+
+def _upsert_states(db):
+    """INSERT ... ON CONFLICT (departement) DO UPDATE selon le dialecte (PostgreSQL / SQLite)"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    statement = dialect_insert(AlertState)
+    return statement.on_conflict_do_update(
+        index_elements=["departement"],
+        set_={column: statement.excluded[column] for column in STATE_COLUMNS[1:]},
+    )
+
+
+class AlertTracker:
+    """États d'alerte de tous les lieux, chargés une fois depuis alert_states puis tenus en mémoire"""
+
+    def __init__(self, thresholds: tuple = (80, 90), hysteresis: float = 5,
+                 cooldown: timedelta = timedelta(hours=6)):
+        # thresholds[i] : seuil d'entrée dans le niveau i + 1
+        self.thresholds = tuple(thresholds)
+        self.hysteresis = hysteresis
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self._states = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            thresholds=(float(os.getenv("ALERT_THRESHOLD", "80")),
+                        float(os.getenv("ALERT_CRITICAL_THRESHOLD", "90"))),
+            hysteresis=float(os.getenv("ALERT_HYSTERESIS", "5")),
+            cooldown=timedelta(hours=float(os.getenv("ALERT_COOLDOWN_HOURS", "6"))),
+        )
+
+    def level_for(self, current: int, humidity: float) -> int:
+        """Nouveau niveau : montée au-dessus du seuil, descente sous (seuil - hystérésis)"""
+        level = current
+        while level < len(self.thresholds) and humidity > self.thresholds[level]:
+            level += 1
+        while level > 0 and humidity < self.thresholds[level - 1] - self.hysteresis:
+            level -= 1
+        return level
+
+    def states(self, db) -> dict:
+        if self._states is None:
+            rows = db.execute(select(*[getattr(AlertState, c) for c in STATE_COLUMNS])).all()
+            self._states = {row.departement: dict(row._mapping) for row in rows}
+        return self._states
+
+    def evaluate(self, db, readings, now) -> list:
+        """Transitions provoquées par les humidités prédites ((departement, humidité) par lieu).
+
+        Chaque transition est le nouvel état du lieu, avec `previous` (ancien niveau)
+        et `notify` (SMS à envoyer). Les lieux dont le niveau ne change pas n'apparaissent pas.
+        """
+        states = self.states(db)
+        transitions = []
+        for departement, humidity in readings:
+            state = states.get(departement)
+            previous = state["level"] if state else 0
+            level = self.level_for(previous, humidity)
+            if level == previous:
+                continue
+            notified_at = state["notified_at"] if state else None
+            notified_level = state["notified_level"] if state else 0
+            notify = False
+            if level > previous:
+                TRANSITIONS.inc(direction="up")
+                recently = notified_at is not None and now - notified_at < self.cooldown
+                if recently and notified_level >= level:
+                    SUPPRESSED.inc()
+                else:
+                    notify = True
+                    notified_at, notified_level = now, level
+            else:
+                TRANSITIONS.inc(direction="down")
+            transitions.append({
+                "departement": departement,
+                "level": level,
+                "humidity": float(humidity),
+                "since": now,
+                "notified_at": notified_at,
+                "notified_level": notified_level,
+                "previous": previous,
+                "notify": notify,
+            })
+        return transitions
+
+    def save(self, db, transitions: list):
+        """Écrit les nouveaux états (sans commit : à valider avec les notifications)"""
+        if not transitions:
+            return
+        rows = [{column: t[column] for column in STATE_COLUMNS} for t in transitions]
+        statement = _upsert_states(db)
+        if statement is not None:
+            db.execute(statement, rows)
+        else:
+            for row in rows:
+                db.merge(AlertState(**row))
+
+    def remember(self, transitions: list):
+        """Applique les transitions au cache, une fois le commit effectué"""
+        if self._states is None:
+            return
+        for t in transitions:
+            self._states[t["departement"]] = {column: t[column] for column in STATE_COLUMNS}
+
+    def invalidate(self):
+        """Oublie le cache : relu depuis la base au prochain cycle (erreur, changement de leader, bail repris à un autre processus)"""
+        self._states = None
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_alert_tracker() -> AlertTracker:
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = AlertTracker.from_env()
+    return _tracker
@@ -0,0 +1,170 @@
+"""
+Exécutions du cycle de surveillance (check_humidity_periodically), hors du chemin des requêtes.
+
+POST /humidity/check-dakar-now et le job horaire passent tous deux par le même
+CheckRunner : si un cycle est déjà en file ou en cours, la demande le rejoint
+(même job_id) au lieu d'en lancer un second, ce qui évite les appels OpenWeather
+et les SMS en double. Le cycle lui-même (OpenWeather, base, Twilio) tourne dans le
+threadpool ; la boucle d'événements ne fait qu'attendre sa fin.
+
+Entre processus (uvicorn --workers N, plusieurs conteneurs), les cycles sont
+sérialisés par un bail en base (scheduler_leases, nom "humidity_check") : un
+cycle demandé pendant celui d'un autre processus attend sa fin. Les états d'alerte
+gardés en mémoire ne sont relus depuis la base que si le bail a été repris à un
+autre processus, c'est-à-dire si ce dernier a pu les modifier depuis notre cycle.
+
+Les dernières exécutions (CHECK_HISTORY_SIZE) sont gardées en mémoire avec leur
+statut, la durée de chaque étape et les compteurs du cycle. Elles sont propres au
+processus : avec plusieurs workers, le statut d'un job n'est visible que sur celui
+qui l'a reçu.
+"""
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import anyio
+
+from app.core import metrics
+from app.core.alerts import get_alert_tracker
+from app.core.leader import LeaderElector
+from app.core.scheduler import check_humidity_periodically
+
+RUNS = metrics.counter("check_runs", "Cycles de surveillance exécutés", ("trigger", "status"))
+COALESCED = metrics.counter("check_runs_coalesced", "Demandes de cycle rattachées à un cycle déjà en cours", ("trigger",))
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+
+
+class CheckRunner:
+    """File à une place des cycles de surveillance, liée à la boucle d'événements qui l'utilise"""
+
+    def __init__(self, check, history_size: int = 100, lease: LeaderElector = None,
+                 lock_poll_interval: float = 1.0):
+        # check(report) -> "alert" | "ok" | "skipped" | "error", appelée dans le threadpool
+        self.check = check
+        self.history_size = history_size
+        # Bail partagé entre processus (None : sérialisation dans ce processus seulement)
+        self.lease = lease
+        self.lock_poll_interval = lock_poll_interval
+        self._runs = OrderedDict()
+        self._current = None
+        self._task = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, check):
+        # Le bail doit durer plus longtemps qu'un cycle : il n'est pas renouvelé pendant le cycle
+        lease = LeaderElector(name="humidity_check", ttl=float(os.getenv("CHECK_LOCK_TTL", "600")))
+        return cls(check, history_size=int(os.getenv("CHECK_HISTORY_SIZE", "100")), lease=lease)
+
+    def submit(self, trigger: str) -> tuple:
+        """(exécution, coalesced) : le cycle en file ou en cours s'il y en a un, sinon un nouveau"""
+        loop = asyncio.get_running_loop()
+        task = self._task
+        # Tâche d'une autre boucle (redémarrage de l'application) : elle ne terminera jamais ici
+        if task is not None and not task.done() and task.get_loop() is loop:
+            self._current["requests"] += 1
+            COALESCED.inc(trigger=trigger)
+            return self._current, True
+
+        run = {
+            "job_id": uuid.uuid4().hex,
+            "trigger": trigger,
+            "status": "queued",
+            "result": None,
+            "requests": 1,
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "duration_ms": None,
+            "stages": {},
+            "details": {},
+            "error": None,
+        }
+        with self._lock:
+            self._runs[run["job_id"]] = run
+            while len(self._runs) > self.history_size:
+                self._runs.popitem(last=False)
+        self._current = run
+        self._task = loop.create_task(self._execute(run), name=f"check-{run['job_id']}")
+        return run, False
+
+    async def run(self, trigger: str) -> dict:
+        """Lance (ou rejoint) un cycle et attend sa fin"""
+        run, _ = self.submit(trigger)
+        # shield : l'annulation de l'appelant n'interrompt pas un cycle partagé
+        await asyncio.shield(self._task)
+        return run
+
+    async def _execute(self, run: dict):
+        report = {"stages": run["stages"]}
+        start = time.perf_counter()
+        try:
+            result = await anyio.to_thread.run_sync(self._run_locked, run, report)
+        except Exception as e:
+            result = "error"
+            report["error"] = str(e)
+            print(f"❌ Cycle {run['job_id']} interrompu: {e}")
+        run["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        run["finished_at"] = _now()
+        run["error"] = report.pop("error", None)
+        report.pop("stages")
+        run["details"] = report
+        run["result"] = result
+        run["status"] = "failed" if result == "error" else "succeeded"
+        RUNS.inc(trigger=run["trigger"], status=run["status"])
+        print(f"🕒 Cycle {run['job_id']} ({run['trigger']}): {result} en {run['duration_ms']:.0f} ms")
+
+    def _run_locked(self, run: dict, report: dict) -> str:
+        """Attend le bail inter-processus (étape "lock"), exécute le cycle puis libère le bail"""
+        if self.lease is None:
+            return self._run_check(run, report)
+        start = time.perf_counter()
+        while not self.lease.try_acquire():
+            time.sleep(self.lock_poll_interval)
+        report["stages"]["lock"] = round((time.perf_counter() - start) * 1000, 1)
+        if self.lease.taken_over:
+            # Un autre processus a tenu le bail : ses transitions ne sont pas dans notre cache
+            get_alert_tracker().invalidate()
+        try:
+            return self._run_check(run, report)
+        finally:
+            try:
+                self.lease.release()
+            except Exception as e:
+                print(f"❌ Libération du bail de surveillance impossible: {e}")
+
+    def _run_check(self, run: dict, report: dict) -> str:
+        run["status"] = "running"
+        run["started_at"] = _now()
+        return self.check(report)
+
+    def get(self, job_id: str):
+        with self._lock:
+            run = self._runs.get(job_id)
+        return dict(run) if run is not None else None
+
+    def recent(self, limit: int = 20) -> list:
+        """Dernières exécutions, plus récentes d'abord"""
+        with self._lock:
+            runs = list(self._runs.values())
+        return [dict(run) for run in reversed(runs[-limit:])]
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_check_runner() -> CheckRunner:
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = CheckRunner.from_env(check_humidity_periodically)
+    return _runner
@@ -0,0 +1,132 @@
+"""
+Historique des prédictions du scheduler et agrégats par heure / par jour.
+
+Chaque cycle ajoute ses prédictions (météo d'entrée et version du modèle comprises)
+à humidity_predictions en un seul INSERT, puis met à jour, dans la même transaction,
+les agrégats de humidity_rollups (nombre, somme, min, max par département et par
+heure / jour UTC) : GET /humidity/history lit quelques lignes d'agrégats au lieu de
+parcourir les prédictions brutes.
+"""
+from collections import defaultdict
+
+from sqlalchemy import func, insert, select
+
+from app.models.predictions import HumidityPrediction, HumidityRollup
+
+GRANULARITIES = ("hour", "day")
+ROLLUP_KEY = ["departement", "granularity", "bucket"]
+
+
+def truncate(moment, granularity: str):
+    """Début de l'heure ou du jour contenant `moment`"""
+    if granularity == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _upsert_rollups(db):
+    """INSERT ... ON CONFLICT DO UPDATE qui cumule les agrégats (PostgreSQL / SQLite)"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        least, greatest = func.least, func.greatest
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        # min() / max() à plusieurs arguments sont les fonctions scalaires de SQLite
+        least, greatest = func.min, func.max
+    else:
+        return None
+    statement = dialect_insert(HumidityRollup)
+    excluded = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=ROLLUP_KEY,
+        set_={
+            "samples": HumidityRollup.samples + excluded.samples,
+            "humidity_sum": HumidityRollup.humidity_sum + excluded.humidity_sum,
+            "humidity_min": least(HumidityRollup.humidity_min, excluded.humidity_min),
+            "humidity_max": greatest(HumidityRollup.humidity_max, excluded.humidity_max),
+        },
+    )
+
+
+def _rollups(rows: list) -> list:
+    """Agrégats d'un lot de prédictions, une ligne par (département, granularité, période)"""
+    groups = defaultdict(list)
+    for row in rows:
+        for granularity in GRANULARITIES:
+            groups[(row["departement"], granularity, truncate(row["predicted_at"], granularity))].append(row["humidity"])
+    return [
+        {
+            "departement": departement,
+            "granularity": granularity,
+            "bucket": bucket,
+            "samples": len(values),
+            "humidity_sum": sum(values),
+            "humidity_min": min(values),
+            "humidity_max": max(values),
+        }
+        for (departement, granularity, bucket), values in groups.items()
+    ]
+
+
+def _merge_rollups(db, rollups: list):
+    """Repli sans ON CONFLICT : lecture puis mise à jour de chaque agrégat"""
+    for rollup in rollups:
+        existing = db.get(HumidityRollup, tuple(rollup[key] for key in ROLLUP_KEY))
+        if existing is None:
+            db.add(HumidityRollup(**rollup))
+            continue
+        existing.samples += rollup["samples"]
+        existing.humidity_sum += rollup["humidity_sum"]
+        existing.humidity_min = min(existing.humidity_min, rollup["humidity_min"])
+        existing.humidity_max = max(existing.humidity_max, rollup["humidity_max"])
+
+
+def record_predictions(db, weather_rows: list, humidities: list, model_version: str, predicted_at) -> int:
+    """Ajoute les prédictions d'un cycle (horodatage UTC naïf) et met à jour les agrégats, en un commit"""
+    rows = [
+        {
+            "departement": weather["departement"],
+            "predicted_at": predicted_at,
+            "humidity": float(humidity),
+            "weather": weather["weather"],
+            "temperature": weather["temperature"],
+            "wind_speed": weather["wind_speed"],
+            "model_version": model_version,
+        }
+        for weather, humidity in zip(weather_rows, humidities)
+    ]
+    if not rows:
+        return 0
+    db.execute(insert(HumidityPrediction), rows)
+    rollups = _rollups(rows)
+    statement = _upsert_rollups(db)
+    if statement is not None:
+        db.execute(statement, rollups)
+    else:
+        _merge_rollups(db, rollups)
+    db.commit()
+    return len(rows)
+
+
+def query_history(db, departement: str, granularity: str, start, end) -> list:
+    """Agrégats d'un département sur [start, end[, dans l'ordre chronologique"""
+    statement = (
+        select(HumidityRollup.bucket, HumidityRollup.samples, HumidityRollup.humidity_sum,
+               HumidityRollup.humidity_min, HumidityRollup.humidity_max)
+        .where(HumidityRollup.departement == departement)
+        .where(HumidityRollup.granularity == granularity)
+        .where(HumidityRollup.bucket >= truncate(start, granularity))
+        .where(HumidityRollup.bucket < end)
+        .order_by(HumidityRollup.bucket)
+    )
+    return [
+        {
+            "bucket": row.bucket.isoformat(),
+            "count": row.samples,
+            "min": round(row.humidity_min, 1),
+            "max": round(row.humidity_max, 1),
+            "mean": round(row.humidity_sum / row.samples, 1),
+        }
+        for row in db.execute(statement)
+    ]
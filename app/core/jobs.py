@@ -0,0 +1,86 @@
+"""
+Jobs planifiés, exécutés uniquement par le processus leader (app/core/leader.py).
+
+Les jobs sont stockés dans la table apscheduler_jobs (SQLAlchemyJobStore) : un
+nouveau leader reprend le planning là où l'ancien l'a laissé, et un passage
+manqué pendant la bascule est rattrapé une seule fois (coalesce).
+
+Le scheduler tourne dans la boucle d'événements de l'application (AsyncIOScheduler) :
+la surveillance horaire est une coroutine qui passe par le CheckRunner
+(app/core/checks.py), comme POST /humidity/check-dakar-now, pour ne jamais
+chevaucher un cycle déclenché à la main. Les jobs synchrones (rétention,
+réentraînement) tournent dans l'executor par défaut de la boucle.
+"""
+import os
+
+from app.core.checks import get_check_runner
+from app.core.leader import is_leader
+from app.core.retention import run_retention
+from app.db.database import engine
+
+
+async def humidity_check_job():
+    """Surveillance horaire : ignorée si ce processus a perdu le leadership entre-temps"""
+    if not is_leader():
+        print("⏭️ Surveillance ignorée: ce processus n'est pas leader")
+        return
+    # Rejoint le cycle déclenché à la main s'il y en a un en cours
+    await get_check_runner().run("scheduled")
+
+
+def retrain_job():
+    if not is_leader():
+        print("⏭️ Réentraînement ignoré: ce processus n'est pas leader")
+        return
+    # Import à la demande : xgboost / sklearn ne sont chargés que lorsque le job tourne
+    from app.ml.retrain import run_retrain
+    run_retrain()
+
+
+def retention_job():
+    if not is_leader():
+        print("⏭️ Rétention ignorée: ce processus n'est pas leader")
+        return
+    run_retention()
+
+
+# (id, fonction, intervalle en heures)
+JOBS = [
+    ("humidity_check", humidity_check_job, 1),
+    ("notifications_retention", retention_job, 24),
+    ("model_retrain", retrain_job, int(os.getenv("RETRAIN_INTERVAL_HOURS", "24"))),
+]
+
+
+def start_scheduler(loop):
+    """Démarre le scheduler sur la boucle `loop` ; appelable depuis un autre thread (élection du leader)"""
+    # Import à la demande : APScheduler n'est pas nécessaire pour servir /health
+    from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+    from apscheduler.triggers.interval import IntervalTrigger
+
+    # event_loop explicite : les réveils du scheduler sont transmis à la boucle
+    # (call_soon_threadsafe), la lecture des jobs persistés se fait ici
+    scheduler = AsyncIOScheduler(
+        event_loop=loop,
+        jobstores={"default": SQLAlchemyJobStore(engine=engine, tablename="apscheduler_jobs")},
+        job_defaults={
+            "coalesce": True,
+            "max_instances": 1,
+            "misfire_grace_time": int(os.getenv("SCHEDULER_MISFIRE_GRACE", "900")),
+        },
+    )
+    # Démarrage en pause pour lire les jobs persistés avant de les exécuter
+    scheduler.start(paused=True)
+    for job_id, func, hours in JOBS:
+        trigger = IntervalTrigger(hours=hours)
+        job = scheduler.get_job(job_id)
+        if job is None:
+            scheduler.add_job(func, trigger, id=job_id, replace_existing=True)
+        elif str(job.trigger) != str(trigger):
+            # Intervalle modifié dans le code : on replanifie, sinon on garde la prochaine échéance
+            scheduler.reschedule_job(job_id, trigger=trigger)
+    scheduler.resume()
+
+    print("🕐 Scheduler démarré: check toutes les heures pour tous les départements")
+    return scheduler
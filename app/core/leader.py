@@ -0,0 +1,188 @@
+"""
+Élection d'un leader par bail en base (table scheduler_leases).
+
+Avec `uvicorn --workers N` ou plusieurs conteneurs, chaque processus démarre un
+LeaderElector ; un seul détient le bail et exécute les jobs planifiés. Le bail
+est renouvelé toutes les `renew_interval` secondes et expire après `ttl` secondes :
+si le leader meurt, un autre processus le reprend au plus tard après `ttl`
+(immédiatement si le leader s'arrête proprement et libère le bail).
+Les horloges des machines doivent être synchronisées (NTP).
+"""
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.db.database import SessionLocal
+from app.models.scheduler_lease import SchedulerLease
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class LeaderElector:
+    """Acquiert et renouvelle un bail nommé ; appelle on_elected / on_demoted aux changements"""
+
+    def __init__(self, name: str = "scheduler", holder: str = None, ttl: float = 30.0,
+                 renew_interval: float = None, on_elected=None, on_demoted=None,
+                 session_factory=SessionLocal):
+        self.name = name
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}"
+        self.ttl = ttl
+        self.renew_interval = renew_interval or ttl / 3
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.session_factory = session_factory
+        self._leader = False
+        # Fin de validité locale du bail (horloge monotone), prudente : mesurée avant la requête
+        self._valid_until = 0.0
+        # Vrai si la dernière acquisition a repris le bail d'un autre détenteur (ou l'a créé)
+        self.taken_over = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        ttl = float(os.getenv("SCHEDULER_LEASE_TTL", "30"))
+        return cls(
+            holder=os.getenv("SCHEDULER_INSTANCE_ID") or None,
+            ttl=ttl,
+            renew_interval=float(os.getenv("SCHEDULER_LEASE_RENEW", ttl / 3)),
+            **kwargs,
+        )
+
+    def is_leader(self) -> bool:
+        """Vrai si ce processus détient un bail encore valide"""
+        return self._leader and time.monotonic() < self._valid_until
+
+    def try_acquire(self) -> bool:
+        """Prend ou renouvelle le bail s'il est libre, expiré ou déjà à nous"""
+        started = time.monotonic()
+        now = _utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        db = self.session_factory()
+        try:
+            previous = db.execute(
+                select(SchedulerLease.holder).where(SchedulerLease.name == self.name)
+            ).scalar()
+            # UPDATE conditionnel atomique : une seule ligne, un seul gagnant
+            acquired = db.execute(
+                update(SchedulerLease)
+                .where(
+                    SchedulerLease.name == self.name,
+                    or_(SchedulerLease.holder == self.holder, SchedulerLease.expires_at < now),
+                )
+                .values(holder=self.holder, expires_at=expires_at,
+                        acquired_at=now if not self._leader else SchedulerLease.acquired_at)
+                .execution_options(synchronize_session=False)
+            ).rowcount == 1
+            if not acquired and db.get(SchedulerLease, self.name) is None:
+                try:
+                    db.execute(insert(SchedulerLease).values(
+                        name=self.name, holder=self.holder, expires_at=expires_at, acquired_at=now))
+                    acquired = True
+                except IntegrityError:
+                    # Un autre processus a créé le bail en même temps
+                    db.rollback()
+                    return False
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        if acquired:
+            self._valid_until = started + self.ttl
+            self.taken_over = previous != self.holder
+        return acquired
+
+    def release(self):
+        """Libère le bail (arrêt propre) pour qu'un autre processus le reprenne sans attendre le TTL"""
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == self.name, SchedulerLease.holder == self.holder)
+                .values(expires_at=_utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def step(self):
+        """Un tour d'élection : met à jour l'état et déclenche les callbacks"""
+        try:
+            leader = self.try_acquire()
+        except Exception as e:
+            print(f"❌ Élection du leader impossible: {e}")
+            # Sans accès à la base, on reste leader tant que le bail local est valide
+            leader = self.is_leader()
+        if leader and not self._leader:
+            self._leader = True
+            print(f"👑 Leader du scheduler: {self.holder}")
+            self._notify(self.on_elected)
+        elif not leader and self._leader:
+            self._leader = False
+            print(f"🔻 Leadership du scheduler perdu: {self.holder}")
+            self._notify(self.on_demoted)
+
+    def _notify(self, callback):
+        if callback is None:
+            return
+        try:
+            callback()
+        except Exception as e:
+            print(f"❌ Erreur au changement de leader: {e}")
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"leader-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.renew_interval + 5)
+            self._thread = None
+        if self._leader:
+            self._leader = False
+            self._notify(self.on_demoted)
+            try:
+                self.release()
+            except Exception as e:
+                print(f"❌ Libération du bail impossible: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.step()
+            self._stop.wait(self.renew_interval)
+
+
+_elector = None
+
+
+def start_leader_election(on_elected=None, on_demoted=None) -> LeaderElector:
+    """Démarre l'élection du leader du scheduler pour ce processus (idempotent)"""
+    global _elector
+    if _elector is None:
+        _elector = LeaderElector.from_env(on_elected=on_elected, on_demoted=on_demoted)
+        _elector.start()
+    return _elector
+
+
+def stop_leader_election():
+    global _elector
+    if _elector is not None:
+        _elector.stop()
+        _elector = None
+
+
+def is_leader() -> bool:
+    """Vrai si ce processus est le leader du scheduler"""
+    return _elector is not None and _elector.is_leader()
@@ -0,0 +1,88 @@
+import json
+import os
+
+# Table département -> région + coordonnées (chef-lieu) utilisée pour interroger OpenWeather.
+# Les noms suivent exactement encoders['departement_dict'] / encoders['region_dict'].
+# Surcharge possible via MONITORED_LOCATIONS_FILE (fichier JSON, même format que cette liste).
+DEFAULT_LOCATIONS = [
+    # Dakar
+    {"region": "Dakar", "departement": "Dakar", "lat": 14.693, "lon": -17.447},
+    {"region": "Dakar", "departement": "Guédiawaye", "lat": 14.776, "lon": -17.395},
+    {"region": "Dakar", "departement": "Pikine", "lat": 14.755, "lon": -17.390},
+    {"region": "Dakar", "departement": "Rufisque", "lat": 14.716, "lon": -17.273},
+    # Diourbel
+    {"region": "Diourbel", "departement": "Bambey", "lat": 14.698, "lon": -16.451},
+    {"region": "Diourbel", "departement": "Diourbel", "lat": 14.655, "lon": -16.232},
+    {"region": "Diourbel", "departement": "Mbacké", "lat": 14.791, "lon": -15.908},
+    # Fatick
+    {"region": "Fatick", "departement": "Fatick", "lat": 14.339, "lon": -16.411},
+    {"region": "Fatick", "departement": "Foundiougne", "lat": 14.133, "lon": -16.467},
+    {"region": "Fatick", "departement": "Gossas", "lat": 14.493, "lon": -16.066},
+    # Kaffrine
+    {"region": "Kaffrine", "departement": "Birkilane", "lat": 14.130, "lon": -15.742},
+    {"region": "Kaffrine", "departement": "Kaffrine", "lat": 14.106, "lon": -15.550},
+    {"region": "Kaffrine", "departement": "Koungheul", "lat": 13.981, "lon": -14.805},
+    {"region": "Kaffrine", "departement": "MalèmeHodar", "lat": 14.088, "lon": -15.296},
+    # Kaolack
+    {"region": "Kaolack", "departement": "Guinguinéo", "lat": 14.268, "lon": -15.950},
+    {"region": "Kaolack", "departement": "Kaolack", "lat": 14.152, "lon": -16.073},
+    {"region": "Kaolack", "departement": "NioroduRip", "lat": 13.745, "lon": -15.797},
+    # Kédougou
+    {"region": "Kédougou", "departement": "Kédougou", "lat": 12.557, "lon": -12.174},
+    {"region": "Kédougou", "departement": "Salémata", "lat": 12.631, "lon": -12.817},
+    {"region": "Kédougou", "departement": "Saraya", "lat": 12.836, "lon": -11.752},
+    # Kolda
+    {"region": "Kolda", "departement": "Kolda", "lat": 12.894, "lon": -14.941},
+    {"region": "Kolda", "departement": "MédinaYoroFoula", "lat": 13.293, "lon": -14.717},
+    {"region": "Kolda", "departement": "Vélingara", "lat": 13.150, "lon": -14.110},
+    # Louga
+    {"region": "Louga", "departement": "Kébémer", "lat": 15.370, "lon": -16.446},
+    {"region": "Louga", "departement": "Linguère", "lat": 15.394, "lon": -15.119},
+    {"region": "Louga", "departement": "Louga", "lat": 15.619, "lon": -16.224},
+    # Matam
+    {"region": "Matam", "departement": "Kanel", "lat": 15.491, "lon": -13.176},
+    {"region": "Matam", "departement": "Matam", "lat": 15.656, "lon": -13.256},
+    {"region": "Matam", "departement": "RanérouFerlo", "lat": 15.300, "lon": -13.967},
+    # Saint-Louis
+    {"region": "Saint-Louis", "departement": "Dagana", "lat": 16.518, "lon": -15.506},
+    {"region": "Saint-Louis", "departement": "Podor", "lat": 16.652, "lon": -14.959},
+    {"region": "Saint-Louis", "departement": "Saint-Louis", "lat": 16.026, "lon": -16.489},
+    # Sédhiou
+    {"region": "Sédhiou", "departement": "Bounkiling", "lat": 13.042, "lon": -15.701},
+    {"region": "Sédhiou", "departement": "Goudomp", "lat": 12.578, "lon": -15.876},
+    {"region": "Sédhiou", "departement": "Sédhiou", "lat": 12.708, "lon": -15.557},
+    # Tambacounda
+    {"region": "Tambacounda", "departement": "Bakel", "lat": 14.905, "lon": -12.456},
+    {"region": "Tambacounda", "departement": "Goudiry", "lat": 14.183, "lon": -12.717},
+    {"region": "Tambacounda", "departement": "Koupentoum", "lat": 13.983, "lon": -14.550},
+    {"region": "Tambacounda", "departement": "Tambacounda", "lat": 13.771, "lon": -13.668},
+    # Thiès
+    {"region": "Thiès", "departement": "Mbour", "lat": 14.420, "lon": -16.964},
+    {"region": "Thiès", "departement": "Thiès", "lat": 14.791, "lon": -16.926},
+    {"region": "Thiès", "departement": "Tivaouane", "lat": 14.951, "lon": -16.818},
+    # Ziguinchor
+    {"region": "Ziguinchor", "departement": "Bignona", "lat": 12.810, "lon": -16.226},
+    {"region": "Ziguinchor", "departement": "Oussouye", "lat": 12.485, "lon": -16.547},
+    {"region": "Ziguinchor", "departement": "Ziguinchor", "lat": 12.568, "lon": -16.273},
+]
+
+
+def get_monitored_locations() -> list:
+    """Liste des lieux surveillés : MONITORED_LOCATIONS_FILE si défini, sinon DEFAULT_LOCATIONS.
+
+    Chaque lieu contient region, departement et soit lat/lon, soit city (ex: "Dakar,SN").
+    """
+    path = os.getenv("MONITORED_LOCATIONS_FILE")
+    if not path:
+        return DEFAULT_LOCATIONS
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def find_location(departement: str) -> dict:
+    """Retourne le lieu surveillé correspondant au département, sans tenir compte de la casse (None si inconnu)"""
+    departement = departement.strip().casefold()
+    for location in get_monitored_locations():
+        if location["departement"].casefold() == departement:
+            return location
+    return None
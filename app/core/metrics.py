@@ -0,0 +1,205 @@
+"""
+Métriques du service au format texte Prometheus (GET /metrics).
+
+Compteurs et histogrammes en mémoire, propres au processus : chaque module déclare
+les siens au chargement (counter(), histogram()) et les met à jour sur son chemin
+critique. Les valeurs déjà suivies ailleurs (pool DB, caches) sont lues au moment
+du scrape par des collecteurs (register_collector()).
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# Secondes : de 100 µs (prédiction unitaire) à 1 min (cycle du scheduler, Twilio lent)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_metrics = {}
+_collectors = []
+_registry_lock = threading.Lock()
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Compteur croissant, éventuellement décliné par labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        # Sans label, la série existe dès la déclaration (0 plutôt qu'absente)
+        self._values = {} if self.labelnames else {(): 0}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name + "_total", dict(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    """Histogramme cumulatif (buckets, _sum, _count) de durées en secondes"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [compteurs par bucket (non cumulés), somme, nombre]
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Mesure la durée du bloc, y compris s'il lève une exception"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                yield self.name + "_bucket", dict(labels, le=_format_value(float(bound))), cumulative
+            yield self.name + "_bucket", dict(labels, le="+Inf"), count
+            yield self.name + "_sum", labels, total
+            yield self.name + "_count", labels, count
+
+
+def _register(metric):
+    with _registry_lock:
+        existing = _metrics.get(metric.name)
+        if existing is not None:
+            # Module rechargé : on garde la série déjà exposée
+            return existing
+        _metrics[metric.name] = metric
+        return metric
+
+
+def counter(name: str, help: str, labelnames: tuple = ()) -> Counter:
+    return _register(Counter(name, help, labelnames))
+
+
+def histogram(name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, labelnames, buckets))
+
+
+def register_collector(collect):
+    """Ajoute une fonction appelée à chaque scrape, qui produit des
+    (nom, type, aide, valeur, labels) — pour des jauges lues à la source"""
+    with _registry_lock:
+        _collectors.append(collect)
+
+
+def render() -> str:
+    """Toutes les métriques au format d'exposition texte Prometheus 0.0.4"""
+    lines = []
+    with _registry_lock:
+        metrics = list(_metrics.values())
+        collectors = list(_collectors)
+
+    for metric in metrics:
+        # En format 0.0.4, HELP / TYPE d'un compteur portent le nom exposé (suffixe _total)
+        exposed = metric.name + "_total" if metric.kind == "counter" else metric.name
+        lines.append(f"# HELP {exposed} {metric.help}")
+        lines.append(f"# TYPE {exposed} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    described = set()
+    for collect in collectors:
+        try:
+            samples = list(collect())
+        except Exception as e:
+            print(f"❌ Collecteur de métriques en erreur: {e}")
+            continue
+        for name, kind, help, value, labels in samples:
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI : durée et statut de chaque requête HTTP, par route (gabarit, pas l'URL)
+    et, si un profiler est fourni, échantillonnage des requêtes lentes"""
+
+    def __init__(self, app, profiler=None):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        session = self.profiler.maybe_start() if self.profiler is not None else None
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.observe(duration, method=scope["method"], route=path, status=status)
+            if session is not None:
+                self.profiler.finish(session, duration, f"{scope['method']} {path}")
+
+
+HTTP_REQUEST_SECONDS = histogram(
+    "http_request_duration_seconds", "Durée des requêtes HTTP", ("method", "route", "status"),
+)
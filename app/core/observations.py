@@ -0,0 +1,45 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+
+from app.models.observations import WeatherObservation
+
+
+def _insert_ignoring_duplicates(db):
+    """INSERT ... ON CONFLICT DO NOTHING selon le dialecte (PostgreSQL / SQLite)"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(WeatherObservation)
+    return dialect_insert(WeatherObservation).on_conflict_do_nothing(
+        index_elements=["departement", "observed_at"]
+    )
+
+
+def record_observations(db, weather_rows: list) -> int:
+    """Enregistre en un seul INSERT les relevés contenant l'humidité observée.
+
+    Un même relevé (même lieu, même horodatage OpenWeather) n'est stocké qu'une fois,
+    même s'il est servi plusieurs fois depuis le cache météo.
+    """
+    rows = [
+        {
+            "region": weather["region"],
+            "departement": weather["departement"],
+            "weather": weather["weather"],
+            "temperature": weather["temperature"],
+            "wind_speed": weather["wind_speed"],
+            "humidity": weather["observed_humidity"],
+            "observed_at": datetime.fromtimestamp(weather["observed_at"], timezone.utc).replace(tzinfo=None),
+        }
+        for weather in weather_rows
+        if weather.get("observed_humidity") is not None and weather.get("observed_at")
+    ]
+    if not rows:
+        return 0
+    db.execute(_insert_ignoring_duplicates(db), rows)
+    db.commit()
+    return len(rows)
@@ -0,0 +1,249 @@
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_, select, update
+
+from app.core import metrics
+from app.core.sms import PermanentSmsError, TokenBucket, get_sms_sender
+from app.db.database import SessionLocal
+from app.models.notifications import Notification
+
+SMS_RESULTS = metrics.counter("sms_notifications", "Notifications SMS traitées par l'outbox (sent / failed)", ("status",))
+SMS_ATTEMPTS = metrics.counter("sms_send_attempts", "Tentatives d'envoi de SMS, retries compris")
+SMS_RECLAIMED = metrics.counter(
+    "sms_notifications_reclaimed", "Notifications restées \"sending\" au-delà du bail (requeued / abandoned)", ("result",),
+)
+
+
+def enqueue_sms(db, messages: list) -> list:
+    """Insère des notifications SMS "pending" (liste de (message, destinataire)) en un seul commit.
+
+    L'envoi réel est fait par les workers de l'outbox ; on les réveille après l'insertion.
+    """
+    notifications = [
+        Notification(message=message, recipient=to, notification_type="sms", status="pending")
+        for message, to in messages
+    ]
+    db.add_all(notifications)
+    db.commit()
+    wake_outbox_workers()
+    return notifications
+
+
+def claim_pending(db, limit: int) -> list:
+    """Réserve jusqu'à `limit` notifications pending (pending -> sending) et les retourne.
+
+    Sur PostgreSQL, SELECT ... FOR UPDATE SKIP LOCKED évite que deux workers (ou deux
+    processus) se disputent les mêmes lignes ; l'UPDATE conditionnel + RETURNING garantit
+    qu'une ligne n'est réservée qu'une fois, y compris sur SQLite. La réservation est
+    datée (claimed_at) et comptée (attempts) pour reclaim_stale.
+    """
+    ids = db.execute(
+        select(Notification.id)
+        .where(Notification.status == "pending", Notification.notification_type == "sms")
+        .order_by(Notification.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not ids:
+        db.commit()
+        return []
+    claimed = db.execute(
+        update(Notification)
+        .where(Notification.id.in_(ids), Notification.status == "pending")
+        .values(status="sending", claimed_at=datetime.now(timezone.utc), attempts=Notification.attempts + 1)
+        .returning(Notification.id, Notification.message, Notification.recipient)
+    ).all()
+    db.commit()
+    return claimed
+
+
+def reclaim_stale(db, lease: float, max_attempts: int) -> tuple:
+    """Notifications "sending" réservées il y a plus de `lease` secondes (worker arrêté ou planté).
+
+    Remises en pending pour être renvoyées, ou passées en failed si elles ont déjà été
+    réservées `max_attempts` fois. Retourne (remises en file, abandonnées).
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=lease)
+    # claimed_at NULL : réservée avant l'ajout de la colonne
+    stale = (Notification.status == "sending") & or_(Notification.claimed_at < cutoff, Notification.claimed_at.is_(None))
+    abandoned = db.execute(
+        update(Notification)
+        .where(stale, Notification.attempts >= max_attempts)
+        .values(status="failed", error_message=f"Envoi interrompu {max_attempts} fois, abandonné")
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    requeued = db.execute(
+        update(Notification)
+        .where(stale)
+        .values(status="pending", claimed_at=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if requeued or abandoned:
+        SMS_RECLAIMED.inc(requeued, result="requeued")
+        SMS_RECLAIMED.inc(abandoned, result="abandoned")
+        print(f"♻️ Outbox: {requeued} notification(s) remise(s) en file, {abandoned} abandonnée(s) (bail expiré)")
+    return requeued, abandoned
+
+
+class OutboxWorkerPool:
+    """Pool de threads qui envoient les SMS en attente de la table notifications.
+
+    Chaque worker réserve un lot, envoie chaque message (limité par un token bucket
+    commun, avec retries et backoff ; pas de retry sur un refus définitif de Twilio),
+    puis met à jour status/twilio_sid/sent_at du lot entier en un seul commit.
+
+    Un lot réservé mais jamais terminé (arrêt, plantage) reste "sending" : les workers
+    le remettent en pending une fois `claim_lease` secondes écoulées (reclaim_stale),
+    au plus `max_attempts` fois. Le bail doit dépasser la durée d'envoi d'un lot.
+    """
+
+    def __init__(self, workers: int = 2, batch_size: int = 20, poll_interval: float = 2.0,
+                 rate_per_second: float = 1.0, burst: int = 5,
+                 max_retries: int = 3, backoff_base: float = 1.0, backoff_max: float = 30.0,
+                 claim_lease: float = 900.0, max_attempts: int = 3,
+                 sender=None, session_factory=SessionLocal):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.claim_lease = claim_lease
+        self.max_attempts = max_attempts
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.sender = sender
+        self.session_factory = session_factory
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._reclaim_lock = threading.Lock()
+        self._next_reclaim = 0.0
+        self.sent = 0
+        self.failed = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            workers=int(os.getenv("SMS_WORKERS", "2")),
+            batch_size=int(os.getenv("SMS_BATCH_SIZE", "20")),
+            poll_interval=float(os.getenv("SMS_POLL_INTERVAL", "2")),
+            rate_per_second=float(os.getenv("SMS_RATE_PER_SECOND", "1")),
+            burst=int(os.getenv("SMS_BURST", "5")),
+            max_retries=int(os.getenv("SMS_MAX_RETRIES", "3")),
+            claim_lease=float(os.getenv("SMS_CLAIM_LEASE", "900")),
+            max_attempts=int(os.getenv("SMS_MAX_ATTEMPTS", "3")),
+        )
+
+    def start(self):
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"sms-outbox-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self):
+        self._wake.set()
+
+    def reclaim(self):
+        """reclaim_stale au plus une fois par min(claim_lease / 2, 60) s pour tout le pool"""
+        with self._reclaim_lock:
+            now = time.monotonic()
+            if now < self._next_reclaim:
+                return
+            self._next_reclaim = now + min(self.claim_lease / 2, 60)
+        db = self.session_factory()
+        try:
+            reclaim_stale(db, self.claim_lease, self.max_attempts)
+        finally:
+            db.close()
+
+    def process_batch(self) -> int:
+        """Réserve et envoie un lot ; retourne le nombre de notifications traitées"""
+        db = self.session_factory()
+        try:
+            claimed = claim_pending(db, self.batch_size)
+            if not claimed:
+                return 0
+            results = [self._send(notification_id, message, recipient)
+                       for notification_id, message, recipient in claimed]
+            # ORM bulk UPDATE par clé primaire : une seule requête executemany + un commit
+            db.execute(update(Notification), results)
+            db.commit()
+            return len(results)
+        finally:
+            db.close()
+
+    def _send(self, notification_id: int, message: str, recipient: str) -> dict:
+        sender = self.sender or get_sms_sender()
+        error = None
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            SMS_ATTEMPTS.inc()
+            try:
+                sid = sender.send(recipient, message)
+                self.sent += 1
+                SMS_RESULTS.inc(status="sent")
+                print(f"📱 SMS envoyé ! SID: {sid} (notification {notification_id})")
+                return {"id": notification_id, "status": "sent", "twilio_sid": sid,
+                        "sent_at": datetime.now(), "error_message": None}
+            except PermanentSmsError as e:
+                error = e
+                break
+            except Exception as e:
+                error = e
+                if attempt < self.max_retries and not self._stop.is_set():
+                    time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+        self.failed += 1
+        SMS_RESULTS.inc(status="failed")
+        print(f"❌ Erreur lors de l'envoi SMS (notification {notification_id}): {error}")
+        return {"id": notification_id, "status": "failed", "twilio_sid": None,
+                "sent_at": None, "error_message": str(error)}
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.reclaim()
+                processed = self.process_batch()
+            except Exception as e:
+                print(f"❌ Erreur dans le worker SMS: {e}")
+                processed = 0
+            if processed == 0:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+
+_pool = None
+
+
+def start_outbox_workers() -> OutboxWorkerPool:
+    """Démarre le pool de workers SMS du processus (idempotent)"""
+    global _pool
+    if _pool is None:
+        _pool = OutboxWorkerPool.from_env()
+        _pool.start()
+        print(f"📨 Outbox SMS démarrée: {_pool.workers} worker(s)")
+    return _pool
+
+
+def stop_outbox_workers():
+    global _pool
+    if _pool is not None:
+        _pool.stop()
+        _pool = None
+
+
+def wake_outbox_workers():
+    if _pool is not None:
+        _pool.wake()
@@ -0,0 +1,123 @@
+"""
+Profiler par échantillonnage des requêtes lentes (désactivé par défaut).
+
+Une fraction des requêtes (PROFILE_SAMPLE_RATE) est suivie par un thread qui relève
+la pile de tous les threads toutes les PROFILE_INTERVAL_MS ; les handlers synchrones
+tournant dans le threadpool d'anyio, cProfile (limité au thread appelant) ne les
+verrait pas. Si la requête dépasse PROFILE_SLOW_MS, les piles sont écrites au format
+"collapsed" (une pile par ligne + nombre d'échantillons, lisible par speedscope ou
+flamegraph.pl) dans PROFILE_DIR.
+
+La fin de l'échantillonnage et l'écriture du profil sont faites par le thread
+d'échantillonnage lui-même : le middleware (boucle d'événements) ne fait que lui
+signaler la fin de la requête, sans attendre ni écrire sur disque.
+"""
+import os
+import random
+import re
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+
+class _Session:
+    """Échantillonnage en cours : un thread qui relève les piles jusqu'à stop(), puis appelle on_stop(session)"""
+
+    def __init__(self, interval: float, on_stop):
+        self.interval = interval
+        self.on_stop = on_stop
+        self.stacks = Counter()
+        # Renseignés par stop() : durée et libellé de la requête échantillonnée
+        self.duration = None
+        self.label = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self._sample()
+        finally:
+            self.on_stop(self)
+
+    def _sample(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self, duration: float, label: str):
+        """Signale la fin de la requête, sans attendre le thread"""
+        self.duration = duration
+        self.label = label
+        self._stop.set()
+
+    def join(self, timeout: float = None):
+        self._thread.join(timeout)
+
+
+class SlowRequestProfiler:
+    """Décide quelles requêtes échantillonner et conserve le profil de celles qui sont lentes"""
+
+    def __init__(self, sample_rate: float, slow_threshold: float = 0.5, interval: float = 0.005,
+                 output_dir: Path = Path(".cache/profiles")):
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.interval = interval
+        self.output_dir = Path(output_dir)
+        # Les piles de tous les threads sont relevées : un seul profil à la fois
+        self._busy = threading.Lock()
+        self.profiled = 0
+        self.saved = 0
+
+    @classmethod
+    def from_env(cls):
+        """None si PROFILE_SAMPLE_RATE vaut 0 (défaut)"""
+        sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        if sample_rate <= 0:
+            return None
+        return cls(
+            sample_rate=sample_rate,
+            slow_threshold=float(os.getenv("PROFILE_SLOW_MS", "500")) / 1000,
+            interval=float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000,
+            output_dir=Path(os.getenv("PROFILE_DIR", ".cache/profiles")),
+        )
+
+    def maybe_start(self):
+        """Démarre l'échantillonnage pour cette requête (tirage aléatoire), sinon None"""
+        if random.random() >= self.sample_rate or not self._busy.acquire(blocking=False):
+            return None
+        self.profiled += 1
+        return _Session(self.interval, self._save)
+
+    def finish(self, session: _Session, duration: float, label: str):
+        """Appelée depuis la boucle d'événements : ne bloque pas (voir _save)"""
+        session.stop(duration, label)
+
+    def _save(self, session: _Session):
+        """Exécutée par le thread d'échantillonnage une fois arrêté : écrit le profil si la requête était lente"""
+        try:
+            if session.duration is None or session.duration < self.slow_threshold or not session.stacks:
+                return
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            slug = re.sub(r"[^A-Za-z0-9]+", "-", session.label).strip("-")
+            path = self.output_dir / f"{datetime.now():%Y%m%d-%H%M%S-%f}-{slug}-{session.duration * 1000:.0f}ms.collapsed"
+            path.write_text("".join(f"{stack} {count}\n" for stack, count in session.stacks.most_common()))
+            self.saved += 1
+            print(f"🐢 Requête lente profilée: {session.label} en {session.duration * 1000:.0f} ms -> {path}")
+        except Exception as e:
+            print(f"❌ Écriture du profil impossible: {e}")
+        finally:
+            # Libéré seulement ici : le profil suivant ne démarre qu'une fois celui-ci écrit
+            self._busy.release()
@@ -0,0 +1,128 @@
+import gzip
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import delete, func, insert, select
+
+from app.db.database import SessionLocal
+from app.models.notifications import Notification, NotificationArchive
+
+# Colonnes communes aux tables notifications et notifications_archive
+NOTIFICATION_COLUMNS = [
+    "id", "message", "recipient", "notification_type", "status",
+    "twilio_sid", "error_message", "created_at", "sent_at",
+]
+
+# Seules les notifications terminées sont archivées (jamais pending / sending)
+FINAL_STATUSES = ("sent", "failed")
+
+
+def _utc(value: datetime) -> datetime:
+    """Date aware en UTC (une date naïve est supposée déjà en UTC).
+
+    created_at est un TIMESTAMP WITH TIME ZONE : comparé à une date naïve, PostgreSQL
+    l'interpréterait dans le TimeZone de la session ; une date aware est sans ambiguïté.
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _next_month(value: datetime) -> datetime:
+    return value.replace(year=value.year + value.month // 12, month=value.month % 12 + 1)
+
+
+def archive_notifications(db, cutoff: datetime, chunk_size: int = 10000) -> int:
+    """Déplace les notifications terminées créées avant `cutoff` vers notifications_archive.
+
+    Traitement ensembliste par tranches d'id (INSERT ... SELECT puis DELETE par plage),
+    un commit par tranche pour garder des transactions courtes.
+    """
+    cutoff = _utc(cutoff)
+    condition = (Notification.created_at < cutoff) & Notification.status.in_(FINAL_STATUSES)
+    moved = 0
+    while True:
+        ids = db.execute(
+            select(Notification.id).where(condition).order_by(Notification.id).limit(chunk_size)
+        ).scalars().all()
+        if not ids:
+            return moved
+        in_chunk = condition & Notification.id.between(ids[0], ids[-1])
+        db.execute(
+            insert(NotificationArchive).from_select(
+                NOTIFICATION_COLUMNS,
+                select(*[getattr(Notification, c) for c in NOTIFICATION_COLUMNS]).where(in_chunk),
+            )
+        )
+        db.execute(delete(Notification).where(in_chunk))
+        db.commit()
+        moved += len(ids)
+
+
+def export_archive(db, cutoff: datetime, directory: Path) -> list:
+    """Exporte mois par mois les archives antérieures à `cutoff` en .ndjson.gz, puis les supprime.
+
+    Seuls les mois entièrement antérieurs à `cutoff` sont exportés ; chaque mois
+    est supprimé en une seule requête par plage de dates après écriture du fichier.
+    """
+    cutoff = _utc(cutoff)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    files = []
+    while True:
+        oldest = db.execute(select(func.min(NotificationArchive.created_at))).scalar()
+        if oldest is None:
+            return files
+        month_start = _utc(oldest).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        month_end = _next_month(month_start)
+        if month_end > cutoff:
+            return files
+
+        in_month = (NotificationArchive.created_at >= month_start) & (NotificationArchive.created_at < month_end)
+        path = directory / f"notifications-{month_start:%Y-%m}.ndjson.gz"
+        if path.exists():
+            path = directory / f"notifications-{month_start:%Y-%m}-{datetime.now():%Y%m%d%H%M%S}.ndjson.gz"
+
+        rows = db.execute(
+            select(*[getattr(NotificationArchive, c) for c in NOTIFICATION_COLUMNS])
+            .where(in_month)
+            .order_by(NotificationArchive.created_at, NotificationArchive.id)
+            .execution_options(yield_per=5000)
+        )
+        count = 0
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            for row in rows:
+                record = dict(row._mapping)
+                for key in ("created_at", "sent_at"):
+                    record[key] = record[key].isoformat() if record[key] else None
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+
+        db.execute(delete(NotificationArchive).where(in_month))
+        db.commit()
+        files.append({"file": str(path), "rows": count})
+        print(f"🗄️ Archives {month_start:%Y-%m} exportées: {path} ({count} lignes)")
+
+
+def run_retention():
+    """Job planifié : table chaude -> archive (NOTIFICATIONS_HOT_DAYS), archive -> fichiers (NOTIFICATIONS_ARCHIVE_DAYS)"""
+    hot_days = int(os.getenv("NOTIFICATIONS_HOT_DAYS", "90"))
+    archive_days = int(os.getenv("NOTIFICATIONS_ARCHIVE_DAYS", "365"))
+    directory = os.getenv("NOTIFICATIONS_ARCHIVE_DIR", "archives")
+    chunk_size = int(os.getenv("RETENTION_CHUNK_SIZE", "10000"))
+    now = datetime.now(timezone.utc)
+
+    db = SessionLocal()
+    try:
+        moved = archive_notifications(db, now - timedelta(days=hot_days), chunk_size)
+        files = export_archive(db, now - timedelta(days=archive_days), directory) if archive_days > 0 else []
+        print(f"🧹 Rétention: {moved} notification(s) archivée(s), {len(files)} fichier(s) exporté(s)")
+        return {"archived": moved, "exported": files}
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erreur dans le job de rétention: {e}")
+        raise
+    finally:
+        db.close()
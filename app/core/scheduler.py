@@ -1,86 +1,194 @@
-from twilio.rest import Client
-from app.ml.predictor import fetch_weather_dakar, predict_humidity
-from app.models.notifications import Notification
+from app.core import metrics
+from app.core.alerts import get_alert_tracker
+from app.core.outbox import enqueue_sms
+from app.core.observations import record_observations
+from app.core.history import record_predictions
+from app.ml.predictor import fetch_weather, predict_humidity_batch, registry
+from app.core.locations import get_monitored_locations
 from app.db.database import SessionLocal
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dotenv import load_dotenv
-from datetime import datetime
 import os
+import time
+from datetime import datetime, timezone
 load_dotenv()
 
-def check_humidity_periodically():
+CYCLE_SECONDS = metrics.histogram(
+    "scheduler_cycle_seconds", "Durée d'un cycle de surveillance (fetch, predict, alertes)", ("result",),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+STAGE_SECONDS = metrics.histogram(
+    "scheduler_stage_seconds", "Durée de chaque étape d'un cycle de surveillance", ("stage",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+ALERTS = metrics.counter("humidity_alerts", "Alertes d'humidité mises en file d'attente")
+WEATHER_FAILURES = metrics.counter("weather_fetch_failures", "Lieux sans météo lors d'un cycle du scheduler")
+
+
+def fetch_all_weather(api_key: str, locations: list) -> list:
+    """Récupère la météo de tous les lieux en parallèle (pool borné par WEATHER_FETCH_WORKERS).
+
+    Le cycle score la météo du moment : le cache n'est utilisé que pour une entrée plus
+    jeune que SCHEDULER_WEATHER_MAX_AGE (défaut 0, toujours OpenWeather), ou si OpenWeather
+    est en panne.
+    """
+    max_workers = max(1, min(len(locations), int(os.getenv("WEATHER_FETCH_WORKERS", "64"))))
+    max_age = float(os.getenv("SCHEDULER_WEATHER_MAX_AGE", "0"))
+
+    def fetch(location):
+        try:
+            return fetch_weather(api_key, location, max_age=max_age)
+        except Exception as e:
+            WEATHER_FAILURES.inc()
+            print(f"❌ Météo indisponible pour {location['departement']}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(fetch, locations))
+    return [weather for weather in results if weather is not None]
+
+
+def alert_message(weather_data: dict, humidity: float, level: int) -> str:
+    label = "ALERTE HUMIDITÉ CRITIQUE" if level >= 2 else "ALERTE HUMIDITÉ"
+    return f"🚨 {label} {weather_data['departement'].upper()}: {humidity:.1f}% ! Risque moisissures. Temp: {weather_data['temperature']}°C, Vent: {weather_data['wind_speed']} m/s"
+
+
+def send_alerts(db, alerts: list, alert_phone: str):
+    """Met en file d'attente un SMS par lieu dont le niveau d'alerte monte (liste de (météo, humidité, niveau)).
+
+    Les notifications sont validées dans le même commit que les états d'alerte déjà écrits dans `db`.
+    """
+    messages = [(alert_message(weather_data, humidity, level), alert_phone) for weather_data, humidity, level in alerts]
+    notifications = enqueue_sms(db, messages)
+    ALERTS.inc(len(notifications))
+    print(f"📝 {len(notifications)} notification(s) enregistrée(s) dans l'outbox (IDs: {[n.id for n in notifications]})")
+
+
+def save_observations(weather_rows: list):
+    """Conserve les relevés (humidité observée comprise) pour le réentraînement, sans bloquer les alertes"""
+    db = SessionLocal()
+    try:
+        saved = record_observations(db, weather_rows)
+        print(f"🗃️ {saved} relevé(s) météo transmis (doublons ignorés)")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Enregistrement des relevés impossible: {e}")
+    finally:
+        db.close()
+
+
+def save_predictions(weather_rows: list, humidities: list, model_version: str, predicted_at):
+    """Ajoute les prédictions du cycle à l'historique (et à ses agrégats), sans bloquer les alertes"""
+    db = SessionLocal()
+    try:
+        saved = record_predictions(db, weather_rows, humidities, model_version, predicted_at)
+        print(f"📈 {saved} prédiction(s) ajoutée(s) à l'historique ({model_version})")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Enregistrement de l'historique impossible: {e}")
+    finally:
+        db.close()
+
+
+@contextmanager
+def _stage(report: dict, name: str):
+    """Mesure une étape du cycle (histogramme + report["stages"][name] en ms)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_SECONDS.observe(duration, stage=name)
+        report["stages"][name] = round(duration * 1000, 1)
+
+
+def check_humidity_periodically(report: dict = None) -> str:
+    """Fonction appelée périodiquement : fetch (tous les départements) → predict (un lot) → alert SMS si besoin.
+
+    Retourne le résultat du cycle ; `report` (optionnel) reçoit la durée de chaque étape
+    (`stages`, en ms) et les compteurs du cycle.
+    """
+    report = report if report is not None else {}
+    report.setdefault("stages", {})
+    start = time.perf_counter()
+    result = _check_humidity(report)
+    CYCLE_SECONDS.observe(time.perf_counter() - start, result=result)
+    return result
+
+
+def _check_humidity(report: dict) -> str:
+    """Un cycle de surveillance ; retourne son résultat ("alert", "ok", "skipped" ou "error")"""
     db = None
     try:
         api_key = os.getenv("OPENWEATHER_API_KEY")
         alert_phone = os.getenv("ALERT_PHONE")
-        
+
         if not api_key or not alert_phone:
             print("❌ Clés API manquantes – skip")
-            return
-        
-        weather_data = fetch_weather_dakar(api_key)
-        print(f"Données OpenWeather: {weather_data}")
-        
-        humidity = predict_humidity(weather_data)
-        print(f"Humidité prédite: {humidity:.1f}%")
-
-        db = SessionLocal()
-        
-        if humidity > 80:
-            alert_msg = f"🚨 ALERTE HUMIDITÉ DAKAR: {humidity:.1f}% ! Risque moisissures. Temp: {weather_data['temperature']}°C, Vent: {weather_data['wind_speed']} m/s"
-            
-            notification = Notification(
-                message=alert_msg,
-                recipient=alert_phone,
-                notification_type="sms",
-                status="pending"
-            )
-            db.add(notification)
-            db.commit()
-            db.refresh(notification)
-            
-            print(f"📝 Notification enregistrée dans la DB (ID: {notification.id})")
-            
+            return "skipped"
+
+        locations = get_monitored_locations()
+        with _stage(report, "weather"):
+            weather_rows = fetch_all_weather(api_key, locations)
+        print(f"Données OpenWeather: {len(weather_rows)}/{len(locations)} lieux")
+        report["locations"] = len(locations)
+        report["weather_rows"] = len(weather_rows)
+        if not weather_rows:
+            return "error"
+        with _stage(report, "observations"):
+            save_observations(weather_rows)
+
+        with _stage(report, "predict"):
+            model_version = registry.active().name
+            humidities = predict_humidity_batch(weather_rows)
+        print(f"Humidité prédite: max {max(humidities):.1f}%")
+        report["model_version"] = model_version
+        report["max_humidity"] = round(max(humidities), 1)
+        with _stage(report, "history"):
+            save_predictions(weather_rows, humidities, model_version, datetime.now(timezone.utc).replace(tzinfo=None))
+
+        # Seules les transitions de niveau donnent lieu à une écriture (et à un SMS si le niveau monte)
+        tracker = get_alert_tracker()
+        with _stage(report, "alerts"), tracker.lock:
+            db = SessionLocal()
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            readings = [(weather_data['departement'], humidity) for weather_data, humidity in zip(weather_rows, humidities)]
             try:
-                # Envoi SMS
-                account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-                auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-                from_number = os.getenv("TWILIO_FROM_NUMBER")
-                
-                if not account_sid or not auth_token or not from_number:
-                    raise Exception("Twilio credentials manquantes")
-                
-                client = Client(account_sid, auth_token)
-                twilio_message = client.messages.create(
-                    body=alert_msg,
-                    from_=from_number,
-                    to=alert_phone
-                )
-                
-                # Mettre à jour la notification : statut = sent, twilio_sid, sent_at
-                notification.status = "sent"
-                notification.twilio_sid = twilio_message.sid
-                notification.sent_at = datetime.now()
-                db.commit()
-                
-                print(f"📱 SMS envoyé ! SID: {twilio_message.sid}")
-            except Exception as sms_error:
-                # En cas d'erreur lors de l'envoi, mettre à jour le statut à "failed"
-                notification.status = "failed"
-                notification.error_message = str(sms_error)
-                db.commit()
-                print(f"❌ Erreur lors de l'envoi SMS: {sms_error}")
-        else:
+                transitions = tracker.evaluate(db, readings, now)
+                tracker.save(db, transitions)
+                by_departement = {weather_data['departement']: weather_data for weather_data in weather_rows}
+                alerts = [(by_departement[t['departement']], t['humidity'], t['level']) for t in transitions if t['notify']]
+                if alerts:
+                    send_alerts(db, alerts, alert_phone)
+                elif transitions:
+                    db.commit()
+            except Exception:
+                # États relus depuis la base au prochain cycle
+                tracker.invalidate()
+                raise
+            tracker.remember(transitions)
+            in_alert = sum(1 for state in tracker.states(db).values() if state['level'] > 0)
+
+        print(f"🔔 {len(transitions)} changement(s) de niveau, {len(alerts)} SMS, {in_alert} lieu(x) en alerte")
+        report.update(transitions=len(transitions), sms=len(alerts), in_alert=in_alert)
+        if alerts:
+            return "alert"
+        if not in_alert:
             print("✅ Pas d'alerte – humidité OK")
-    
+        return "ok"
+
     except Exception as e:
         print(f"❌ Erreur dans le scheduler: {e}")
+        report["error"] = str(e)
         # Si une notification était créée mais qu'une erreur survient, la marquer comme failed
         if db:
             try:
                 db.rollback()
             except:
                 pass
+        return "error"
     finally:
         # Fermer la session de base de données
         if db:
-            db.close()
\ No newline at end of file
+            db.close()
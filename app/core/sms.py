@@ -0,0 +1,139 @@
+import importlib.util
+import os
+import threading
+import time
+
+import requests
+
+from app.core import metrics
+
+SEND_SECONDS = metrics.histogram("twilio_send_seconds", "Durée d'un envoi de SMS via Twilio", ("result",))
+
+
+class PermanentSmsError(Exception):
+    """Refus définitif de Twilio (4xx hors 429 : numéro invalide, destinataire bloqué...) : inutile de retenter"""
+
+
+def _is_permanent(status) -> bool:
+    return isinstance(status, int) and 400 <= status < 500 and status != 429
+
+
+class TokenBucket:
+    """Limiteur de débit partagé : `rate` jetons par seconde, rafale max `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloque jusqu'à obtenir un jeton"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SmsSender:
+    """Envoi de SMS via un client Twilio unique, réutilisé par tous les appels.
+
+    Si `api_url` est défini (TWILIO_API_URL), les messages sont postés directement
+    sur l'API REST Twilio à cette adresse, ce qui permet de tester contre un
+    faux serveur Twilio local.
+    """
+
+    def __init__(self, account_sid: str, auth_token: str, from_number: str, api_url: str = None):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self.api_url = api_url.rstrip("/") if api_url else None
+        self._client = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            account_sid=os.getenv("TWILIO_ACCOUNT_SID", ""),
+            auth_token=os.getenv("TWILIO_AUTH_TOKEN", ""),
+            from_number=os.getenv("TWILIO_FROM_NUMBER", ""),
+            api_url=os.getenv("TWILIO_API_URL"),
+        )
+
+    def check_configured(self):
+        """Lève une exception si l'envoi est impossible (credentials ou package manquants)"""
+        if not self.account_sid or not self.auth_token or not self.from_number:
+            raise Exception("Twilio credentials manquantes")
+        if self.api_url is None and importlib.util.find_spec("twilio") is None:
+            raise Exception("twilio package is not installed; please pip install twilio")
+
+    def send(self, to: str, body: str) -> str:
+        """Envoie un SMS et retourne son SID Twilio"""
+        self.check_configured()
+        start = time.perf_counter()
+        try:
+            sid = self._send(to, body)
+        except Exception:
+            SEND_SECONDS.observe(time.perf_counter() - start, result="error")
+            raise
+        SEND_SECONDS.observe(time.perf_counter() - start, result="ok")
+        return sid
+
+    def _send(self, to: str, body: str) -> str:
+        if self.api_url:
+            response = self._get_session().post(
+                f"{self.api_url}/2010-04-01/Accounts/{self.account_sid}/Messages.json",
+                data={"To": to, "From": self.from_number, "Body": body},
+                auth=(self.account_sid, self.auth_token),
+                timeout=(3.05, 15),
+            )
+            if _is_permanent(response.status_code):
+                raise PermanentSmsError(f"Erreur API Twilio: {response.status_code} {response.text}")
+            if response.status_code >= 400:
+                raise Exception(f"Erreur API Twilio: {response.status_code} {response.text}")
+            return response.json()["sid"]
+        try:
+            return self._get_client().messages.create(body=body, from_=self.from_number, to=to).sid
+        except Exception as e:
+            # TwilioRestException porte le code HTTP dans `status`
+            if _is_permanent(getattr(e, "status", None)):
+                raise PermanentSmsError(f"Erreur API Twilio: {e.status} {e}") from e
+            raise
+
+    def _get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    # Import à la demande : le SDK Twilio est lourd et inutile tant qu'aucun SMS n'est envoyé
+                    from twilio.rest import Client
+                    self._client = Client(self.account_sid, self.auth_token)
+        return self._client
+
+    def _get_session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = requests.Session()
+        return self._session
+
+
+_sender = None
+_sender_lock = threading.Lock()
+
+
+def get_sms_sender() -> SmsSender:
+    """Sender SMS partagé par le worker d'outbox (créé au premier appel)"""
+    global _sender
+    if _sender is None:
+        with _sender_lock:
+            if _sender is None:
+                _sender = SmsSender.from_env()
+    return _sender
@@ -1,11 +1,65 @@
 import os
+import time
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from app.core import metrics
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+
+def _engine_options(url: str) -> dict:
+    """Options du pool de connexions, configurables via DB_POOL_* (ignorées pour SQLite)"""
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+    }
+
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+COMMIT_SECONDS = metrics.histogram("db_commit_seconds", "Durée d'un commit de session (flush compris)")
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _commit_started(session):
+    session.info["commit_started"] = time.perf_counter()
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _commit_finished(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        COMMIT_SECONDS.observe(time.perf_counter() - started)
+
+
+def get_pool_stats() -> dict:
+    """Statistiques d'utilisation du pool de connexions"""
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    if "size" in stats and "overflow" in stats:
+        stats["max_overflow"] = getattr(pool, "_max_overflow", None)
+    return stats
+
+
+def _collect_pool_metrics():
+    stats = get_pool_stats()
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if name in stats:
+            yield f"db_pool_{name}", "gauge", f"Pool de connexions : {name}", stats[name], {}
+    if stats.get("max_overflow") is not None:
+        yield "db_pool_max_overflow", "gauge", "Pool de connexions : max_overflow", stats["max_overflow"], {}
+
+
+metrics.register_collector(_collect_pool_metrics)
@@ -0,0 +1,6 @@
+-- Bail de réservation des notifications par les workers de l'outbox SMS
+-- (une ligne "sending" abandonnée est remise en pending, ou failed après SMS_MAX_ATTEMPTS réservations)
+-- Utilisation: psql -U votre_user -d votre_db -f add_notifications_claim_columns.sql
+
+ALTER TABLE notifications ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE notifications ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,19 @@
+-- Index composites pour la pagination keyset de GET /notifications
+-- (ORDER BY created_at DESC, id DESC, avec ou sans filtre status / recipient)
+-- Utilisation: psql -U votre_user -d votre_db -f add_notifications_keyset_indexes.sql
+-- CONCURRENTLY : pas de verrou d'écriture sur la table pendant la construction (PostgreSQL)
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_notifications_created_at_id ON notifications(created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_notifications_status_created_at ON notifications(status, created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_notifications_recipient_created_at ON notifications(recipient, created_at, id);
+
+-- Les index mono-colonne sont des préfixes des index composites : on les supprime
+-- pour alléger les insertions (noms du script SQL et de Base.metadata.create_all)
+DROP INDEX CONCURRENTLY IF EXISTS idx_notifications_status;
+DROP INDEX CONCURRENTLY IF EXISTS idx_notifications_recipient;
+DROP INDEX CONCURRENTLY IF EXISTS idx_notifications_created_at;
+DROP INDEX CONCURRENTLY IF EXISTS ix_notifications_status;
+DROP INDEX CONCURRENTLY IF EXISTS ix_notifications_recipient;
+
+-- Statistiques à jour pour l'estimation rapide du total (count=approx)
+ANALYZE notifications;
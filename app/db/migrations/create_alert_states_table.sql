@@ -0,0 +1,11 @@
+-- État d'alerte par lieu surveillé (hystérésis + cooldown, app/core/alerts.py)
+-- Utilisation: psql -U votre_user -d votre_db -f create_alert_states_table.sql
+
+CREATE TABLE IF NOT EXISTS alert_states (
+    departement VARCHAR(50) PRIMARY KEY,
+    level INTEGER NOT NULL DEFAULT 0,
+    humidity REAL,
+    since TIMESTAMP NOT NULL,
+    notified_at TIMESTAMP,
+    notified_level INTEGER NOT NULL DEFAULT 0
+);
@@ -0,0 +1,27 @@
+-- Historique des prédictions du scheduler et agrégats horaires / journaliers (app/core/history.py)
+-- Utilisation: psql -U votre_user -d votre_db -f create_humidity_history_tables.sql
+
+CREATE TABLE IF NOT EXISTS humidity_predictions (
+    id SERIAL PRIMARY KEY,
+    departement VARCHAR(50) NOT NULL,
+    predicted_at TIMESTAMP NOT NULL,
+    humidity REAL NOT NULL,
+    weather VARCHAR(30) NOT NULL,
+    temperature REAL NOT NULL,
+    wind_speed REAL NOT NULL,
+    model_version VARCHAR(50) NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_humidity_predictions_departement_predicted_at
+    ON humidity_predictions(departement, predicted_at);
+
+CREATE TABLE IF NOT EXISTS humidity_rollups (
+    departement VARCHAR(50) NOT NULL,
+    granularity VARCHAR(4) NOT NULL,
+    bucket TIMESTAMP NOT NULL,
+    samples INTEGER NOT NULL,
+    humidity_sum DOUBLE PRECISION NOT NULL,
+    humidity_min REAL NOT NULL,
+    humidity_max REAL NOT NULL,
+    PRIMARY KEY (departement, granularity, bucket)
+);
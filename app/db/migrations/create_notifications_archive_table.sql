@@ -0,0 +1,18 @@
+-- Table d'archive des notifications (remplie par le job de rétention app/core/retention.py)
+-- Utilisation: psql -U votre_user -d votre_db -f create_notifications_archive_table.sql
+
+CREATE TABLE IF NOT EXISTS notifications_archive (
+    id INTEGER PRIMARY KEY,
+    message TEXT,
+    recipient VARCHAR(50),
+    notification_type VARCHAR(20),
+    status VARCHAR(20),
+    twilio_sid VARCHAR(100),
+    error_message TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    sent_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS idx_notifications_archive_created_at_id ON notifications_archive(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_notifications_archive_recipient_created_at ON notifications_archive(recipient, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_notifications_archive_status_created_at ON notifications_archive(status, created_at, id);
@@ -10,14 +10,16 @@ CREATE TABLE IF NOT EXISTS notifications (
     twilio_sid VARCHAR(100),
     error_message TEXT,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
-    sent_at TIMESTAMP WITH TIME ZONE
+    sent_at TIMESTAMP WITH TIME ZONE,
+    claimed_at TIMESTAMP WITH TIME ZONE,
+    attempts INTEGER NOT NULL DEFAULT 0
 );
 
 -- Créer les index pour améliorer les performances
-CREATE INDEX IF NOT EXISTS idx_notifications_recipient ON notifications(recipient);
-CREATE INDEX IF NOT EXISTS idx_notifications_status ON notifications(status);
+CREATE INDEX IF NOT EXISTS idx_notifications_created_at_id ON notifications(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_notifications_status_created_at ON notifications(status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_notifications_recipient_created_at ON notifications(recipient, created_at, id);
 CREATE INDEX IF NOT EXISTS idx_notifications_twilio_sid ON notifications(twilio_sid);
-CREATE INDEX IF NOT EXISTS idx_notifications_created_at ON notifications(created_at);
 
 -- Pour SQLite (si vous utilisez SQLite au lieu de PostgreSQL)
 -- CREATE TABLE IF NOT EXISTS notifications (
@@ -29,10 +31,12 @@ CREATE INDEX IF NOT EXISTS idx_notifications_created_at ON notifications(created
 --     twilio_sid VARCHAR(100),
 --     error_message TEXT,
 --     created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
---     sent_at DATETIME
+--     sent_at DATETIME,
+--     claimed_at DATETIME,
+--     attempts INTEGER NOT NULL DEFAULT 0
 -- );
--- CREATE INDEX IF NOT EXISTS idx_notifications_recipient ON notifications(recipient);
--- CREATE INDEX IF NOT EXISTS idx_notifications_status ON notifications(status);
+-- CREATE INDEX IF NOT EXISTS idx_notifications_created_at_id ON notifications(created_at, id);
+-- CREATE INDEX IF NOT EXISTS idx_notifications_status_created_at ON notifications(status, created_at, id);
+-- CREATE INDEX IF NOT EXISTS idx_notifications_recipient_created_at ON notifications(recipient, created_at, id);
 -- CREATE INDEX IF NOT EXISTS idx_notifications_twilio_sid ON notifications(twilio_sid);
--- CREATE INDEX IF NOT EXISTS idx_notifications_created_at ON notifications(created_at);
 
@@ -0,0 +1,9 @@
+-- Watermark des tentatives de réentraînement (app/ml/retrain.py), indépendant de la promotion
+-- Utilisation: psql -U votre_user -d votre_db -f create_retrain_state_table.sql
+
+CREATE TABLE IF NOT EXISTS retrain_state (
+    model_version VARCHAR(50) PRIMARY KEY,
+    watermark INTEGER NOT NULL DEFAULT 0,
+    status VARCHAR(20) NOT NULL,
+    attempted_at TIMESTAMP NOT NULL
+);
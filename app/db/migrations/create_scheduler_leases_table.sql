@@ -0,0 +1,10 @@
+-- Bail de leadership du scheduler (app/core/leader.py) : un seul processus exécute les jobs planifiés
+-- Utilisation: psql -U votre_user -d votre_db -f create_scheduler_leases_table.sql
+-- La table apscheduler_jobs (job store persistant) est créée automatiquement par APScheduler.
+
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    name VARCHAR(50) PRIMARY KEY,
+    holder VARCHAR(255) NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    acquired_at TIMESTAMP NOT NULL
+);
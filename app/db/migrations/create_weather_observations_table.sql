@@ -0,0 +1,17 @@
+-- Relevés OpenWeather conservés par le scheduler pour le réentraînement incrémental (app/ml/retrain.py)
+-- Utilisation: psql -U votre_user -d votre_db -f create_weather_observations_table.sql
+
+CREATE TABLE IF NOT EXISTS weather_observations (
+    id SERIAL PRIMARY KEY,
+    region VARCHAR(50) NOT NULL,
+    departement VARCHAR(50) NOT NULL,
+    weather VARCHAR(30) NOT NULL,
+    temperature REAL NOT NULL,
+    wind_speed REAL NOT NULL,
+    humidity REAL NOT NULL,
+    observed_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_weather_observations_departement_observed_at
+    ON weather_observations(departement, observed_at);
@@ -0,0 +1,10 @@
+from app.db.database import SessionLocal
+
+
+def get_db():
+    """Dependency pour obtenir une session de base de données"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
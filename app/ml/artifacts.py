@@ -0,0 +1,205 @@
+"""
+Chargement et export des artefacts du modèle.
+
+Format de service : un manifeste JSON (features, encoders, scaler, métadonnées)
++ le modèle XGBoost au format natif UBJSON. Les pickles historiques
+(best_humidity_model.pkl, scaler.pkl, encoders.pkl, ...) restent lus en repli.
+
+Export depuis les pickles: python -m app.ml.artifacts [dossier]
+"""
+import json
+import math
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+MANIFEST_FILE = "manifest.json"
+NATIVE_MODEL_FILE = "best_humidity_model.ubj"
+
+
+def _parse_date(value) -> datetime:
+    """Parse rapide d'une date ISO, repli sur pandas pour les formats exotiques"""
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        import pandas as pd
+        return pd.to_datetime(value).to_pydatetime()
+
+
+class ModelBundle:
+    """Modèle + tout ce qu'il faut pour encoder une entrée (encoders, ordre des features, scaler)"""
+
+    def __init__(self, model, encoders: dict, features: list, metadata: dict,
+                 use_scaler: bool = False, scaler_mean=None, scaler_scale=None):
+        self.model = model
+        self.encoders = encoders
+        self.features = features
+        self.metadata = metadata
+        self.use_scaler = use_scaler
+        self.scaler_mean = np.asarray(scaler_mean, dtype=np.float64) if scaler_mean is not None else None
+        self.scaler_scale = np.asarray(scaler_scale, dtype=np.float64) if scaler_scale is not None else None
+        # Booster XGBoost natif (inplace_predict) si disponible, sinon model.predict
+        if hasattr(model, "inplace_predict"):
+            self.booster = model
+        elif hasattr(model, "get_booster"):
+            self.booster = model.get_booster()
+        else:
+            self.booster = None
+        # Arbres aplatis (app.ml.tree_engine), utilisés à la place du booster pour les petits lots
+        self.tree_engine = None
+
+    def encode(self, rows: list) -> np.ndarray:
+        """Encode une liste de dicts en matrice float32 préallouée, dans l'ordre des features"""
+        region_dict = self.encoders['region_dict']
+        departement_dict = self.encoders['departement_dict']
+        weather_order = self.encoders['weather_order']
+        features = self.features
+        X = np.empty((len(rows), len(features)), dtype=np.float32)
+        nan = float('nan')
+
+        for i, data in enumerate(rows):
+            date = _parse_date(data['date'])
+            row = {
+                'region_code': region_dict.get(data['region'], nan),
+                'departement_code': departement_dict.get(data['departement'], nan),
+                'weather_code': weather_order.get(data['weather'], 4),
+                'temperature': data['temperature'],
+                'wind_speed': data['wind_speed'],
+                'mois': date.month,
+                'jour': date.day,
+                'heure': date.hour,
+            }
+            # float -> float32 : même arrondi que la conversion DMatrix du chemin pandas
+            X[i] = [row[f] for f in features]
+
+        return X
+
+    def prepare(self, X: np.ndarray) -> np.ndarray:
+        """Entrée du modèle : X normalisé si le modèle a été entraîné avec le scaler"""
+        if self.use_scaler:
+            # Même calcul que StandardScaler.transform (en place, dans le dtype de X)
+            X = X.copy()
+            X -= self.scaler_mean
+            X /= self.scaler_scale
+        return X
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        X = self.prepare(X)
+        if self.tree_engine is not None and len(X) <= self.tree_engine.block_rows:
+            return self.tree_engine.predict(X)
+        if self.booster is not None:
+            return self.booster.inplace_predict(X)
+        return self.model.predict(X)
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def load_bundle(model_dir: Path) -> ModelBundle:
+    """Charge le modèle depuis manifest.json (+ modèle natif) ou, à défaut, depuis les pickles"""
+    model_dir = Path(model_dir)
+    manifest_path = model_dir / MANIFEST_FILE
+    if not manifest_path.exists():
+        return load_legacy_bundle(model_dir)
+
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    model_file = model_dir / manifest["model_file"]
+    if manifest["model_type"] == "xgboost":
+        import xgboost as xgb
+        model = xgb.Booster()
+        model.load_model(model_file)
+    else:
+        import joblib
+        model = joblib.load(model_file)
+
+    scaler = manifest.get("scaler") or {}
+    return ModelBundle(
+        model,
+        encoders=manifest["encoders"],
+        features=manifest["features"],
+        metadata=manifest.get("metadata", {}),
+        use_scaler=manifest["use_scaler"],
+        scaler_mean=scaler.get("mean"),
+        scaler_scale=scaler.get("scale"),
+    )
+
+
+def load_legacy_bundle(model_dir: Path) -> ModelBundle:
+    """Chargement historique : cinq pickles joblib"""
+    import joblib
+    model_dir = Path(model_dir)
+    model = joblib.load(model_dir / "best_humidity_model.pkl")
+    scaler = joblib.load(model_dir / "scaler.pkl")
+    metadata = joblib.load(model_dir / "model_metadata.pkl")
+    return ModelBundle(
+        model,
+        encoders=joblib.load(model_dir / "encoders.pkl"),
+        features=joblib.load(model_dir / "feature_columns.pkl"),
+        metadata=metadata,
+        use_scaler=metadata["use_scaler"],
+        scaler_mean=scaler.mean_,
+        scaler_scale=scaler.scale_,
+    )
+
+
+def write_manifest(model_dir: Path, model, encoders: dict, features: list, metadata: dict,
+                   use_scaler: bool, scaler=None) -> Path:
+    """Écrit le modèle au format de service (natif si XGBoost) et son manifeste dans model_dir"""
+    model_dir = Path(model_dir)
+    model_dir.mkdir(parents=True, exist_ok=True)
+    if hasattr(model, "get_booster") or hasattr(model, "save_raw"):
+        booster = model.get_booster() if hasattr(model, "get_booster") else model
+        booster.save_model(model_dir / NATIVE_MODEL_FILE)
+        model_type, model_file = "xgboost", NATIVE_MODEL_FILE
+    else:
+        import joblib
+        joblib.dump(model, model_dir / "best_humidity_model.pkl")
+        model_type, model_file = "sklearn", "best_humidity_model.pkl"
+
+    manifest = {
+        "format_version": 1,
+        "model_type": model_type,
+        "model_file": model_file,
+        "features": list(features),
+        "encoders": encoders,
+        "use_scaler": bool(use_scaler),
+        "scaler": {"mean": scaler.mean_.tolist(), "scale": scaler.scale_.tolist()} if scaler is not None else None,
+        "metadata": _jsonable(metadata),
+    }
+    path = model_dir / MANIFEST_FILE
+    path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
+
+
+def export_native(model_dir: Path) -> Path:
+    """Convertit les pickles de model_dir au format de service (manifest.json + modèle natif)"""
+    import joblib
+    model_dir = Path(model_dir)
+    metadata = joblib.load(model_dir / "model_metadata.pkl")
+    return write_manifest(
+        model_dir,
+        joblib.load(model_dir / "best_humidity_model.pkl"),
+        encoders=joblib.load(model_dir / "encoders.pkl"),
+        features=joblib.load(model_dir / "feature_columns.pkl"),
+        metadata=metadata,
+        use_scaler=metadata["use_scaler"],
+        scaler=joblib.load(model_dir / "scaler.pkl"),
+    )
+
+
+if __name__ == "__main__":
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parent / "models"
+    print(f"✅ Manifeste écrit: {export_native(target)}")
@@ -0,0 +1,195 @@
+"""
+Regroupement des prédictions unitaires concurrentes (POST /humidity/predict).
+
+Chaque requête dépose son entrée dans une file et attend son résultat (future
+asyncio). Une tâche unique de la boucle d'événements prend les entrées arrivées
+dans une fenêtre de PREDICT_BATCH_WINDOW_MS à partir de la première, ou dès que
+PREDICT_BATCH_MAX_SIZE sont en attente, et les score en un seul appel au modèle
+(predict_humidity_batch, dans le threadpool). Pendant qu'un lot est scoré, les
+suivantes s'accumulent : sous charge les lots grossissent d'eux-mêmes, et un seul
+appel au modèle est en cours au lieu d'un par thread du pool.
+
+La fenêtre n'est attendue que si le lot précédent regroupait plusieurs requêtes :
+une requête isolée (trafic faible) part tout de suite, sans latence ajoutée.
+"""
+import asyncio
+import os
+import threading
+import time
+
+import anyio
+
+from app.core import metrics
+from app.ml.predictor import predict_humidity_batch
+
+BATCH_SIZE = metrics.histogram(
+    "predict_batch_size", "Nombre de prédictions unitaires regroupées par appel au modèle",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+QUEUE_WAIT_SECONDS = metrics.histogram(
+    "predict_queue_wait_seconds", "Attente d'une prédiction unitaire avant le départ de son lot",
+)
+
+
+class MicroBatcher:
+    """File de prédictions unitaires scorées par lots, liée à la boucle d'événements qui l'utilise"""
+
+    def __init__(self, predict_batch, window: float = 0.002, max_batch_size: int = 64):
+        # predict_batch(rows) -> liste de résultats, appelée dans le threadpool
+        self.predict_batch = predict_batch
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending = []
+        self._loop = None
+        self._worker = None
+        self._arrived = None
+        self._full = None
+        self._last_batch_size = 0
+        self.batches = 0
+        self.rows = 0
+
+    @classmethod
+    def from_env(cls, predict_batch):
+        """None si PREDICT_BATCH_MAX_SIZE <= 1 (chaque requête prédit seule, comme avant)"""
+        max_batch_size = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "64"))
+        if max_batch_size <= 1:
+            return None
+        return cls(
+            predict_batch,
+            window=float(os.getenv("PREDICT_BATCH_WINDOW_MS", "2")) / 1000,
+            max_batch_size=max_batch_size,
+        )
+
+    def start(self):
+        """Démarre la tâche de regroupement dans la boucle courante (si elle n'y tourne pas déjà)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._worker is not None and not self._worker.done():
+            return
+        if self._loop is not loop:
+            # Nouvelle boucle (redémarrage de l'application) : les futures de l'ancienne sont perdues
+            self._loop = loop
+            self._pending = []
+            self._arrived = asyncio.Event()
+            self._full = asyncio.Event()
+        self._worker = loop.create_task(self._run(), name="predict-batcher")
+        if self._pending:
+            self._arrived.set()
+
+    async def stop(self):
+        """Arrête la tâche ; les prédictions encore en file ou en cours de scoring échouent"""
+        worker, self._worker = self._worker, None
+        if worker is None:
+            return
+        worker.cancel()
+        try:
+            await worker
+        except asyncio.CancelledError:
+            pass
+        self._fail([future for _, future, _ in self._pending])
+        self._pending = []
+
+    @staticmethod
+    def _fail(futures: list):
+        for future in futures:
+            if not future.done():
+                future.set_exception(RuntimeError("Service en cours d'arrêt"))
+
+    async def submit(self, row):
+        """Résultat de predict_batch pour `row`, calculé avec les autres entrées du même lot"""
+        self.start()
+        future = self._loop.create_future()
+        self._pending.append((row, future, time.perf_counter()))
+        self._arrived.set()
+        if len(self._pending) >= self.max_batch_size:
+            self._full.set()
+        return await future
+
+    async def _run(self):
+        while True:
+            await self._arrived.wait()
+            if not self._pending:
+                self._arrived.clear()
+                continue
+            # Fenêtre comptée depuis l'arrivée de la plus ancienne entrée en attente,
+            # seulement sous charge (lot précédent de plusieurs requêtes)
+            delay = self._pending[0][2] + self.window - time.perf_counter()
+            if self._last_batch_size > 1 and delay > 0 and len(self._pending) < self.max_batch_size:
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            if not self._pending:
+                self._arrived.clear()
+            # Requêtes abandonnées (client déconnecté) pendant l'attente : pas scorées
+            batch = [item for item in batch if not item[1].done()]
+            self._last_batch_size = len(batch)
+            if batch:
+                await self._score(batch)
+
+    async def _score(self, batch: list):
+        start = time.perf_counter()
+        for _, _, enqueued_at in batch:
+            QUEUE_WAIT_SECONDS.observe(start - enqueued_at)
+        BATCH_SIZE.observe(len(batch))
+        self.batches += 1
+        self.rows += len(batch)
+        try:
+            results = await anyio.to_thread.run_sync(self._predict, [row for row, _, _ in batch])
+        except asyncio.CancelledError:
+            # stop() pendant le scoring : le lot en cours échoue comme les entrées en file
+            self._fail([future for _, future, _ in batch])
+            raise
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _predict(self, rows: list) -> list:
+        """Un appel pour tout le lot ; s'il échoue (entrée invalide), ligne par ligne
+        pour que l'erreur ne concerne que la requête fautive"""
+        try:
+            return list(self.predict_batch(rows))
+        except Exception:
+            if len(rows) == 1:
+                raise
+        results = []
+        for row in rows:
+            try:
+                results.append(self.predict_batch([row])[0])
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": round(self.rows / self.batches, 2) if self.batches else None,
+            "pending": len(self._pending),
+        }
+
+
+_batcher = None
+_batcher_configured = False
+_batcher_lock = threading.Lock()
+
+
+def get_predict_batcher():
+    """File partagée des prédictions unitaires (None si le regroupement est désactivé)"""
+    global _batcher, _batcher_configured
+    if not _batcher_configured:
+        with _batcher_lock:
+            if not _batcher_configured:
+                _batcher = MicroBatcher.from_env(predict_humidity_batch)
+                _batcher_configured = True
+    return _batcher
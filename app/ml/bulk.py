@@ -0,0 +1,255 @@
+"""
+Scoring en masse de fichiers CSV / NDJSON envoyés en flux (POST /humidity/predict/stream).
+
+Le corps de la requête est décodé au fil de l'eau (UTF-8 incrémental) et découpé en
+enregistrements ; toutes les `chunk_rows` lignes, le lot est décodé, encodé et scoré
+en un seul appel au modèle (dans le threadpool), et ses résultats sont renvoyés
+aussitôt (mode flux, par défaut). La mémoire reste bornée par la taille d'un lot,
+quelle que soit la taille du fichier, et rien n'est écrit sur disque.
+
+En mode bufferisé (buffered=true, voir spool), les résultats sont au contraire gardés
+jusqu'à la fin de la lecture dans un SpooledTemporaryFile : en mémoire jusqu'à 8 Mio,
+puis dans un fichier temporaire sur disque au-delà.
+
+En CSV, un saut de ligne dans un champ entre guillemets ne termine pas
+l'enregistrement (parité des guillemets, comme csv.reader).
+
+Colonnes attendues (mêmes noms que meteo_departements_Senegal.csv) : region,
+departement, weather, temperature, wind_speed, date ; les autres colonnes sont
+recopiées telles quelles dans la sortie, suivies de predicted_humidity et level.
+"""
+import codecs
+import csv
+import io
+import json
+import tempfile
+
+import anyio
+import numpy as np
+
+from app.ml.predictor import ENCODE_SECONDS
+
+REQUIRED_FIELDS = ("region", "departement", "weather", "temperature", "wind_speed", "date")
+OUTPUT_FIELDS = ("predicted_humidity", "level")
+FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+# Au-delà, un enregistrement sans fin (ligne ou guillemet jamais fermé) est refusé
+# (fichier binaire, mauvais format)
+MAX_RECORD_CHARS = 1024 * 1024
+
+
+class BulkInputError(ValueError):
+    """Ligne invalide dans le fichier envoyé (numéro de ligne dans le message)"""
+
+
+def humidity_levels(humidities: np.ndarray) -> tuple:
+    """Humidités arrondies au dixième et niveaux, mêmes seuils que classify_humidity"""
+    rounded = np.round(np.asarray(humidities, dtype=np.float64), 1)
+    levels = np.select([rounded > 80, rounded > 70, rounded > 50], ["danger", "warning", "success"], "info")
+    return rounded.tolist(), levels.tolist()
+
+
+def _record(values: dict, line_number: int) -> dict:
+    """Entrée du modèle à partir d'une ligne décodée (températures et vent en float)"""
+    try:
+        record = {
+            "region": values["region"],
+            "departement": values["departement"],
+            "weather": values["weather"],
+            "temperature": float(values["temperature"]),
+            "wind_speed": float(values["wind_speed"]),
+            "date": str(values["date"]),
+        }
+    except KeyError as e:
+        raise BulkInputError(f"Ligne {line_number}: champ manquant {e}")
+    except (TypeError, ValueError) as e:
+        raise BulkInputError(f"Ligne {line_number}: {e}")
+    if not record["date"] or record["date"] == "None":
+        raise BulkInputError(f"Ligne {line_number}: champ manquant 'date'")
+    return record
+
+
+class RecordSplitter:
+    """Découpe le corps reçu (octets, par morceaux quelconques) en enregistrements complets.
+
+    Chaque enregistrement est (numéro de sa première ligne, texte avec fin de ligne) ;
+    en CSV (`quoted`), les lignes sont regroupées tant qu'un guillemet reste ouvert.
+    """
+
+    def __init__(self, quoted: bool):
+        self.quoted = quoted
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._partial = ""
+        self._record = []
+        self._record_chars = 0
+        self._quotes = 0
+        self.lines = 0
+
+    def feed(self, data: bytes, final: bool = False) -> list:
+        *complete, self._partial = (self._partial + self._decoder.decode(data, final)).split("\n")
+        if len(self._partial) > MAX_RECORD_CHARS:
+            raise BulkInputError(f"Ligne {self.lines + len(complete) + 1}: "
+                                 f"plus de {MAX_RECORD_CHARS} caractères sans fin de ligne")
+        lines = [line + "\n" for line in complete]
+        if final and self._partial:
+            lines.append(self._partial)
+            self._partial = ""
+
+        records = []
+        for line in lines:
+            self.lines += 1
+            if not self.quoted:
+                records.append((self.lines, line))
+                continue
+            self._record.append(line)
+            self._record_chars += len(line)
+            self._quotes += line.count('"')
+            if self._quotes % 2 == 0:
+                records.append((self.lines - len(self._record) + 1, "".join(self._record)))
+                self._record, self._record_chars, self._quotes = [], 0, 0
+            elif self._record_chars > MAX_RECORD_CHARS:
+                raise BulkInputError(f"Ligne {self.lines - len(self._record) + 1}: guillemet non fermé "
+                                     f"sur plus de {MAX_RECORD_CHARS} caractères")
+        if final and self._record:
+            raise BulkInputError(f"Ligne {self.lines - len(self._record) + 1}: guillemet non fermé")
+        return records
+
+
+class BulkScorer:
+    """Décode et score un fichier lot par lot, avec une seule version du modèle"""
+
+    def __init__(self, version, input_format: str, output_format: str):
+        self.version = version
+        self.input_format = input_format
+        self.output_format = output_format
+        self.header = None
+        self.output_header_written = False
+        self.rows = 0
+
+    def process(self, records: list) -> bytes:
+        """Traite un lot d'enregistrements (appelé dans le threadpool) ; résultats encodés"""
+        decoded, originals = self._decode(records)
+        if not decoded:
+            return b""
+        with ENCODE_SECONDS.time(call="stream"):
+            X = self.version.bundle.encode(decoded)
+        try:
+            humidities = self.version.predict(X)
+        except Exception as e:
+            raise BulkInputError(f"Lignes {records[0][0]}-{records[-1][0]}: {e}")
+        self.rows += len(decoded)
+        return self._write(originals, humidities)
+
+    def _decode(self, records: list):
+        decoded, originals = [], []
+        if self.input_format == "csv":
+            # Un enregistrement complet par élément : csv.reader produit une ligne par élément
+            reader = csv.reader(text for _, text in records)
+            for line_number, _ in records:
+                try:
+                    values = next(reader)
+                except csv.Error as e:
+                    raise BulkInputError(f"Ligne {line_number}: CSV invalide ({e})")
+                if not values:
+                    continue
+                if self.header is None:
+                    self.header = [name.strip().lstrip("\ufeff") for name in values]
+                    missing = [field for field in REQUIRED_FIELDS if field not in self.header]
+                    if missing:
+                        raise BulkInputError(f"En-tête CSV: colonne(s) manquante(s) {', '.join(missing)}")
+                    continue
+                if len(values) != len(self.header):
+                    raise BulkInputError(f"Ligne {line_number}: {len(values)} colonne(s), "
+                                         f"{len(self.header)} attendue(s)")
+                original = dict(zip(self.header, values))
+                decoded.append(_record(original, line_number))
+                originals.append(original)
+        else:
+            for line_number, line in records:
+                if not line.strip():
+                    continue
+                try:
+                    original = json.loads(line)
+                except ValueError as e:
+                    raise BulkInputError(f"Ligne {line_number}: JSON invalide ({e})")
+                if not isinstance(original, dict):
+                    raise BulkInputError(f"Ligne {line_number}: un objet JSON est attendu")
+                decoded.append(_record(original, line_number))
+                originals.append(original)
+        return decoded, originals
+
+    def _write(self, originals: list, humidities) -> bytes:
+        rounded, levels = humidity_levels(humidities)
+        buffer = io.StringIO()
+        if self.output_format == "csv":
+            columns = list(self.header) if self.header else list(REQUIRED_FIELDS)
+            writer = csv.writer(buffer, lineterminator="\n")
+            if not self.output_header_written:
+                writer.writerow(columns + list(OUTPUT_FIELDS))
+                self.output_header_written = True
+            if self.header:
+                # Ligne CSV d'origine (valeurs dans l'ordre de l'en-tête) + résultats
+                rows = (list(original.values()) + [humidity, level]
+                        for original, humidity, level in zip(originals, rounded, levels))
+            else:
+                rows = ([original.get(c, "") for c in columns] + [humidity, level]
+                        for original, humidity, level in zip(originals, rounded, levels))
+            writer.writerows(rows)
+        else:
+            for original, humidity, level in zip(originals, rounded, levels):
+                original["predicted_humidity"] = humidity
+                original["level"] = level
+                buffer.write(json.dumps(original, ensure_ascii=False))
+                buffer.write("\n")
+        return buffer.getvalue().encode("utf-8")
+
+
+async def score_stream(chunks, scorer: BulkScorer, chunk_rows: int = 5000):
+    """Score un corps de requête (itérateur asynchrone d'octets) lot par lot.
+
+    Générateur asynchrone : les résultats de chaque lot sont produits dès qu'il est
+    scoré (scorer.rows compte les lignes déjà scorées). Lève BulkInputError si une
+    ligne est invalide.
+    """
+    splitter = RecordSplitter(quoted=scorer.input_format == "csv")
+    records = []
+    async for chunk in chunks:
+        records.extend(splitter.feed(chunk))
+        while len(records) >= chunk_rows:
+            batch, records = records[:chunk_rows], records[chunk_rows:]
+            output = await anyio.to_thread.run_sync(scorer.process, batch)
+            if output:
+                yield output
+    records.extend(splitter.feed(b"", final=True))
+    if records:
+        output = await anyio.to_thread.run_sync(scorer.process, records)
+        if output:
+            yield output
+    if scorer.input_format == "csv" and scorer.header is None:
+        raise BulkInputError("Fichier CSV vide")
+
+
+async def spool(results, spool_memory: int = 8 * 1024 * 1024):
+    """Écrit tous les résultats dans un fichier temporaire (en mémoire jusqu'à `spool_memory`
+    octets, sur disque au-delà) ; retourné positionné au début"""
+    out = tempfile.SpooledTemporaryFile(max_size=spool_memory, mode="w+b")
+    try:
+        async for block in results:
+            out.write(block)
+    except BaseException:
+        out.close()
+        raise
+    out.seek(0)
+    return out
+
+
+def iter_file(file, block_size: int = 64 * 1024):
+    """Relit le fichier de résultats par blocs et le ferme à la fin"""
+    try:
+        while True:
+            block = file.read(block_size)
+            if not block:
+                break
+            yield block
+    finally:
+        file.close()
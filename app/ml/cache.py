@@ -0,0 +1,130 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+class PredictionCache:
+    """Cache LRU + TTL des prédictions, indexé par le vecteur de features encodé.
+
+    La température et la vitesse du vent sont quantifiées avant de construire la clé,
+    et la date n'intervient que via mois/jour/heure (donc tronquée à l'heure).
+    Le cache est vidé automatiquement si les fichiers du modèle changent sur disque.
+    """
+
+    def __init__(self, features: list, maxsize: int = 10000, ttl: float = 3600,
+                 temperature_step: float = 0.1, wind_step: float = 0.1,
+                 watch_dir: Path = None, check_interval: float = 5.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.watch_dir = watch_dir
+        self.check_interval = check_interval
+        self._steps = {}
+        if temperature_step > 0 and 'temperature' in features:
+            self._steps[features.index('temperature')] = temperature_step
+        if wind_step > 0 and 'wind_speed' in features:
+            self._steps[features.index('wind_speed')] = wind_step
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._artifacts_signature = self._signature()
+        self._next_check = time.monotonic() + check_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls, features: list, watch_dir: Path = None):
+        """Construit le cache depuis les variables d'environnement PREDICTION_CACHE_*"""
+        return cls(
+            features,
+            maxsize=int(os.getenv("PREDICTION_CACHE_SIZE", "10000")),
+            ttl=float(os.getenv("PREDICTION_CACHE_TTL", "3600")),
+            temperature_step=float(os.getenv("PREDICTION_CACHE_TEMPERATURE_STEP", "0.1")),
+            wind_step=float(os.getenv("PREDICTION_CACHE_WIND_STEP", "0.1")),
+            watch_dir=watch_dir,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def key(self, row) -> tuple:
+        """Clé normalisée d'une ligne encodée (float32) : quantification + NaN -> None"""
+        values = row.tolist()
+        for index, step in self._steps.items():
+            values[index] = round(values[index] / step)
+        return tuple(None if isinstance(v, float) and math.isnan(v) else v for v in values)
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        self._check_artifacts()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _signature(self):
+        if self.watch_dir is None:
+            return None
+        signature = []
+        for path in sorted(Path(self.watch_dir).iterdir()):
+            if path.is_file():
+                stat = path.stat()
+                signature.append((path.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _check_artifacts(self):
+        """Vide le cache si les artefacts du modèle ont changé (vérifié au plus toutes les check_interval s)"""
+        if self.watch_dir is None or time.monotonic() < self._next_check:
+            return
+        self._next_check = time.monotonic() + self.check_interval
+        signature = self._signature()
+        if signature != self._artifacts_signature:
+            with self._lock:
+                self._entries.clear()
+                self._artifacts_signature = signature
+                self.invalidations += 1
+            print("♻️ Artefacts du modèle modifiés – cache des prédictions vidé")
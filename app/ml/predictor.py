@@ -1,58 +1,103 @@
-import joblib
-import pandas as pd
+import os
+import threading
+import time
+import numpy as np
 from pathlib import Path
-from datetime import datetime
-import requests
+from app.core import metrics
+from app.ml.cache import PredictionCache
+from app.ml.registry import ModelRegistry
+from app.ml.weather import get_weather_client
 MODEL_DIR = Path(__file__).parent / "models"
 
-model = joblib.load(MODEL_DIR / "best_humidity_model.pkl")
-scaler = joblib.load(MODEL_DIR / "scaler.pkl")
-encoders = joblib.load(MODEL_DIR / "encoders.pkl")
-features = joblib.load(MODEL_DIR / "feature_columns.pkl")
-metadata = joblib.load(MODEL_DIR / "model_metadata.pkl")
-use_scaler = metadata["use_scaler"]
+# Versions du modèle : chargées à la demande (premier appel ou warm_up au démarrage), pas à l'import
+registry = ModelRegistry(MODEL_DIR, engine=os.getenv("INFERENCE_ENGINE", "xgboost"))
+_prediction_cache = None
+_cache_lock = threading.Lock()
+# Courbes de prévision déjà scorées : (département, version) -> (fetched_at des prévisions, courbe)
+_forecast_curves = {}
+_ready = threading.Event()
+
+ENCODE_SECONDS = metrics.histogram(
+    "humidity_encode_seconds", "Durée de l'encodage des features", ("call",),
+)
+
+def get_bundle():
+    """Modèle + encoders + features de la version active"""
+    return registry.active().bundle
+
+def get_prediction_cache() -> PredictionCache:
+    """Cache des prédictions (LRU + TTL), invalidé si les fichiers de MODEL_DIR changent"""
+    global _prediction_cache
+    if _prediction_cache is None:
+        with _cache_lock:
+            if _prediction_cache is None:
+                _prediction_cache = PredictionCache.from_env(get_bundle().features, watch_dir=MODEL_DIR)
+    return _prediction_cache
+
+def warm_up():
+    """Charge, valide et chauffe la version active (+ shadow éventuelle), puis lance le rechargement à chaud"""
+    start = time.perf_counter()
+    registry.active()
+    get_prediction_cache()
+    if os.getenv("MODEL_SHADOW_VERSION"):
+        registry.set_shadow(os.getenv("MODEL_SHADOW_VERSION"))
+    registry.start_polling(float(os.getenv("MODEL_RELOAD_INTERVAL", "60")))
+    _ready.set()
+    print(f"🔥 Warm-up du modèle terminé en {(time.perf_counter() - start) * 1000:.0f} ms")
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+def fetch_weather(api_key: str, location: dict, max_age: float = None):
+    """Récupère les données météo actuelles d'un lieu (lat/lon ou city) via le client OpenWeather partagé
+    (`max_age` : âge max accepté d'une entrée en cache, voir WeatherClient.current)"""
+    return get_weather_client().current(location, api_key, max_age=max_age)
 
 def fetch_weather_dakar(api_key: str):
     """Récupère les données météo actuelles pour Dakar depuis OpenWeatherMap"""
-    print("la api key openweather",api_key)
-    url = f"http://api.openweathermap.org/data/2.5/weather?q=Dakar,SN&appid={api_key}&units=metric"
-    response = requests.get(url)
-    
-    if response.status_code != 200:
-        raise Exception(f"Erreur API OpenWeather: {response.status_code}")
-    
-    data = response.json()
-    
-    # Mapper la météo à notre format (simplifié)
-    weather_main = data['weather'][0]['main'].lower()
-    weather_desc = data['weather'][0]['description'].lower()
-    
-    # Mapping vers nos catégories (ajuste selon tes besoins)
-    if 'rain' in weather_desc or 'rain' in weather_main:
-        weather = 'light rain' if data.get('rain', {}).get('1h', 0) < 2.5 else 'heavy rain'
-    elif 'thunderstorm' in weather_desc:
-        weather = 'thunderstorm with rain'
-    elif 'clouds' in weather_main:
-        if 'clear' in weather_desc:
-            weather = 'clear sky'
-        else:
-            weather = 'scattered clouds'  # Simplifié
-    else:
-        weather = 'clear sky'  # Défaut
-    
-    return {
-        'region': 'Dakar',
-        'departement': 'Dakar',
-        'weather': weather,
-        'temperature': data['main']['temp'],
-        'wind_speed': data['wind']['speed'],
-        'date': datetime.now().isoformat()  # Date actuelle UTC
+    return fetch_weather(api_key, {'region': 'Dakar', 'departement': 'Dakar', 'city': 'Dakar,SN'})
+
+def predict_forecast(api_key: str, location: dict) -> dict:
+    """Humidité prédite pour chaque pas des prévisions d'un lieu, en un seul appel au modèle.
+
+    La courbe est gardée tant que les prévisions en cache et la version active ne changent pas :
+    un même pas n'est pas rescoré à chaque appel.
+    """
+    forecast = get_weather_client().forecast(location, api_key)
+    version = registry.active()
+    key = (location['departement'], version.name)
+    cached = _forecast_curves.get(key)
+    if cached is not None and cached[0] == forecast["fetched_at"]:
+        return cached[1]
+
+    steps = forecast["steps"]
+    humidities = []
+    if steps:
+        with ENCODE_SECONDS.time(call="forecast"):
+            X = version.bundle.encode(steps)
+        humidities = [float(h) for h in version.predict(X)]
+        registry.shadow_score(X, humidities)
+    curve = {
+        "fetched_at": forecast["fetched_at"],
+        "expires_at": forecast["expires_at"],
+        "model_version": version.name,
+        "steps": [dict(step, humidity=humidity) for step, humidity in zip(steps, humidities)],
     }
+    _forecast_curves[key] = (forecast["fetched_at"], curve)
+    return curve
 
-def predict_humidity(data: dict)->float:
-    ""'gets a dict and returns the predcited humidity'""
-    df = pd.DataFrame([data])
-    df['date'] = pd.to_datetime(df['date'])
+def encode_features(rows: list) -> np.ndarray:
+    """Encode une liste de dicts en matrice float32 dans l'ordre des features du modèle"""
+    return get_bundle().encode(rows)
+
+def _build_features_pandas(rows: list):
+    """Encodage de référence via pandas (chemin historique, conservé pour les tests de parité)"""
+    import pandas as pd
+    bundle = get_bundle()
+    encoders = bundle.encoders
+    df = pd.DataFrame(rows)
+    # format='mixed' : chaque date est parsée individuellement (lots hétérogènes)
+    df['date'] = pd.to_datetime(df['date'], format='mixed')
     df['mois'] = df['date'].dt.month
     df['jour'] = df['date'].dt.day
     df['heure'] = df['date'].dt.hour
@@ -60,8 +105,61 @@ def predict_humidity(data: dict)->float:
     df['region_code'] = df['region'].map(encoders['region_dict'])
     df['departement_code'] = df['departement'].map(encoders['departement_dict'])
     df['weather_code'] = df['weather'].apply(lambda x: encoders['weather_order'].get(x, 4))
-    X = df[features]
-    if use_scaler:
-        X = scaler.transform(X)
+    X = df[bundle.features]
+    if bundle.use_scaler:
+        X = (X - bundle.scaler_mean) / bundle.scaler_scale
+    return X
+
+def predict_humidity_pandas(data: dict) -> float:
+    """Prédiction via l'encodage pandas de référence"""
+    bundle = get_bundle()
+    X = _build_features_pandas([data])
+    if bundle.booster is not None:
+        return float(bundle.booster.inplace_predict(X)[0])
+    return float(bundle.model.predict(X)[0])
+
+def predict_humidity(data: dict)->float:
+    ""'gets a dict and returns the predcited humidity'""
+    # Une seule lecture de la version active : un échange à chaud n'affecte pas la requête en cours
+    version = registry.active()
+    cache = get_prediction_cache()
+    with ENCODE_SECONDS.time(call="single"):
+        X = version.bundle.encode([data])
+    key = (version.name, cache.key(X[0]))
+    humidity = cache.get(key)
+    if humidity is None:
+        humidity = float(version.predict(X)[0])
+        cache.set(key, humidity)
+    registry.shadow_score(X, [humidity])
+    return humidity
+
+def predict_humidity_batch(rows: list)->list:
+    """Prédit l'humidité pour plusieurs entrées avec un seul appel au modèle (lignes non cachées uniquement)"""
+    if not rows:
+        return []
+    version = registry.active()
+    cache = get_prediction_cache()
+    with ENCODE_SECONDS.time(call="batch"):
+        X = version.bundle.encode(rows)
+    keys = [(version.name, cache.key(x)) for x in X]
+    humidities = [cache.get(k) for k in keys]
+    missing = [i for i, h in enumerate(humidities) if h is None]
+    if missing:
+        predicted = version.predict(X[missing])
+        for i, h in zip(missing, predicted):
+            humidities[i] = float(h)
+            cache.set(keys[i], humidities[i])
+    registry.shadow_score(X, humidities)
+    return humidities
+
+def _collect_cache_metrics():
+    """Compteurs du cache de prédictions (s'il a déjà été créé : un scrape ne charge pas le modèle)"""
+    if _prediction_cache is None:
+        return
+    stats = _prediction_cache.stats()
+    yield "prediction_cache_hits_total", "counter", "Prédictions servies depuis le cache", stats["hits"], {}
+    yield "prediction_cache_misses_total", "counter", "Prédictions calculées par le modèle", stats["misses"], {}
+    yield "prediction_cache_evictions_total", "counter", "Entrées évincées du cache (LRU)", stats["evictions"], {}
+    yield "prediction_cache_entries", "gauge", "Entrées dans le cache de prédictions", stats["size"], {}
 
-    return float(model.predict(X)[0])
\ No newline at end of file
+metrics.register_collector(_collect_cache_metrics)
@@ -0,0 +1,345 @@
+"""
+Registre des versions du modèle, avec rechargement à chaud.
+
+Organisation de app/ml/models/ :
+    manifest.json, best_humidity_model.ubj, *.pkl   -> version "base" (modèle historique)
+    <version>/manifest.json + modèle                 -> versions entraînées ensuite (ex: v20251201-120000)
+
+Version active : contenu du fichier ACTIVE s'il existe, sinon MODEL_VERSION, sinon
+"base". Une version n'est donc mise en production que par une promotion explicite
+(POST /humidity/models/{version}/activate, ou le réentraînement quand le candidat
+fait au moins aussi bien), qui écrit ACTIVE. Une version plus récente apparue sur
+disque (app.ml.train) est seulement scorée en shadow, comme candidate.
+
+La version cible est chargée, validée et chauffée en arrière-plan puis échangée
+atomiquement : une requête en cours garde la version qu'elle a lue, les suivantes
+utilisent la nouvelle.
+"""
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from app.core import metrics
+from app.ml import tree_engine
+from app.ml.artifacts import MANIFEST_FILE, load_bundle
+
+BASE_VERSION = "base"
+ACTIVE_FILE = "ACTIVE"
+
+PREDICT_SECONDS = metrics.histogram(
+    "model_predict_seconds", "Durée d'un appel au modèle (version active ou shadow)", ("version",),
+)
+PREDICTED_ROWS = metrics.counter("model_predicted_rows", "Lignes prédites par le modèle", ("version",))
+
+
+class ModelVersion:
+    """Une version chargée du modèle et ses statistiques de service"""
+
+    def __init__(self, name: str, path: Path, bundle):
+        self.name = name
+        self.path = path
+        self.bundle = bundle
+        self.loaded_at = datetime.now()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.rows = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.prediction_sum = 0.0
+        self.prediction_min = math.inf
+        self.prediction_max = -math.inf
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        start = time.perf_counter()
+        predictions = self.bundle.predict(X)
+        latency = time.perf_counter() - start
+        self.record(latency, predictions)
+        PREDICT_SECONDS.observe(latency, version=self.name)
+        PREDICTED_ROWS.inc(len(predictions), version=self.name)
+        return predictions
+
+    def record(self, latency: float, predictions: np.ndarray):
+        if len(predictions) == 0:
+            return
+        if len(predictions) <= 16:
+            # Petit lot : les réductions NumPy coûteraient plus cher que la prédiction
+            values = np.asarray(predictions, dtype=np.float64).tolist()
+            total, lowest, highest = sum(values), min(values), max(values)
+        else:
+            total = float(np.sum(predictions))
+            lowest, highest = float(np.min(predictions)), float(np.max(predictions))
+        with self._lock:
+            self.calls += 1
+            self.rows += len(predictions)
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self.prediction_sum += total
+            self.prediction_min = min(self.prediction_min, lowest)
+            self.prediction_max = max(self.prediction_max, highest)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "version": self.name,
+                "loaded_at": self.loaded_at.isoformat(),
+                "model_name": self.bundle.metadata.get("model_name"),
+                "training_date": self.bundle.metadata.get("training_date"),
+                "engine": "numpy" if self.bundle.tree_engine is not None else "xgboost",
+                "calls": self.calls,
+                "rows": self.rows,
+                "mean_latency_ms": round(self.total_latency / self.calls * 1000, 3) if self.calls else None,
+                "max_latency_ms": round(self.max_latency * 1000, 3) if self.calls else None,
+                "mean_prediction": round(self.prediction_sum / self.rows, 3) if self.rows else None,
+                "min_prediction": round(self.prediction_min, 3) if self.rows else None,
+                "max_prediction": round(self.prediction_max, 3) if self.rows else None,
+            }
+
+
+class ModelRegistry:
+    """Découverte, validation, activation atomique et mode shadow des versions du modèle"""
+
+    def __init__(self, model_dir: Path, shadow_queue_size: int = 100, engine: str = "xgboost"):
+        if engine not in tree_engine.ENGINES:
+            raise ValueError(f"Moteur d'inférence inconnu: {engine} ({', '.join(tree_engine.ENGINES)})")
+        self.model_dir = Path(model_dir)
+        self.engine = engine
+        self._active = None
+        self._shadow = None
+        # Shadow choisie par le registre (nouvelle candidate), remplaçable par la suivante
+        self._shadow_is_candidate = False
+        self._versions = {}
+        self._rejected = set()
+        self._lock = threading.RLock()
+        self._poller = None
+        self._stop = threading.Event()
+        self._shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-shadow")
+        self._shadow_slots = threading.BoundedSemaphore(shadow_queue_size)
+        self.shadow_stats = {"rows": 0, "abs_diff_sum": 0.0, "max_abs_diff": 0.0, "dropped": 0}
+
+    # ---------- découverte ----------
+
+    def discover(self) -> dict:
+        """Versions disponibles sur disque : {nom: dossier}"""
+        versions = {}
+        if (self.model_dir / MANIFEST_FILE).exists() or (self.model_dir / "best_humidity_model.pkl").exists():
+            versions[BASE_VERSION] = self.model_dir
+        for path in sorted(self.model_dir.iterdir()):
+            if path.is_dir() and (path / MANIFEST_FILE).exists():
+                versions[path.name] = path
+        return versions
+
+    def target_version(self) -> str:
+        """Version qui devrait être active (fichier ACTIVE > MODEL_VERSION > base)"""
+        active_file = self.model_dir / ACTIVE_FILE
+        if active_file.exists():
+            name = active_file.read_text(encoding="utf-8").strip()
+            if name:
+                return name
+        if os.getenv("MODEL_VERSION"):
+            return os.getenv("MODEL_VERSION")
+        available = self.discover()
+        if BASE_VERSION in available or not available:
+            return BASE_VERSION
+        # Pas de modèle de base : seule la première version publiée peut servir
+        return min(available)
+
+    def candidate_version(self):
+        """Version la plus récente sur disque, postérieure à la version active et jamais rejetée"""
+        active = self._active
+        candidates = [
+            name for name in self.discover()
+            if name != BASE_VERSION and name not in self._rejected
+            and (active is None or active.name == BASE_VERSION or name > active.name)
+        ]
+        return max(candidates) if candidates else None
+
+    # ---------- chargement / activation ----------
+
+    def active(self) -> ModelVersion:
+        """Version active (chargée au premier appel)"""
+        version = self._active
+        if version is None:
+            with self._lock:
+                if self._active is None:
+                    self._active = self.load(self.target_version())
+                    print(f"🤖 Modèle actif: {self._active.name}")
+                version = self._active
+        return version
+
+    def load(self, name: str) -> ModelVersion:
+        """Charge, valide et chauffe une version (réutilise une version déjà chargée)"""
+        with self._lock:
+            if name in self._versions:
+                return self._versions[name]
+        path = self.discover().get(name)
+        if path is None:
+            raise ValueError(f"Version de modèle inconnue: {name}")
+        start = time.perf_counter()
+        version = ModelVersion(name, path, load_bundle(path))
+        if self.engine == "numpy":
+            self._compile(version)
+        self._validate(version)
+        with self._lock:
+            self._versions[name] = version
+        print(f"📦 Modèle {name} chargé et validé en {(time.perf_counter() - start) * 1000:.0f} ms")
+        return version
+
+    def activate(self, name: str) -> ModelVersion:
+        """Charge la version puis l'échange atomiquement avec la version active"""
+        version = self.load(name)
+        with self._lock:
+            previous, self._active = self._active, version
+        if previous is not None and previous is not version:
+            print(f"🔁 Modèle actif: {previous.name} -> {version.name}")
+        return version
+
+    def set_shadow(self, name: str = None, candidate: bool = False):
+        """Active (ou désactive si name est None) le scoring shadow avec une version candidate"""
+        version = self.load(name) if name else None
+        with self._lock:
+            self._shadow = version
+            self._shadow_is_candidate = candidate
+            self.shadow_stats = {"rows": 0, "abs_diff_sum": 0.0, "max_abs_diff": 0.0, "dropped": 0}
+        return version
+
+    def reload(self) -> ModelVersion:
+        """Active la version cible si elle a changé, puis met en shadow une nouvelle candidate
+        (appelé périodiquement).
+
+        Une version qui a échoué à la validation n'est pas retentée à chaque passage.
+        """
+        name = self.target_version()
+        if name not in self._rejected and (self._active is None or self._active.name != name):
+            try:
+                self.activate(name)
+            except Exception:
+                self._rejected.add(name)
+                raise
+        self._shadow_candidate()
+        return self._active
+
+    def _shadow_candidate(self):
+        """Score en shadow la version candidate, sauf si une shadow a été choisie à la main"""
+        if self._shadow is not None and not self._shadow_is_candidate:
+            return
+        name = self.candidate_version()
+        current = self._shadow.name if self._shadow is not None else None
+        if name == current:
+            return
+        if name is None:
+            self.set_shadow(None)
+            return
+        try:
+            self.set_shadow(name, candidate=True)
+        except Exception:
+            self._rejected.add(name)
+            raise
+        print(f"🧪 Version candidate {name} scorée en shadow "
+              f"(POST /humidity/models/{name}/activate pour la promouvoir)")
+
+    def promote(self, name: str) -> ModelVersion:
+        """Active la version et l'écrit dans le fichier ACTIVE (les autres processus la suivront)"""
+        version = self.activate(name)
+        self._rejected.discard(name)
+        (self.model_dir / ACTIVE_FILE).write_text(name + "\n", encoding="utf-8")
+        if self._shadow is version:
+            self.set_shadow(None)
+        return version
+
+    def _compile(self, version: ModelVersion):
+        """Moteur numpy pour cette version, après vérification de la parité avec XGBoost (sinon repli)"""
+        try:
+            diff = tree_engine.attach(version.bundle)
+        except Exception as e:
+            print(f"❌ Moteur numpy indisponible pour {version.name}, repli sur XGBoost: {e}")
+            return
+        ensemble = version.bundle.tree_engine
+        print(f"🌲 Modèle {version.name}: {ensemble.n_trees} arbres aplatis (profondeur {ensemble.depth}, "
+              f"écart max {diff:.1e} avec XGBoost)")
+
+    def _validate(self, version: ModelVersion):
+        """Vérifie que la version encode et prédit des valeurs finies et plausibles sur un échantillon"""
+        bundle = version.bundle
+        rows = [
+            {'region': region, 'departement': departement, 'weather': weather,
+             'temperature': 28.0, 'wind_speed': 4.0, 'date': '2025-06-15 14:00:00'}
+            for region, departement in zip(bundle.encoders['region_dict'], bundle.encoders['departement_dict'])
+            for weather in list(bundle.encoders['weather_order'])[:3]
+        ]
+        predictions = bundle.predict(bundle.encode(rows))
+        if len(predictions) != len(rows) or not np.all(np.isfinite(predictions)):
+            raise ValueError(f"Version {version.name}: prédictions invalides")
+        if np.any(predictions < -50) or np.any(predictions > 150):
+            raise ValueError(f"Version {version.name}: prédictions hors plage plausible")
+        active = self._active
+        if active is not None and list(bundle.features) != list(active.bundle.features):
+            raise ValueError(f"Version {version.name}: features différentes de la version active")
+
+    # ---------- shadow ----------
+
+    def shadow_score(self, X: np.ndarray, predictions):
+        """Score X avec la version shadow hors du chemin de la requête (abandonné si la file est pleine)"""
+        shadow = self._shadow
+        if shadow is None or shadow is self._active:
+            return
+        if not self._shadow_slots.acquire(blocking=False):
+            with self._lock:
+                self.shadow_stats["dropped"] += 1
+            return
+
+        def score():
+            try:
+                diff = np.abs(shadow.predict(X) - np.asarray(predictions, dtype=np.float64))
+                with self._lock:
+                    self.shadow_stats["rows"] += len(diff)
+                    self.shadow_stats["abs_diff_sum"] += float(diff.sum())
+                    self.shadow_stats["max_abs_diff"] = max(self.shadow_stats["max_abs_diff"], float(diff.max()))
+            except Exception as e:
+                print(f"❌ Erreur de scoring shadow ({shadow.name}): {e}")
+            finally:
+                self._shadow_slots.release()
+
+        self._shadow_executor.submit(score)
+
+    # ---------- rechargement à chaud ----------
+
+    def start_polling(self, interval: float):
+        """Vérifie toutes les `interval` secondes si une nouvelle version doit être activée"""
+        if interval <= 0 or self._poller is not None:
+            return
+
+        def poll():
+            while not self._stop.wait(interval):
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"❌ Rechargement du modèle impossible: {e}")
+
+        self._poller = threading.Thread(target=poll, name="model-reload", daemon=True)
+        self._poller.start()
+
+    def stop_polling(self):
+        self._stop.set()
+        self._poller = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            active = self._active
+            shadow = self._shadow
+            loaded = list(self._versions.values())
+            shadow_stats = dict(self.shadow_stats)
+        abs_diff_sum = shadow_stats.pop("abs_diff_sum")
+        shadow_stats["mean_abs_diff"] = round(abs_diff_sum / shadow_stats["rows"], 4) if shadow_stats["rows"] else None
+        return {
+            "active": active.name if active else None,
+            "shadow": shadow.name if shadow else None,
+            "available": list(self.discover()),
+            "versions": [v.stats() for v in loaded],
+            "shadow_comparison": shadow_stats if shadow else None,
+        }
@@ -0,0 +1,222 @@
+"""
+Réentraînement incrémental à partir des relevés stockés (table weather_observations).
+
+    python -m app.ml.retrain
+
+Seuls les relevés postérieurs au watermark (dernier id utilisé) sont lus : le coût
+dépend des nouvelles données, pas de tout l'historique. Le watermark est celui de
+la version active (métadonnée `observations_watermark`) ou, s'il est plus récent,
+celui de la dernière tentative faite depuis cette version (table retrain_state) :
+un candidat rejeté fait lui aussi avancer le watermark, sans quoi la fenêtre
+relue grandirait à chaque rejet.
+
+  - modèle XGBoost : le boosting continue depuis le booster actif
+    (xgb.train(..., xgb_model=booster)), avec RETRAIN_ROUNDS arbres supplémentaires ;
+  - autre modèle : réentraînement du même modèle sur une fenêtre glissante des
+    RETRAIN_WINDOW_DAYS derniers jours.
+
+Les relevés les plus récents (RETRAIN_HOLDOUT) ne servent pas à l'entraînement
+mais à comparer le candidat à la version active ; le candidat n'est promu
+(nouvelle version dans app/ml/models/ + fichier ACTIVE) que s'il fait au moins
+aussi bien. Les relevés d'évaluation serviront à l'entraînement suivant.
+"""
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import select
+
+load_dotenv()
+
+from app.db.database import SessionLocal
+from app.ml.artifacts import write_manifest
+from app.ml.registry import ModelRegistry
+from app.ml.train import evaluate
+from app.models.observations import WeatherObservation
+from app.models.retrain_state import RetrainState
+
+WATERMARK_KEY = "observations_watermark"
+
+
+def load_observations(db, after_id: int = 0, since: datetime = None) -> list:
+    """Relevés d'id > after_id (et observés après `since`), dans l'ordre d'insertion"""
+    statement = select(
+        WeatherObservation.id, WeatherObservation.region, WeatherObservation.departement,
+        WeatherObservation.weather, WeatherObservation.temperature, WeatherObservation.wind_speed,
+        WeatherObservation.humidity, WeatherObservation.observed_at,
+    ).where(WeatherObservation.id > after_id).order_by(WeatherObservation.id)
+    if since is not None:
+        statement = statement.where(WeatherObservation.observed_at >= since)
+    return db.execute(statement.execution_options(yield_per=5000)).all()
+
+
+def load_watermark(db, version: str) -> int:
+    """Watermark de la dernière tentative faite depuis `version` (0 si aucune)"""
+    state = db.get(RetrainState, version)
+    return state.watermark if state is not None else 0
+
+
+def save_attempt(db, version: str, watermark: int, status: str):
+    """Enregistre une tentative depuis `version`, promue ou non"""
+    db.merge(RetrainState(model_version=version, watermark=watermark, status=status,
+                          attempted_at=datetime.now(timezone.utc).replace(tzinfo=None)))
+    db.commit()
+
+
+def to_matrix(bundle, observations: list):
+    """Encode les relevés avec les encoders de la version (mêmes features que le service)"""
+    rows = [
+        {'region': o.region, 'departement': o.departement, 'weather': o.weather,
+         'temperature': o.temperature, 'wind_speed': o.wind_speed, 'date': o.observed_at}
+        for o in observations
+    ]
+    X = bundle.encode(rows)
+    y = np.array([o.humidity for o in observations], dtype=np.float32)
+    return X, y
+
+
+def continue_boosting(bundle, X: np.ndarray, y: np.ndarray, rounds: int, learning_rate: float):
+    """Ajoute `rounds` arbres au booster actif, entraînés sur les nouvelles données uniquement"""
+    import xgboost as xgb
+
+    booster = bundle.booster.copy()
+    if bundle.use_scaler:
+        X = (X - bundle.scaler_mean) / bundle.scaler_scale
+    # Les autres paramètres d'arbre (max_depth, subsample, ...) sont repris de la configuration du booster
+    params = {"objective": "reg:squarederror", "learning_rate": learning_rate, "nthread": os.cpu_count() or 1}
+    dtrain = xgb.DMatrix(X, label=y, feature_names=booster.feature_names)
+    return xgb.train(params, dtrain, num_boost_round=rounds, xgb_model=booster)
+
+
+def refit_window(bundle, X: np.ndarray, y: np.ndarray):
+    """Réentraîne un modèle du même type (mêmes hyperparamètres) sur la fenêtre de relevés"""
+    from sklearn.base import clone
+
+    if bundle.use_scaler:
+        X = (X - bundle.scaler_mean) / bundle.scaler_scale
+    return clone(bundle.model).fit(X, y)
+
+
+def _predict(bundle, model, X: np.ndarray) -> np.ndarray:
+    """Prédit avec `model` en appliquant le scaler du bundle (comme ModelBundle.predict)"""
+    if bundle.use_scaler:
+        X = (X - bundle.scaler_mean) / bundle.scaler_scale
+    if hasattr(model, "inplace_predict"):
+        return model.inplace_predict(X)
+    return model.predict(X)
+
+
+def retrain(registry: ModelRegistry, db, min_rows: int = 200, holdout: float = 0.2, rounds: int = 50,
+            learning_rate: float = 0.05, window_days: int = 30, tolerance: float = 0.0) -> dict:
+    """Entraîne un candidat sur les nouveaux relevés, l'évalue et le promeut s'il fait au moins aussi bien"""
+    current = registry.load(registry.target_version())
+    bundle = current.bundle
+    incremental = bundle.booster is not None
+    watermark = max(int(bundle.metadata.get(WATERMARK_KEY) or 0), load_watermark(db, current.name))
+
+    since = None if incremental else datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=window_days)
+    observations = load_observations(db, after_id=watermark if incremental else 0, since=since)
+    if len(observations) < min_rows:
+        print(f"⏭️ Réentraînement ignoré: {len(observations)} nouveau(x) relevé(s) (minimum {min_rows})")
+        return {"status": "skipped", "version": current.name, "rows": len(observations)}
+
+    # Les relevés les plus récents servent d'évaluation
+    split = int(len(observations) * (1 - holdout))
+    train_rows, eval_rows = observations[:split], observations[split:]
+    X_train, y_train = to_matrix(bundle, train_rows)
+    X_eval, y_eval = to_matrix(bundle, eval_rows)
+
+    start = time.perf_counter()
+    if incremental:
+        model = continue_boosting(bundle, X_train, y_train, rounds, learning_rate)
+        method = "continued_boosting"
+    else:
+        model = refit_window(bundle, X_train, y_train)
+        method = "sliding_window"
+    fit_seconds = time.perf_counter() - start
+
+    current_metrics = evaluate(y_eval, bundle.predict(X_eval))
+    candidate_metrics = evaluate(y_eval, _predict(bundle, model, X_eval))
+    result = {
+        "method": method,
+        "parent_version": current.name,
+        "train_rows": len(train_rows),
+        "eval_rows": len(eval_rows),
+        "fit_seconds": round(fit_seconds, 3),
+        "current_rmse": current_metrics["RMSE"],
+        "candidate_rmse": candidate_metrics["RMSE"],
+    }
+    # Les relevés d'évaluation n'ont pas servi : ils seront repris au prochain passage
+    new_watermark = train_rows[-1].id if incremental else 0
+    print(f"🔁 Réentraînement ({method}) sur {len(train_rows)} relevé(s) en {fit_seconds:.1f}s : "
+          f"RMSE {current_metrics['RMSE']:.2f} (actuel) -> {candidate_metrics['RMSE']:.2f} (candidat)")
+
+    if candidate_metrics["RMSE"] > current_metrics["RMSE"] * (1 + tolerance):
+        print("✋ Candidat non promu: pas meilleur que la version active")
+        save_attempt(db, current.name, new_watermark, "rejected")
+        return dict(result, status="rejected", version=current.name)
+
+    version = _new_version_name(registry.model_dir)
+    metadata = dict(
+        bundle.metadata,
+        model_name=bundle.metadata.get("model_name", "XGBoost"),
+        training_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        train_rmse=candidate_metrics["RMSE"],
+        train_mae=candidate_metrics["MAE"],
+        train_r2=candidate_metrics["R²"],
+        retrain=result,
+        **{WATERMARK_KEY: new_watermark},
+    )
+    scaler = _scaler(bundle) if bundle.use_scaler else None
+    write_manifest(registry.model_dir / version, model, bundle.encoders, bundle.features, metadata,
+                   bundle.use_scaler, scaler)
+    registry.promote(version)
+    save_attempt(db, current.name, new_watermark, "promoted")
+    print(f"🚀 Version {version} promue")
+    return dict(result, status="promoted", version=version)
+
+
+def _new_version_name(model_dir) -> str:
+    """vAAAAMMJJ-HHMMSS, suffixé si ce dossier existe déjà (une version publiée n'est jamais écrasée)"""
+    base = datetime.now().strftime("v%Y%m%d-%H%M%S")
+    version, n = base, 1
+    while (model_dir / version).exists():
+        n += 1
+        version = f"{base}-{n}"
+    return version
+
+
+def _scaler(bundle):
+    from sklearn.preprocessing import StandardScaler
+    scaler = StandardScaler()
+    scaler.mean_ = bundle.scaler_mean
+    scaler.scale_ = bundle.scaler_scale
+    return scaler
+
+
+def run_retrain(registry: ModelRegistry = None) -> dict:
+    """Job planifié : réentraînement incrémental (RETRAIN_* pour le paramétrer)"""
+    if registry is None:
+        from app.ml.predictor import registry
+    db = SessionLocal()
+    try:
+        return retrain(
+            registry, db,
+            min_rows=int(os.getenv("RETRAIN_MIN_ROWS", "200")),
+            holdout=float(os.getenv("RETRAIN_HOLDOUT", "0.2")),
+            rounds=int(os.getenv("RETRAIN_ROUNDS", "50")),
+            learning_rate=float(os.getenv("RETRAIN_LEARNING_RATE", "0.05")),
+            window_days=int(os.getenv("RETRAIN_WINDOW_DAYS", "30")),
+            tolerance=float(os.getenv("RETRAIN_TOLERANCE", "0")),
+        )
+    except Exception as e:
+        print(f"❌ Erreur dans le job de réentraînement: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print(run_retrain())
@@ -0,0 +1,424 @@
+"""
+Entraînement du modèle d'humidité (remplace humidity_prediction_final.py).
+
+    python -m app.ml.train --data meteo_departements_Senegal.csv [--plots images]
+
+Étapes :
+  1. préparation des données (nettoyage, encodage, split, scaler), mise en cache
+     dans un .npz dont le nom dépend du hash du CSV : un second lancement sur les
+     mêmes données ne relit pas le CSV ;
+  2. entraînement des modèles candidats en parallèle (un processus par modèle,
+     `--threads-per-model` threads chacun) ;
+  3. le meilleur modèle (RMSE sur le test) est écrit tel quel, sans réentraînement,
+     au format de service dans app/ml/models/<version>/ ; le registre des modèles
+     la score en shadow au prochain rechargement, sans l'activer : la mise en
+     production passe par POST /humidity/models/<version>/activate ;
+  4. graphiques optionnels (`--plots`), matplotlib n'est importé que dans ce cas.
+
+Avec `--tune`, une recherche d'hyperparamètres bornée dans le temps (app/ml/tuning.py)
+précède l'étape 2 : les meilleures configurations de XGBoost et Random Forest sont
+ajoutées aux candidats sous les noms "XGBoost (tuned)" et "Random Forest (tuned)".
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from app.ml.artifacts import write_manifest
+
+MODELS_DIR = Path(__file__).parent / "models"
+
+# À incrémenter si la préparation change : invalide les caches existants
+PREPROCESSING_VERSION = 1
+
+FEATURE_COLUMNS = [
+    'region_code',
+    'departement_code',
+    'weather_code',
+    'temperature',
+    'wind_speed',
+    'mois',
+    'jour',
+    'heure'
+]
+
+# Encodage de weather avec un ordre logique
+WEATHER_ORDER = {
+    'clear sky': 0,
+    'few clouds': 1,
+    'scattered clouds': 2,
+    'broken clouds': 3,
+    'overcast clouds': 4,
+    'light rain': 5,
+    'moderate rain': 6,
+    'heavy rain': 7,
+    'thunderstorm with rain': 8
+}
+
+# Suffixe des candidats issus de la recherche d'hyperparamètres
+TUNED_SUFFIX = " (tuned)"
+
+# Modèles entraînés sur les données standardisées
+SCALED_MODELS = {'Linear Regression', 'Ridge', 'Lasso', 'ElasticNet'}
+
+# Ordre de soumission : les plus longs d'abord pour mieux remplir le pool
+CANDIDATES = [
+    'Gradient Boosting',
+    'Random Forest',
+    'XGBoost',
+    'Decision Tree',
+    'ElasticNet',
+    'Lasso',
+    'Ridge',
+    'Linear Regression',
+]
+
+
+def make_model(name: str, n_jobs: int = 1, params: dict = None):
+    """Instancie un modèle candidat avec au plus `n_jobs` threads (et des hyperparamètres éventuels)"""
+    model = _make_base_model(name.removesuffix(TUNED_SUFFIX), n_jobs)
+    if params:
+        model.set_params(**params)
+    return model
+
+
+def _make_base_model(name: str, n_jobs: int):
+    from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+    from sklearn.linear_model import ElasticNet, Lasso, LinearRegression, Ridge
+    from sklearn.tree import DecisionTreeRegressor
+
+    if name == 'Linear Regression':
+        return LinearRegression()
+    if name == 'Ridge':
+        return Ridge()
+    if name == 'Lasso':
+        return Lasso()
+    if name == 'ElasticNet':
+        return ElasticNet()
+    if name == 'Random Forest':
+        return RandomForestRegressor(random_state=42, n_jobs=n_jobs)
+    if name == 'Gradient Boosting':
+        return GradientBoostingRegressor(random_state=42)
+    if name == 'Decision Tree':
+        return DecisionTreeRegressor(random_state=42)
+    if name == 'XGBoost':
+        import xgboost as xgb
+        return xgb.XGBRegressor(random_state=42, n_jobs=n_jobs)
+    raise ValueError(f"Modèle inconnu: {name}")
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def preprocess(csv_path: Path) -> dict:
+    """Lit le CSV et construit les matrices train/test, les encoders et le scaler"""
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    df = pd.read_csv(csv_path)
+    print(f"✅ Données chargées: {df.shape[0]} lignes, {df.shape[1]} colonnes")
+    df = df.drop_duplicates().copy()
+    print(f"✅ Doublons supprimés. Données après nettoyage: {df.shape[0]} lignes")
+
+    df['date'] = pd.to_datetime(df['date'])
+    df['mois'] = df['date'].dt.month
+    df['jour'] = df['date'].dt.day
+    df['heure'] = df['date'].dt.hour
+
+    encoders = {
+        'region_dict': {val: idx for idx, val in enumerate(df['region'].unique())},
+        'departement_dict': {val: idx for idx, val in enumerate(df['departement'].unique())},
+        'weather_order': WEATHER_ORDER,
+    }
+    df['region_code'] = df['region'].map(encoders['region_dict'])
+    df['departement_code'] = df['departement'].map(encoders['departement_dict'])
+    df['weather_code'] = df['weather'].map(WEATHER_ORDER).fillna(4)
+
+    X = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    y = df['humidity'].to_numpy(dtype=np.float64)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    scaler = StandardScaler().fit(X_train)
+    return {
+        "X_train": X_train, "X_test": X_test, "y_train": y_train, "y_test": y_test,
+        "scaler_mean": scaler.mean_, "scaler_scale": scaler.scale_, "scaler_var": scaler.var_,
+        "encoders": encoders,
+    }
+
+
+def load_dataset(csv_path: Path, cache_dir: Path = None) -> dict:
+    """Données préparées, depuis le cache .npz (clé = hash du CSV) si possible"""
+    csv_path = Path(csv_path)
+    data_hash = file_hash(csv_path)
+    cache_path = Path(cache_dir) / f"features-{data_hash[:16]}-v{PREPROCESSING_VERSION}.npz" if cache_dir else None
+    if cache_path is not None and cache_path.exists():
+        with np.load(cache_path) as cached:
+            data = {key: cached[key] for key in cached.files if key != "encoders"}
+            data["encoders"] = json.loads(str(cached["encoders"]))
+        print(f"♻️ Données préparées lues depuis le cache: {cache_path}")
+    else:
+        data = preprocess(csv_path)
+        if cache_path is not None:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            arrays = {key: value for key, value in data.items() if key != "encoders"}
+            tmp_path = cache_path.with_suffix(".tmp.npz")
+            np.savez(tmp_path, encoders=json.dumps(data["encoders"], ensure_ascii=False), **arrays)
+            os.replace(tmp_path, cache_path)
+            print(f"💾 Données préparées mises en cache: {cache_path}")
+    data["data_hash"] = data_hash
+    return data
+
+
+def make_scaler(data: dict):
+    """StandardScaler reconstruit depuis les paramètres en cache (pour le manifeste)"""
+    from sklearn.preprocessing import StandardScaler
+    scaler = StandardScaler()
+    scaler.mean_ = data["scaler_mean"]
+    scaler.scale_ = data["scaler_scale"]
+    scaler.var_ = data["scaler_var"]
+    scaler.n_features_in_ = len(FEATURE_COLUMNS)
+    return scaler
+
+
+def evaluate(y_true: np.ndarray, y_pred: np.ndarray) -> dict:
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+    mse = mean_squared_error(y_true, y_pred)
+    return {
+        'RMSE': float(np.sqrt(mse)),
+        'MAE': float(mean_absolute_error(y_true, y_pred)),
+        'R²': float(r2_score(y_true, y_pred)),
+        'MSE': float(mse),
+    }
+
+
+# Données du processus worker (envoyées une seule fois par processus, pas à chaque tâche)
+_worker_data = None
+
+
+def _init_worker(data: dict):
+    global _worker_data
+    _worker_data = data
+
+
+def fit_candidate(name: str, threads: int = 1, data: dict = None, params: dict = None) -> dict:
+    """Entraîne et évalue un candidat ; retourne le modèle entraîné et ses métriques"""
+    from threadpoolctl import threadpool_limits
+
+    data = data if data is not None else _worker_data
+    X_train, X_test = data["X_train"], data["X_test"]
+    if name in SCALED_MODELS:
+        X_train = (X_train - data["scaler_mean"]) / data["scaler_scale"]
+        X_test = (X_test - data["scaler_mean"]) / data["scaler_scale"]
+
+    start = time.perf_counter()
+    # Borne aussi les threads BLAS / OpenMP des modèles sans paramètre n_jobs
+    with threadpool_limits(limits=threads):
+        model = make_model(name, n_jobs=threads, params=params)
+        model.fit(X_train, data["y_train"])
+        y_pred = model.predict(X_test)
+    return {
+        "name": name,
+        "model": model,
+        "metrics": evaluate(data["y_test"], y_pred),
+        "y_pred": y_pred,
+        "fit_seconds": time.perf_counter() - start,
+        "params": params,
+    }
+
+
+def fit_candidates(data: dict, names: list, jobs: int, threads_per_model: int, params: dict = None) -> list:
+    """Entraîne les candidats, en parallèle sur `jobs` processus si jobs > 1.
+
+    `params` : hyperparamètres par candidat ({nom: {...}}), par défaut ceux de make_model.
+    """
+    params = params or {}
+    results = []
+    if jobs <= 1:
+        for name in names:
+            print(f"🔧 Entraînement: {name}...")
+            results.append(fit_candidate(name, threads_per_model, data, params.get(name)))
+            _print_result(results[-1])
+        return results
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(data,)) as pool:
+        futures = {pool.submit(fit_candidate, name, threads_per_model, None, params.get(name)): name for name in names}
+        for future in as_completed(futures):
+            results.append(future.result())
+            _print_result(results[-1])
+    return results
+
+
+def _print_result(result: dict):
+    metrics = result["metrics"]
+    print(f"   - {result['name']}: RMSE: {metrics['RMSE']:.2f}, MAE: {metrics['MAE']:.2f}, "
+          f"R²: {metrics['R²']:.4f} ({result['fit_seconds']:.1f}s)")
+
+
+def results_table(results: list) -> str:
+    lines = [f"{'Model':<24} {'RMSE':>8} {'MAE':>8} {'R²':>8} {'Fit (s)':>8}"]
+    for r in results:
+        m = r["metrics"]
+        lines.append(f"{r['name']:<24} {m['RMSE']:>8.2f} {m['MAE']:>8.2f} {m['R²']:>8.4f} {r['fit_seconds']:>8.1f}")
+    return "\n".join(lines)
+
+
+def save_version(best: dict, results: list, data: dict, output_dir: Path, version: str) -> Path:
+    """Écrit le meilleur modèle au format de service dans output_dir/version (+ résumé lisible)"""
+    version_dir = Path(output_dir) / version
+    use_scaler = best["name"] in SCALED_MODELS
+    metrics = best["metrics"]
+    metadata = {
+        'model_name': best["name"],
+        'use_scaler': use_scaler,
+        'feature_columns': FEATURE_COLUMNS,
+        'train_rmse': metrics['RMSE'],
+        'train_mae': metrics['MAE'],
+        'train_r2': metrics['R²'],
+        'training_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'n_samples_train': len(data["X_train"]),
+        'n_samples_test': len(data["X_test"]),
+        'data_hash': data["data_hash"],
+        'candidates': [{"model": r["name"], **r["metrics"]} for r in results],
+        'params': best["params"],
+    }
+    write_manifest(version_dir, best["model"], data["encoders"], FEATURE_COLUMNS, metadata,
+                   use_scaler, make_scaler(data) if use_scaler else None)
+
+    with open(version_dir / "model_summary.txt", "w", encoding="utf-8") as f:
+        f.write("=" * 50 + "\nRÉSUMÉ DU MEILLEUR MODÈLE\n" + "=" * 50 + "\n\n")
+        f.write(f"📅 Date d'entraînement: {metadata['training_date']}\n")
+        f.write(f"🏆 Modèle: {best['name']} (version {version})\n")
+        f.write(f"📊 Performance:\n   - RMSE: {metrics['RMSE']:.2f}\n   - MAE: {metrics['MAE']:.2f}\n   - R²: {metrics['R²']:.4f}\n\n")
+        f.write(f"📈 Données (sha256 {data['data_hash'][:16]}):\n")
+        f.write(f"   - Échantillons d'entraînement: {metadata['n_samples_train']}\n")
+        f.write(f"   - Échantillons de test: {metadata['n_samples_test']}\n\n")
+        f.write(f"🔧 Utilise le scaler: {use_scaler}\n\n")
+        f.write("=" * 50 + "\nComparaison avec autres modèles:\n" + "=" * 50 + "\n")
+        f.write(results_table(results) + "\n")
+    return version_dir
+
+
+def plot_results(best: dict, results: list, data: dict, directory: Path):
+    """Graphiques : comparaison des modèles, prédictions vs réalité, importance des features"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    top = results[:5]
+    plt.figure(figsize=(10, 6))
+    plt.barh([r["name"] for r in top], [r["metrics"]["RMSE"] for r in top])
+    plt.xlabel('RMSE (Root Mean Squared Error)')
+    plt.title('Comparaison des 5 meilleurs modèles')
+    plt.gca().invert_yaxis()
+    plt.tight_layout()
+    plt.savefig(directory / 'model_comparison.png', dpi=150, bbox_inches='tight')
+    plt.close()
+
+    y_test = data["y_test"]
+    plt.figure(figsize=(10, 6))
+    plt.scatter(y_test, best["y_pred"], alpha=0.5)
+    plt.plot([y_test.min(), y_test.max()], [y_test.min(), y_test.max()], 'r--', lw=2)
+    plt.xlabel('Valeurs réelles')
+    plt.ylabel('Prédictions')
+    plt.title(f'Prédictions vs Réalité - {best["name"]}')
+    plt.tight_layout()
+    plt.savefig(directory / 'predictions_vs_reality.png', dpi=150, bbox_inches='tight')
+    plt.close()
+
+    if hasattr(best["model"], 'feature_importances_'):
+        order = np.argsort(best["model"].feature_importances_)
+        plt.figure(figsize=(10, 6))
+        plt.barh([FEATURE_COLUMNS[i] for i in order], best["model"].feature_importances_[order])
+        plt.xlabel('Importance')
+        plt.title(f'Importance des caractéristiques - {best["name"]}')
+        plt.tight_layout()
+        plt.savefig(directory / 'feature_importance.png', dpi=150, bbox_inches='tight')
+        plt.close()
+    print(f"✅ Graphiques sauvés dans {directory}/")
+
+
+def parse_args(argv=None):
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Entraîne les modèles d'humidité et publie le meilleur")
+    parser.add_argument("--data", default="meteo_departements_Senegal.csv", help="CSV des relevés météo")
+    parser.add_argument("--models", default=",".join(CANDIDATES), help="Candidats séparés par des virgules")
+    parser.add_argument("--jobs", type=int, default=None, help="Nombre de processus (défaut: min(candidats, CPU))")
+    parser.add_argument("--threads-per-model", type=int, default=None, help="Threads par modèle (défaut: CPU / jobs)")
+    parser.add_argument("--cache-dir", default=".cache/training", help="Cache des données préparées ('' pour désactiver)")
+    parser.add_argument("--output", default=str(MODELS_DIR), help="Dossier des versions du modèle")
+    parser.add_argument("--version", default=None, help="Nom de la version (défaut: vAAAAMMJJ-HHMMSS)")
+    parser.add_argument("--plots", default=None, help="Dossier des graphiques (aucun graphique si absent)")
+    parser.add_argument("--tune", action="store_true", help="Recherche d'hyperparamètres XGBoost / Random Forest")
+    parser.add_argument("--tune-budget", type=float, default=600, help="Budget de la recherche en secondes")
+    parser.add_argument("--tune-trials", type=int, default=27, help="Configurations tirées par modèle au premier tour")
+    parser.add_argument("--tune-log", default=None, help="Journal JSONL des essais (défaut: dans --cache-dir)")
+    parser.add_argument("--max-latency-ms", type=float, default=None,
+                        help="Latence max d'une prédiction unitaire pour retenir une configuration")
+    args = parser.parse_args(argv)
+    args.models = [name.strip() for name in args.models.split(",") if name.strip()]
+    args.jobs = args.jobs or max(1, min(len(args.models), cpus))
+    args.threads_per_model = args.threads_per_model or max(1, cpus // args.jobs)
+    args.version = args.version or datetime.now().strftime("v%Y%m%d-%H%M%S")
+    return args
+
+
+def main(argv=None) -> Path:
+    args = parse_args(argv)
+    start = time.perf_counter()
+    data = load_dataset(args.data, args.cache_dir or None)
+    print(f"✅ Split train/test (80/20): {len(data['X_train'])} / {len(data['X_test'])} échantillons "
+          f"({time.perf_counter() - start:.1f}s)")
+
+    params = {}
+    if args.tune:
+        from app.ml.tuning import TUNED_MODELS, tune
+        log_path = args.tune_log or (Path(args.cache_dir) / f"tuning-{data['data_hash'][:16]}.jsonl" if args.cache_dir else None)
+        print(f"\n🔎 Recherche d'hyperparamètres (budget {args.tune_budget:.0f}s, journal: {log_path})")
+        tuned = tune(data, [m for m in TUNED_MODELS if m in args.models], budget=args.tune_budget,
+                     jobs=args.jobs, threads=args.threads_per_model, n_trials=args.tune_trials,
+                     log_path=log_path, max_latency_ms=args.max_latency_ms)
+        for model_name, trial in tuned.items():
+            name = model_name + TUNED_SUFFIX
+            args.models.append(name)
+            params[name] = dict(trial["params"], n_estimators=trial["n_estimators"])
+
+    print(f"\n🔧 Entraînement de {len(args.models)} modèles: {args.jobs} processus x {args.threads_per_model} thread(s)")
+    fit_start = time.perf_counter()
+    results = fit_candidates(data, args.models, args.jobs, args.threads_per_model, params)
+    results.sort(key=lambda r: r["metrics"]["RMSE"])
+    print(f"\n📊 Résultats par RMSE (entraînement: {time.perf_counter() - fit_start:.1f}s):")
+    print(results_table(results))
+
+    # Le meilleur modèle a déjà été entraîné sur le jeu d'entraînement : pas de réentraînement
+    best = results[0]
+    print(f"\n🏆 Meilleur modèle: {best['name']}")
+    if hasattr(best["model"], 'feature_importances_'):
+        print("📊 Importance des caractéristiques:")
+        for i in np.argsort(best["model"].feature_importances_)[::-1]:
+            print(f"   - {FEATURE_COLUMNS[i]}: {best['model'].feature_importances_[i]:.4f}")
+
+    version_dir = save_version(best, results, data, args.output, args.version)
+    print(f"✅ Version {args.version} écrite: {version_dir}")
+
+    if args.plots:
+        plot_results(best, results, data, args.plots)
+    print(f"\n✅ Entraînement terminé en {time.perf_counter() - start:.1f}s")
+    return version_dir
+
+
+if __name__ == "__main__":
+    main()
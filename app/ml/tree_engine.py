@@ -0,0 +1,242 @@
+"""
+Évaluation des arbres XGBoost sans passer par la librairie (INFERENCE_ENGINE=numpy).
+
+Les arbres du booster (dump JSON) sont recopiés dans des tas complets, aplatis en
+trois tableaux NumPy : colonne lue et seuil de chaque split, valeur de chaque
+feuille. Pour un bloc de lignes, tous les splits sont évalués en une comparaison,
+puis chaque niveau de descente n'est qu'un np.take et trois opérations entières
+(enfant = 2p + droite), pour tous les arbres et toutes les lignes à la fois.
+
+Les tampons et index sont préparés une fois par thread pour `block_rows` lignes :
+un appel n'alloue que le tableau de résultats. Le coût fixe d'inplace_predict
+(validation de l'entrée, dispatch vers le pool de threads d'XGBoost) disparaît,
+ce qui profite à une ligne ou à un petit lot ; au-delà de `block_rows` lignes,
+XGBoost (multi-thread) reste plus rapide et ModelBundle.predict le garde.
+
+Mêmes conventions qu'XGBoost : gauche si x < seuil (float32), branche par défaut
+si x est NaN, somme des feuilles en float32 dans l'ordre des arbres à partir de
+base_score. Seuls les modèles gbtree à une cible (reg:squarederror, reg:absoluteerror...)
+sans split catégoriel sont pris en charge.
+
+Comparaison des latences avec XGBoost: python -m benchmarks.bench_tree_engine
+"""
+import json
+import threading
+
+import numpy as np
+
+ENGINES = ("xgboost", "numpy")
+
+# Objectifs dont la prédiction est la marge brute (pas de transformation finale)
+IDENTITY_OBJECTIVES = ("reg:squarederror", "reg:squaredlogerror", "reg:pseudohubererror",
+                       "reg:absoluteerror", "reg:quantileerror")
+
+# Au-delà, le tas complet de chaque arbre (2^(profondeur+1) nœuds) devient trop gros
+MAX_DEPTH = 12
+
+
+class TreeEnsemble:
+    """Arbres d'un booster XGBoost aplatis en tableaux, évalués par blocs de quelques lignes"""
+
+    def __init__(self, trees: list, base_score: float, num_feature: int, block_rows: int = 4):
+        depth = max(_depth(tree["left_children"], tree["right_children"]) for tree in trees)
+        if depth > MAX_DEPTH:
+            raise ValueError(f"Arbres trop profonds ({depth} > {MAX_DEPTH})")
+        # Chaque arbre est un tas complet : nœud p -> enfants 2p et 2p + 1, racine en 1,
+        # splits en 1..half-1, feuilles en half..2*half-1. Split global = arbre * half + p.
+        half = 2 ** depth
+        n_trees = len(trees)
+        # Colonne lue dans la ligne étendue : feature, ou feature + num_feature si la valeur
+        # manquante va à droite (voir _predict_block). Seuil NaN : toujours à gauche.
+        self.feature = np.zeros(n_trees * half, dtype=np.intp)
+        self.threshold = np.full(n_trees * half, np.nan, dtype=np.float32)
+        # Feuille p de l'arbre t en t * half + p : les plages [(t+1) * half, (t+2) * half[ sont disjointes
+        self.leaf_value = np.zeros((n_trees + 1) * half, dtype=np.float32)
+        for t, tree in enumerate(trees):
+            self._place(tree, t * half, depth, num_feature)
+
+        self.n_trees = n_trees
+        self.depth = depth
+        self.half = half
+        self.base_score = np.float32(base_score)
+        self.num_feature = num_feature
+        self.block_rows = block_rows
+        self._local = threading.local()
+
+    def _place(self, tree: dict, base: int, depth: int, num_feature: int):
+        """Recopie un arbre XGBoost dans son tas ; une feuille peu profonde est prolongée
+        jusqu'au dernier niveau par des nœuds de seuil NaN"""
+        left, right = tree["left_children"], tree["right_children"]
+        features, conditions, default_left = tree["split_indices"], tree["split_conditions"], tree["default_left"]
+        stack = [(0, 1, 0)]
+        while stack:
+            node, position, level = stack.pop()
+            index = base + position
+            if left[node] == -1:
+                if level == depth:
+                    self.leaf_value[index] = conditions[node]
+                else:
+                    stack.append((node, 2 * position, level + 1))
+                continue
+            self.feature[index] = features[node] + (0 if default_left[node] else num_feature)
+            self.threshold[index] = conditions[node]
+            stack.append((left[node], 2 * position, level + 1))
+            stack.append((right[node], 2 * position + 1, level + 1))
+
+    @classmethod
+    def from_booster(cls, booster, block_rows: int = 4):
+        """Aplatit un xgboost.Booster (ou XGBRegressor) ; ValueError si le modèle n'est pas pris en charge"""
+        if hasattr(booster, "get_booster"):
+            booster = booster.get_booster()
+        learner = json.loads(booster.save_raw("json"))["learner"]
+        gbm = learner["gradient_booster"]
+        objective = learner["objective"]["name"]
+        params = learner["learner_model_param"]
+        if gbm["name"] != "gbtree":
+            raise ValueError(f"Booster {gbm['name']} non pris en charge (gbtree uniquement)")
+        if objective not in IDENTITY_OBJECTIVES:
+            raise ValueError(f"Objectif {objective} non pris en charge")
+        if int(params.get("num_target", "1")) > 1 or int(params.get("num_class", "0")) > 1:
+            raise ValueError("Modèle multi-cible non pris en charge")
+        trees = gbm["model"]["trees"]
+        if any(tree["categories_nodes"] for tree in trees):
+            raise ValueError("Splits catégoriels non pris en charge")
+        # XGBoost 2 écrit base_score sous forme "[5.9E1]" pour les modèles multi-cibles
+        base_score = float(params["base_score"].strip("[]"))
+        return cls(trees, base_score, int(params["num_feature"]), block_rows)
+
+    def _workspace(self):
+        """Tampons et index du thread courant pour un bloc de block_rows lignes"""
+        workspace = getattr(self._local, "workspace", None)
+        if workspace is None:
+            rows = np.arange(self.block_rows, dtype=np.intp)[:, None]
+            splits = self.n_trees * self.half
+            trees = np.arange(self.n_trees, dtype=np.intp)[None, :] * self.half
+            workspace = {
+                "extended": np.empty((self.block_rows, 2 * self.num_feature), dtype=np.float32),
+                "value": np.empty((self.block_rows, splits), dtype=np.float32),
+                "right": np.empty((self.block_rows, splits), dtype=bool),
+                "node": np.empty((self.block_rows, self.n_trees), dtype=np.intp),
+                "step": np.empty((self.block_rows, self.n_trees), dtype=bool),
+                # Colonne 0 : base_score, puis une feuille par arbre
+                "leaves": np.empty((self.block_rows, self.n_trees + 1), dtype=np.float32),
+                # Position dans la ligne étendue aplatie de la valeur lue par chaque split
+                "gather": rows * 2 * self.num_feature + self.feature[None, :],
+                # Nœud courant = ligne * splits + arbre * half + p ; offset = ligne * splits + arbre * half
+                "offset": rows * splits + trees,
+                "row_offset": rows * splits,
+            }
+            workspace["roots"] = workspace["offset"] + 1
+            self._local.workspace = workspace
+        return workspace
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Prédictions float32 pour X (n lignes x num_feature), par blocs de block_rows lignes"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.num_feature:
+            raise ValueError(f"Entrée de forme {X.shape}, {self.num_feature} features attendues")
+        out = np.empty(len(X), dtype=np.float32)
+        workspace = self._workspace()
+        for start in range(0, len(X), self.block_rows):
+            block = X[start:start + self.block_rows]
+            self._predict_block(block, out[start:start + len(block)], workspace)
+        return out
+
+    def _predict_block(self, X: np.ndarray, out: np.ndarray, workspace: dict):
+        n, features = X.shape
+        extended = workspace["extended"][:n]
+        right = workspace["right"][:n]
+        node = workspace["node"][:n]
+        step = workspace["step"][:n]
+        offset = workspace["offset"][:n]
+        leaves = workspace["leaves"][:n]
+
+        # Ligne étendue : X avec NaN -> -inf (va à gauche), puis X avec NaN -> +inf (va à droite).
+        # La branche par défaut de chaque split est ainsi portée par la colonne qu'il lit.
+        np.fmax(X, -np.inf, out=extended[:, :features])
+        np.fmin(X, np.inf, out=extended[:, features:])
+
+        # Tous les splits d'un coup ; même test qu'XGBoost (gauche si x < seuil)
+        value = np.take(extended.reshape(-1), workspace["gather"][:n], out=workspace["value"][:n], mode="clip")
+        np.greater_equal(value, self.threshold, out=right)
+
+        # Descente : enfant = offset + 2p + droite = 2 * nœud - offset + droite
+        right = right.reshape(-1)
+        node[:] = workspace["roots"][:n]
+        for _ in range(self.depth):
+            np.take(right, node, out=step, mode="clip")
+            node <<= 1
+            node -= offset
+            node += step
+
+        # Somme séquentielle en float32, dans l'ordre des arbres, comme XGBoost
+        node -= workspace["row_offset"][:n]
+        leaves[:, 0] = self.base_score
+        np.take(self.leaf_value, node, out=leaves[:, 1:], mode="clip")
+        np.add.accumulate(leaves, axis=1, out=leaves)
+        out[:] = leaves[:, -1]
+
+
+def _depth(left: list, right: list) -> int:
+    """Profondeur maximale d'un arbre XGBoost (nombre de splits de la racine à la feuille la plus basse)"""
+    depth, level = 0, [0]
+    while True:
+        level = [child for node in level if left[node] != -1 for child in (left[node], right[node])]
+        if not level:
+            return depth
+        depth += 1
+
+
+def verify_parity(ensemble: TreeEnsemble, booster, X: np.ndarray, tolerance: float = 1e-3) -> float:
+    """Compare l'ensemble aplati au booster sur X (NaN compris) ; écart max, ValueError au-delà de tolerance"""
+    X = np.asarray(X, dtype=np.float32)
+    expected = np.asarray(booster.inplace_predict(X), dtype=np.float32)
+    actual = ensemble.predict(X)
+    diff = float(np.max(np.abs(actual - expected))) if len(X) else 0.0
+    if not diff <= tolerance:
+        raise ValueError(f"Écart de {diff:.2e} avec XGBoost (tolérance {tolerance:.0e})")
+    return diff
+
+
+def parity_sample(X: np.ndarray, seed: int = 0) -> np.ndarray:
+    """X, plus des lignes perturbées et des valeurs manquantes, pour couvrir les deux branches des splits"""
+    rng = np.random.default_rng(seed)
+    X = np.asarray(X, dtype=np.float32)
+    noisy = X + rng.normal(0, 1, X.shape).astype(np.float32) * X.std(axis=0, dtype=np.float32)
+    missing = X.copy()
+    missing[rng.random(X.shape) < 0.2] = np.nan
+    return np.concatenate([X, noisy, missing])
+
+
+def sample_rows(encoders: dict, n: int, seed: int = 0) -> list:
+    """Entrées aléatoires couvrant tous les départements et types de météo"""
+    rng = np.random.default_rng(seed)
+    regions = list(encoders['region_dict'])
+    departements = list(encoders['departement_dict'])
+    weathers = list(encoders['weather_order']) + ["unknown"]
+    return [
+        {
+            'region': regions[rng.integers(len(regions))],
+            'departement': departements[i % len(departements)],
+            'weather': weathers[rng.integers(len(weathers))],
+            'temperature': float(rng.uniform(10, 48)),
+            'wind_speed': float(rng.uniform(0, 20)),
+            'date': f"2025-{rng.integers(1, 13):02d}-{rng.integers(1, 29):02d} {rng.integers(0, 24):02d}:00:00",
+        }
+        for i in range(n)
+    ]
+
+
+def attach(bundle, rows: int = 1000, tolerance: float = 1e-3) -> float:
+    """Aplatit le booster du bundle et l'utilise pour ses prédictions si la parité est vérifiée.
+
+    Retourne l'écart max avec XGBoost ; ValueError (bundle inchangé) si le modèle
+    n'est pas pris en charge ou si l'écart dépasse `tolerance`.
+    """
+    if bundle.booster is None:
+        raise ValueError("Modèle non XGBoost")
+    ensemble = TreeEnsemble.from_booster(bundle.booster)
+    X = bundle.prepare(bundle.encode(sample_rows(bundle.encoders, rows)))
+    diff = verify_parity(ensemble, bundle.booster, parity_sample(X), tolerance)
+    bundle.tree_engine = ensemble
+    return diff
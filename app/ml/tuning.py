@@ -0,0 +1,271 @@
+"""
+Recherche d'hyperparamètres par successive halving, bornée dans le temps.
+
+Pour chaque modèle (XGBoost, Random Forest), `n_trials` configurations tirées au
+hasard sont évaluées avec peu d'arbres sur un jeu de validation extrait du jeu
+d'entraînement ; le meilleur tiers passe au tour suivant avec 3 fois plus d'arbres,
+et ainsi de suite. XGBoost utilise en plus l'early stopping sur la validation.
+
+Chaque essai est ajouté à un journal JSONL dès qu'il se termine : relancer la
+recherche avec le même journal réutilise les essais déjà faits. Pour chaque essai,
+on mesure aussi la latence d'inférence (une ligne, et par ligne sur un lot) pour
+pouvoir choisir un modèle à la fois précis et peu coûteux à servir.
+
+Utilisé par `python -m app.ml.train --tune`.
+"""
+import hashlib
+import json
+import math
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from app.ml import train
+
+TUNED_MODELS = ['XGBoost', 'Random Forest']
+
+# Nombre d'arbres (ressource) au premier tour et maximum, facteur de réduction
+RESOURCES = {
+    'XGBoost': (50, 1000),
+    'Random Forest': (25, 400),
+}
+ETA = 3
+
+
+def sample_params(model_name: str, rng: random.Random) -> dict:
+    """Tire une configuration au hasard dans l'espace de recherche du modèle"""
+    def loguniform(low, high):
+        return round(math.exp(rng.uniform(math.log(low), math.log(high))), 4)
+
+    if model_name == 'XGBoost':
+        return {
+            'max_depth': rng.randint(3, 10),
+            'learning_rate': loguniform(0.01, 0.3),
+            'subsample': round(rng.uniform(0.6, 1.0), 3),
+            'colsample_bytree': round(rng.uniform(0.6, 1.0), 3),
+            'min_child_weight': loguniform(1, 20),
+            'reg_lambda': loguniform(0.1, 10),
+        }
+    if model_name == 'Random Forest':
+        return {
+            'max_depth': rng.choice([None, 8, 12, 16, 24]),
+            'min_samples_leaf': rng.choice([1, 2, 4, 8]),
+            'max_features': rng.choice([1.0, 0.7, 0.5, 'sqrt']),
+        }
+    raise ValueError(f"Pas d'espace de recherche pour: {model_name}")
+
+
+def trial_id(model_name: str, params: dict, resource: int, data_hash: str) -> str:
+    """Identifiant stable d'un essai (mêmes données + mêmes paramètres = même essai)"""
+    key = json.dumps([model_name, params, resource, data_hash], sort_keys=True)
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def load_trial_log(path: Path) -> dict:
+    """Essais déjà terminés : {trial_id: résultat}"""
+    trials = {}
+    if path is not None and Path(path).exists():
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    trials[record["trial_id"]] = record
+    return trials
+
+
+def split_validation(data: dict, fraction: float = 0.2) -> dict:
+    """Jeu d'ajustement / validation extrait du jeu d'entraînement (le test reste intact)"""
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(data["X_train"]))
+    n_val = max(1, int(len(order) * fraction))
+    val, fit = order[:n_val], order[n_val:]
+    return {
+        "X_fit": data["X_train"][fit], "y_fit": data["y_train"][fit],
+        "X_val": data["X_train"][val], "y_val": data["y_train"][val],
+    }
+
+
+def measure_latency(model, X: np.ndarray, batch_size: int = 1000, single_calls: int = 30) -> dict:
+    """Latence d'inférence par le même chemin que le service (inplace_predict pour XGBoost)"""
+    X = np.ascontiguousarray(X[:batch_size], dtype=np.float32)
+    if hasattr(model, "get_booster"):
+        booster = model.get_booster()
+        predict = booster.inplace_predict
+    else:
+        predict = model.predict
+
+    single = []
+    for i in range(min(single_calls, len(X))):
+        start = time.perf_counter()
+        predict(X[i:i + 1])
+        single.append(time.perf_counter() - start)
+    batch = []
+    for _ in range(3):
+        start = time.perf_counter()
+        predict(X)
+        batch.append(time.perf_counter() - start)
+    return {
+        "latency_single_ms": round(float(np.median(single)) * 1000, 3),
+        "latency_batch_us_per_row": round(min(batch) / len(X) * 1e6, 3),
+    }
+
+
+def run_trial(trial: dict, threads: int = 1, data: dict = None) -> dict:
+    """Entraîne une configuration avec `resource` arbres et l'évalue sur la validation"""
+    from threadpoolctl import threadpool_limits
+
+    data = data if data is not None else train._worker_data
+    start = time.perf_counter()
+    with threadpool_limits(limits=threads):
+        model = train.make_model(trial["model"], n_jobs=threads,
+                                 params=dict(trial["params"], n_estimators=trial["resource"]))
+        if trial["model"] == 'XGBoost':
+            model.set_params(early_stopping_rounds=20)
+            model.fit(data["X_fit"], data["y_fit"], eval_set=[(data["X_val"], data["y_val"])], verbose=False)
+        else:
+            model.fit(data["X_fit"], data["y_fit"])
+        fit_seconds = time.perf_counter() - start
+        y_pred = model.predict(data["X_val"])
+        latency = measure_latency(model, data["X_val"])
+    metrics = train.evaluate(data["y_val"], y_pred)
+    best_iteration = getattr(model, "best_iteration", None) if trial["model"] == 'XGBoost' else None
+    return dict(
+        trial,
+        rmse=metrics["RMSE"],
+        mae=metrics["MAE"],
+        fit_seconds=round(fit_seconds, 3),
+        n_estimators=(best_iteration + 1) if best_iteration is not None else trial["resource"],
+        finished_at=datetime.now().isoformat(timespec="seconds"),
+        **latency,
+    )
+
+
+class TrialRunner:
+    """Exécute des lots d'essais (en parallèle si jobs > 1) dans la limite d'une échéance"""
+
+    def __init__(self, data: dict, jobs: int, threads: int, log_path: Path, deadline: float):
+        self.data = data
+        self.jobs = jobs
+        self.threads = threads
+        self.log_path = Path(log_path) if log_path else None
+        self.deadline = deadline
+        self.done = load_trial_log(self.log_path)
+        self.reused = 0
+        self.pool = ProcessPoolExecutor(max_workers=jobs, initializer=train._init_worker,
+                                        initargs=(data,)) if jobs > 1 else None
+
+    def close(self):
+        if self.pool is not None:
+            # Un essai en cours n'est pas interrompu : le dépassement est borné par la durée d'un essai
+            self.pool.shutdown(wait=True, cancel_futures=True)
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.deadline
+
+    def run(self, trials: list) -> list:
+        """Résultats des essais terminés (journal réutilisé, essais non lancés après l'échéance)"""
+        results, todo = [], []
+        for trial in trials:
+            if trial["trial_id"] in self.done:
+                self.reused += 1
+                results.append(self.done[trial["trial_id"]])
+            else:
+                todo.append(trial)
+
+        if self.pool is None:
+            for trial in todo:
+                if self.expired():
+                    break
+                results.append(self._record(run_trial(trial, self.threads, self.data)))
+            return results
+
+        pending = {self.pool.submit(run_trial, trial, self.threads) for trial in todo}
+        while pending:
+            remaining = self.deadline - time.monotonic()
+            if remaining <= 0:
+                for future in pending:
+                    future.cancel()
+                # Les essais déjà démarrés vont au bout et sont conservés
+                finished, _ = wait([f for f in pending if not f.cancelled()])
+                results.extend(self._record(f.result()) for f in finished)
+                break
+            finished, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            results.extend(self._record(f.result()) for f in finished)
+        return results
+
+    def _record(self, result: dict) -> dict:
+        self.done[result["trial_id"]] = result
+        if self.log_path is not None:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result) + "\n")
+        print(f"   🧪 {result['model']} [{result['resource']} arbres] RMSE {result['rmse']:.3f} "
+              f"| {result['latency_single_ms']:.2f} ms/ligne seule | {result['fit_seconds']:.1f}s")
+        return result
+
+
+def successive_halving(runner: TrialRunner, model_name: str, n_trials: int, data_hash: str,
+                       seed: int = 42) -> list:
+    """Tours successifs : garde le meilleur 1/ETA des configurations, multiplie les arbres par ETA"""
+    rng = random.Random(f"{seed}-{model_name}")
+    configs = []
+    for _ in range(n_trials):
+        params = sample_params(model_name, rng)
+        if params not in configs:
+            configs.append(params)
+
+    resource, max_resource = RESOURCES[model_name]
+    rungs = []
+    while configs and resource <= max_resource and not runner.expired():
+        trials = [
+            {"trial_id": trial_id(model_name, params, resource, data_hash),
+             "model": model_name, "params": params, "resource": resource, "rung": len(rungs)}
+            for params in configs
+        ]
+        results = sorted(runner.run(trials), key=lambda r: r["rmse"])
+        if not results:
+            break
+        rungs.append(results)
+        print(f"🔎 {model_name} tour {len(rungs)}: {len(results)}/{len(trials)} essais à {resource} arbres, "
+              f"meilleur RMSE {results[0]['rmse']:.3f}")
+        if len(results) == 1:
+            break
+        configs = [r["params"] for r in results[:max(1, len(results) // ETA)]]
+        resource *= ETA
+    return rungs
+
+
+def select_best(rungs: list, max_latency_ms: float = None) -> dict:
+    """Meilleur essai du tour le plus avancé (sous la contrainte de latence si fournie)"""
+    for results in reversed(rungs):
+        eligible = [r for r in results if max_latency_ms is None or r["latency_single_ms"] <= max_latency_ms]
+        if eligible:
+            return min(eligible, key=lambda r: r["rmse"])
+    return None
+
+
+def tune(data: dict, models: list = TUNED_MODELS, budget: float = 600, jobs: int = 1, threads: int = 1,
+         n_trials: int = 27, log_path: Path = None, max_latency_ms: float = None) -> dict:
+    """Recherche pour chaque modèle ; retourne {modèle: meilleur essai} (params + n_estimators)"""
+    deadline = time.monotonic() + budget
+    validation = split_validation(data)
+    runner = TrialRunner(validation, jobs, threads, log_path, deadline)
+    best = {}
+    start = time.perf_counter()
+    try:
+        for model_name in models:
+            rungs = successive_halving(runner, model_name, n_trials, data["data_hash"])
+            choice = select_best(rungs, max_latency_ms)
+            if choice is not None:
+                best[model_name] = choice
+                print(f"🏅 {model_name}: RMSE validation {choice['rmse']:.3f}, {choice['n_estimators']} arbres, "
+                      f"{choice['latency_single_ms']:.2f} ms/ligne, paramètres {choice['params']}")
+    finally:
+        runner.close()
+    print(f"⏱️ Recherche terminée en {time.perf_counter() - start:.1f}s "
+          f"(budget {budget:.0f}s, {runner.reused} essai(s) repris du journal)")
+    return best
@@ -0,0 +1,268 @@
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.core import metrics
+
+# Codes HTTP pour lesquels on retente la requête
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+FETCH_SECONDS = metrics.histogram(
+    "openweather_request_seconds", "Durée d'un appel OpenWeather (retries compris)", ("endpoint",),
+)
+FETCH_RESULTS = metrics.counter(
+    "openweather_requests", "Appels OpenWeather par résultat (ok / error)", ("endpoint", "result"),
+)
+
+
+def map_weather(data: dict) -> str:
+    """Mappe une réponse OpenWeather vers les catégories météo du modèle"""
+    weather_main = data['weather'][0]['main'].lower()
+    weather_desc = data['weather'][0]['description'].lower()
+
+    # Mapping vers nos catégories (ajuste selon tes besoins)
+    if 'rain' in weather_desc or 'rain' in weather_main:
+        # Météo actuelle : cumul sur 1h ; prévisions : cumul sur 3h, ramené à l'heure
+        rain = data.get('rain', {})
+        rain_per_hour = rain['1h'] if '1h' in rain else rain.get('3h', 0) / 3
+        weather = 'light rain' if rain_per_hour < 2.5 else 'heavy rain'
+    elif 'thunderstorm' in weather_desc:
+        weather = 'thunderstorm with rain'
+    elif 'clouds' in weather_main:
+        if 'clear' in weather_desc:
+            weather = 'clear sky'
+        else:
+            weather = 'scattered clouds'  # Simplifié
+    else:
+        weather = 'clear sky'  # Défaut
+    return weather
+
+
+class WeatherClient:
+    """Client OpenWeather partagé : connexions keep-alive, timeouts stricts,
+    retries avec backoff exponentiel + jitter et cache TTL par lieu.
+
+    Cache : une entrée plus jeune que `ttl` (ou que le `max_age` de l'appel) est
+    servie directement ; au-delà, OpenWeather est interrogé. Une entrée périmée
+    (jusqu'à `stale_ttl`) n'est servie que si l'upstream est en panne, à la place
+    d'une erreur.
+    """
+
+    def __init__(self, api_key: str = None, base_url: str = "https://api.openweathermap.org",
+                 connect_timeout: float = 3.05, read_timeout: float = 10.0,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 ttl: float = 600, stale_ttl: float = 3600, pool_maxsize: int = 64,
+                 forecast_ttl: float = 10800, forecast_min_ttl: float = 60):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.forecast_ttl = forecast_ttl
+        self.forecast_min_ttl = forecast_min_ttl
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._cache = {}
+        self._forecasts = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_served = 0
+        self.upstream_errors = 0
+
+    @classmethod
+    def from_env(cls):
+        """Construit le client depuis les variables d'environnement OPENWEATHER_*"""
+        return cls(
+            api_key=os.getenv("OPENWEATHER_API_KEY"),
+            base_url=os.getenv("OPENWEATHER_BASE_URL", "https://api.openweathermap.org"),
+            connect_timeout=float(os.getenv("OPENWEATHER_CONNECT_TIMEOUT", "3.05")),
+            read_timeout=float(os.getenv("OPENWEATHER_READ_TIMEOUT", "10")),
+            max_retries=int(os.getenv("OPENWEATHER_MAX_RETRIES", "3")),
+            ttl=float(os.getenv("OPENWEATHER_CACHE_TTL", "600")),
+            stale_ttl=float(os.getenv("OPENWEATHER_STALE_TTL", "3600")),
+            forecast_ttl=float(os.getenv("OPENWEATHER_FORECAST_TTL", "10800")),
+        )
+
+    def current(self, location: dict, api_key: str = None, max_age: float = None) -> dict:
+        """Météo actuelle d'un lieu au format du modèle (region, departement, weather, ...).
+
+        `max_age` : âge max (s) d'une entrée servie depuis le cache, borné par `ttl`
+        (0 : toujours interroger OpenWeather, l'entrée en cache ne sert qu'en cas de panne).
+        """
+        max_age = self.ttl if max_age is None else min(max_age, self.ttl)
+        key = self._location_key(location)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None and now - entry[0] < max_age:
+            self.hits += 1
+            return dict(entry[1])
+
+        self.misses += 1
+        try:
+            return dict(self._refresh(key, location, api_key))
+        except Exception:
+            if entry is not None and now - entry[0] < self.stale_ttl:
+                self.stale_served += 1
+                return dict(entry[1])
+            raise
+
+    def forecast(self, location: dict, api_key: str = None) -> dict:
+        """Prévisions à 5 jours (pas de 3h) d'un lieu, chaque pas au format du modèle.
+
+        Retourne {"fetched_at", "expires_at", "steps"} (timestamps epoch). L'entrée est
+        gardée en cache jusqu'au prochain pas de prévision, moment où OpenWeather
+        publie une nouvelle série (borné par forecast_min_ttl / forecast_ttl).
+        """
+        key = self._location_key(location)
+        with self._lock:
+            entry = self._forecasts.get(key)
+        if entry is not None and time.time() < entry["expires_at"]:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        try:
+            data = self.get_json("/data/2.5/forecast", self._location_params(location), api_key)
+        except Exception:
+            if entry is not None and time.time() - entry["fetched_at"] < self.stale_ttl:
+                self.stale_served += 1
+                return entry
+            raise
+
+        now = time.time()
+        steps = [
+            {
+                'region': location['region'],
+                'departement': location['departement'],
+                'weather': map_weather(item),
+                'temperature': item['main']['temp'],
+                'wind_speed': item['wind']['speed'],
+                'date': item['dt_txt'],  # UTC, ex: "2025-06-15 15:00:00"
+                'dt': item['dt'],
+            }
+            for item in data.get('list', [])
+        ]
+        next_step = min((step['dt'] for step in steps if step['dt'] > now), default=now + self.forecast_ttl)
+        entry = {
+            "fetched_at": now,
+            "expires_at": min(max(next_step, now + self.forecast_min_ttl), now + self.forecast_ttl),
+            "steps": steps,
+        }
+        with self._lock:
+            self._forecasts[key] = entry
+        return entry
+
+    def get_json(self, path: str, params: dict, api_key: str = None) -> dict:
+        """GET sur l'API OpenWeather avec timeouts et retries (backoff exponentiel, full jitter)"""
+        endpoint = path.rsplit("/", 1)[-1]
+        with FETCH_SECONDS.time(endpoint=endpoint):
+            try:
+                data = self._get_with_retries(path, params, api_key)
+            except Exception:
+                FETCH_RESULTS.inc(endpoint=endpoint, result="error")
+                raise
+        FETCH_RESULTS.inc(endpoint=endpoint, result="ok")
+        return data
+
+    def _get_with_retries(self, path: str, params: dict, api_key: str = None) -> dict:
+        params = dict(params, appid=api_key or self.api_key, units="metric")
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                if response.status_code == 200:
+                    return response.json()
+                error = Exception(f"Erreur API OpenWeather: {response.status_code}")
+                if response.status_code not in RETRY_STATUS:
+                    raise error
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = Exception(f"Erreur réseau OpenWeather: {e}")
+            if attempt < self.max_retries:
+                time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+        self.upstream_errors += 1
+        raise error
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._cache)
+            forecasts = len(self._forecasts)
+        return {
+            "size": size,
+            "forecasts": forecasts,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_served": self.stale_served,
+            "upstream_errors": self.upstream_errors,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._forecasts.clear()
+
+    def _refresh(self, key, location: dict, api_key: str = None) -> dict:
+        data = self.get_json("/data/2.5/weather", self._location_params(location), api_key)
+        weather = {
+            'region': location['region'],
+            'departement': location['departement'],
+            'weather': map_weather(data),
+            'temperature': data['main']['temp'],
+            'wind_speed': data['wind']['speed'],
+            'date': datetime.now().isoformat(),  # Date actuelle UTC
+            # Valeurs observées, conservées pour le réentraînement (ignorées par le modèle)
+            'observed_humidity': data['main'].get('humidity'),
+            'observed_at': data.get('dt'),
+        }
+        with self._lock:
+            self._cache[key] = (time.monotonic(), weather)
+        return weather
+
+    @staticmethod
+    def _location_params(location: dict) -> dict:
+        if 'lat' in location and 'lon' in location:
+            return {"lat": location['lat'], "lon": location['lon']}
+        return {"q": location.get('city', location['departement'] + ',SN')}
+
+    @staticmethod
+    def _location_key(location: dict) -> tuple:
+        return (location['departement'],) + tuple(sorted(WeatherClient._location_params(location).items()))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_weather_client() -> WeatherClient:
+    """Client OpenWeather partagé par le scheduler et les endpoints (créé au premier appel)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = WeatherClient.from_env()
+    return _client
+
+
+def _collect_cache_metrics():
+    if _client is None:
+        return
+    stats = _client.stats()
+    yield "weather_cache_hits_total", "counter", "Relevés / prévisions servis depuis le cache météo", stats["hits"], {}
+    yield "weather_cache_misses_total", "counter", "Relevés / prévisions demandés à OpenWeather", stats["misses"], {}
+    yield "weather_cache_stale_served_total", "counter", "Entrées périmées servies pendant une panne d'OpenWeather", stats["stale_served"], {}
+
+
+metrics.register_collector(_collect_cache_metrics)
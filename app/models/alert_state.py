@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float
+from app.db.database import Base
+
+
+class AlertState(Base):
+    """État d'alerte d'un lieu surveillé, écrit uniquement lors d'un changement de niveau"""
+    __tablename__ = "alert_states"
+
+    departement = Column(String(50), primary_key=True)
+    # 0 = normal, 1 = alerte, 2 = alerte critique (voir app/core/alerts.py)
+    level = Column(Integer, nullable=False, default=0)
+    # Humidité prédite au moment de la transition
+    humidity = Column(Float(precision=24), nullable=True)
+    # Dates en UTC : entrée dans le niveau actuel, dernier SMS et niveau annoncé par ce SMS
+    since = Column(DateTime, nullable=False)
+    notified_at = Column(DateTime, nullable=True)
+    notified_level = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<AlertState(departement={self.departement}, level={self.level}, since={self.since})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
 from sqlalchemy.sql import func
 from app.db.database import Base
 
@@ -6,18 +6,30 @@ from app.db.database import Base
 class Notification(Base):
     """Modèle pour stocker les notifications"""
     __tablename__ = "notifications"
+    # Index composites pour la pagination keyset (created_at DESC, id DESC),
+    # avec ou sans filtre sur le statut / le destinataire
+    __table_args__ = (
+        Index("idx_notifications_created_at_id", "created_at", "id"),
+        Index("idx_notifications_status_created_at", "status", "created_at", "id"),
+        Index("idx_notifications_recipient_created_at", "recipient", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
     message = Column(Text, nullable=True)
-    recipient = Column(String(50), nullable=True, index=True)  # Numéro de téléphone ou email
+    recipient = Column(String(50), nullable=True)  # Numéro de téléphone ou email
     
     # Type et statut
     # Types possibles: "sms", "email", "push"
     notification_type = Column(String(20), default="sms", nullable=True)
-    # Statuts possibles: "pending", "sent", "failed"
-    status = Column(String(20), default="pending", nullable=True, index=True)
+    # Statuts possibles: "pending", "sending" (réservée par un worker de l'outbox), "sent", "failed"
+    status = Column(String(20), default="pending", nullable=True)
     
+    # Réservation par un worker de l'outbox : une ligne restée "sending" au-delà du bail
+    # (processus arrêté ou planté) est remise en pending, ou failed après trop de réservations
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    attempts = Column(Integer, default=0, server_default="0", nullable=False)
+
     # Informations Twilio (pour SMS)
     twilio_sid = Column(String(100), nullable=True, index=True)
     
@@ -31,3 +43,30 @@ class Notification(Base):
     def __repr__(self):
         return f"<Notification(id={self.id}, type={self.notification_type}, status={self.status}, recipient={self.recipient})>"
 
+
+
+class NotificationArchive(Base):
+    """Notifications anciennes déplacées hors de la table chaude par le job de rétention.
+
+    Mêmes colonnes que Notification (l'id d'origine est conservé). Les lignes plus
+    anciennes encore sont exportées par mois dans des fichiers .ndjson.gz puis supprimées.
+    """
+    __tablename__ = "notifications_archive"
+    __table_args__ = (
+        Index("idx_notifications_archive_created_at_id", "created_at", "id"),
+        Index("idx_notifications_archive_recipient_created_at", "recipient", "created_at", "id"),
+        Index("idx_notifications_archive_status_created_at", "status", "created_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    message = Column(Text, nullable=True)
+    recipient = Column(String(50), nullable=True)
+    notification_type = Column(String(20), nullable=True)
+    status = Column(String(20), nullable=True)
+    twilio_sid = Column(String(100), nullable=True)
+    error_message = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<NotificationArchive(id={self.id}, type={self.notification_type}, status={self.status}, recipient={self.recipient})>"
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, Index
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class WeatherObservation(Base):
+    """Relevé OpenWeather (entrées du modèle + humidité observée), utilisé pour le réentraînement"""
+    __tablename__ = "weather_observations"
+    # Un relevé par lieu et par horodatage OpenWeather (les relevés servis depuis le cache sont ignorés)
+    __table_args__ = (
+        Index("uq_weather_observations_departement_observed_at", "departement", "observed_at", unique=True),
+    )
+
+    # Identifiant croissant : sert de watermark au réentraînement incrémental
+    id = Column(Integer, primary_key=True)
+    region = Column(String(50), nullable=False)
+    departement = Column(String(50), nullable=False)
+    weather = Column(String(30), nullable=False)
+    # REAL (4 octets) : précision largement suffisante pour des relevés météo
+    temperature = Column(Float(precision=24), nullable=False)
+    wind_speed = Column(Float(precision=24), nullable=False)
+    humidity = Column(Float(precision=24), nullable=False)
+    # Horodatage du relevé (champ dt d'OpenWeather), en UTC
+    observed_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<WeatherObservation(id={self.id}, departement={self.departement}, observed_at={self.observed_at})>"
@@ -0,0 +1,43 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, Index
+from app.db.database import Base
+
+
+class HumidityPrediction(Base):
+    """Prédiction du scheduler (entrées météo + version du modèle), en ajout seul"""
+    __tablename__ = "humidity_predictions"
+    __table_args__ = (
+        Index("idx_humidity_predictions_departement_predicted_at", "departement", "predicted_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    departement = Column(String(50), nullable=False)
+    # Heure du cycle du scheduler, en UTC
+    predicted_at = Column(DateTime, nullable=False)
+    # REAL (4 octets) : largement suffisant pour des pourcentages et relevés météo
+    humidity = Column(Float(precision=24), nullable=False)
+    weather = Column(String(30), nullable=False)
+    temperature = Column(Float(precision=24), nullable=False)
+    wind_speed = Column(Float(precision=24), nullable=False)
+    model_version = Column(String(50), nullable=False)
+
+    def __repr__(self):
+        return f"<HumidityPrediction(id={self.id}, departement={self.departement}, predicted_at={self.predicted_at})>"
+
+
+class HumidityRollup(Base):
+    """Agrégats horaires / journaliers des prédictions, mis à jour à chaque insertion"""
+    __tablename__ = "humidity_rollups"
+
+    departement = Column(String(50), primary_key=True)
+    # "hour" ou "day"
+    granularity = Column(String(4), primary_key=True)
+    # Début de l'heure / du jour, en UTC
+    bucket = Column(DateTime, primary_key=True)
+    samples = Column(Integer, nullable=False)
+    # Somme en double précision : la moyenne reste exacte sur beaucoup d'échantillons
+    humidity_sum = Column(Float, nullable=False)
+    humidity_min = Column(Float(precision=24), nullable=False)
+    humidity_max = Column(Float(precision=24), nullable=False)
+
+    def __repr__(self):
+        return f"<HumidityRollup(departement={self.departement}, granularity={self.granularity}, bucket={self.bucket})>"
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from app.db.database import Base
+
+
+class RetrainState(Base):
+    """Dernière tentative de réentraînement à partir d'une version, qu'elle ait été promue ou non"""
+    __tablename__ = "retrain_state"
+
+    # Version active au moment de la tentative (celle dont le candidat descend)
+    model_version = Column(String(50), primary_key=True)
+    # Dernier id de weather_observations utilisé pour entraîner un candidat depuis cette version
+    watermark = Column(Integer, nullable=False, default=0)
+    # "promoted" ou "rejected"
+    status = Column(String(20), nullable=False)
+    # Date UTC de la tentative
+    attempted_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<RetrainState(model_version={self.model_version}, watermark={self.watermark}, status={self.status})>"
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, DateTime
+from app.db.database import Base
+
+
+class SchedulerLease(Base):
+    """Bail de leadership : un seul processus à la fois exécute les jobs planifiés"""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String(50), primary_key=True)
+    # Identifiant du processus détenteur (hôte:pid par défaut)
+    holder = Column(String(255), nullable=False)
+    # Dates en UTC ; le bail est libre dès que expires_at est dépassé
+    expires_at = Column(DateTime, nullable=False)
+    acquired_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<SchedulerLease(name={self.name}, holder={self.holder}, expires_at={self.expires_at})>"
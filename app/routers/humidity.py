@@ -1,11 +1,20 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Depends, Query
+from fastapi.responses import StreamingResponse
 from app.ml.predictor import predict_humidity
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import List
 router = APIRouter(prefix="/humidity", tags=["humidity"])
-from app.ml.predictor import fetch_weather_dakar, predict_humidity
+from app.ml.predictor import fetch_weather_dakar, predict_humidity, predict_humidity_batch, predict_forecast, get_prediction_cache, registry
 import os
-from twilio.rest import Client
-from app.core.scheduler import check_humidity_periodically
+from app.core.checks import get_check_runner
+from app.core.locations import find_location
+from app.ml.bulk import FORMATS, BulkInputError, BulkScorer, iter_file, score_stream, spool
+from app.ml.batcher import get_predict_batcher
+import anyio
+from app.core.history import query_history
+from app.dependencies import get_db
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta, timezone
 # from main import check_humidity_periodically
 class HumidityInput(BaseModel):
     region: str
@@ -15,34 +24,267 @@ class HumidityInput(BaseModel):
     wind_speed: float
     date: str  # "2025-06-15 14:00:00"
 
+# Taille maximale d'un lot pour /predict/batch
+MAX_BATCH_SIZE = 10000
+
+class HumidityBatchInput(BaseModel):
+    inputs: List[HumidityInput] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+def classify_humidity(humidity: float) -> dict:
+    """Arrondit l'humidité prédite et lui associe un message et un niveau d'alerte"""
+    humidity_rounded = round(humidity,1)
+    if humidity_rounded > 80:
+        alert = "ALERTE : Humidité très élevée – risque de moisissures"
+        level = "danger"
+    elif humidity_rounded > 70:
+        alert = "Attention : Humidité élevée"
+        level = "warning"
+    elif humidity_rounded > 50:
+        alert = "Niveau normal"
+        level = "success"
+    else:
+        alert = "Humidité basse – risque de sécheresse"
+        level = "info"
+
+    return {
+        "humidity": humidity_rounded,
+        "alert": alert,
+        "level": level
+    }
+
 @router.post("/predict")
-def predict(input: HumidityInput):
+async def predict(input: HumidityInput):
+    """Prédiction unitaire, regroupée avec les requêtes concurrentes (PREDICT_BATCH_WINDOW_MS)"""
+    batcher = get_predict_batcher()
     try:
-        humidity = predict_humidity(input.dict())
-        humidity_rounded = round(humidity,1)
-        if humidity_rounded > 80:
-            alert = "ALERTE : Humidité très élevée – risque de moisissures"
-            level = "danger"
-        elif humidity_rounded > 70:
-            alert = "Attention : Humidité élevée"
-            level = "warning"
-        elif humidity_rounded > 50:
-            alert = "Niveau normal"
-            level = "success"
+        if batcher is not None:
+            humidity = await batcher.submit(input.dict())
         else:
-            alert = "Humidité basse – risque de sécheresse"
-            level = "info"
+            humidity = await anyio.to_thread.run_sync(predict_humidity, input.dict())
+        return classify_humidity(humidity)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/predict/batch")
+def predict_batch(batch: HumidityBatchInput):
+    """Prédit l'humidité pour plusieurs entrées en un seul passage du modèle"""
+    try:
+        humidities = predict_humidity_batch([item.dict() for item in batch.inputs])
         return {
-            "humidity": humidity_rounded,
-            "alert": alert,
-            "level": level
+            "count": len(humidities),
+            "predictions": [classify_humidity(h) for h in humidities]
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     
-@router.post("/check-dakar-now")
-def check_dakar_now():
-    """Test manuel: fetch + predict + alert pour Dakar"""
-    check_humidity_periodically()  # Utilise la même fonction
-    return {"status": "Check lancé – vérifie les logs"}
\ No newline at end of file
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse dont le contenu lit encore le corps de la requête.
+
+    StreamingResponse écoute receive() en parallèle pour détecter la déconnexion (ASGI < 2.4) :
+    elle volerait des morceaux du corps. Ici seul le contenu lit le corps, et request.stream()
+    lève ClientDisconnect si le client part.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def _stream_results(first: bytes, results):
+    """Premier lot déjà scoré, puis les suivants ; une ligne invalide après le début de la
+    réponse l'interrompt (transfert incomplet côté client)"""
+    if first:
+        yield first
+    try:
+        async for block in results:
+            yield block
+    except BulkInputError as e:
+        print(f"❌ Scoring en flux interrompu: {e}")
+        raise
+
+@router.post("/predict/stream")
+async def predict_stream(request: Request, format: str = None, buffered: bool = False):
+    """Score un fichier CSV ou NDJSON envoyé en flux (Content-Type text/csv ou application/x-ndjson).
+
+    Le fichier est traité au fil de la lecture par lots de PREDICT_STREAM_CHUNK_ROWS lignes
+    (un appel au modèle par lot) et les résultats de chaque lot, au format d'entrée ou `format`,
+    sont renvoyés aussitôt : le client doit lire la réponse pendant l'envoi (curl, httpx).
+    Une erreur dans le premier lot donne un 400 ; plus loin, la réponse est interrompue.
+
+    `buffered=true` : résultats gardés dans un fichier temporaire et renvoyés une fois tout le
+    fichier lu, pour les clients qui envoient le corps entier avant de lire la réponse
+    (requests, par exemple) ; erreurs toujours en 400, X-Rows-Scored disponible, mais
+    disque et délai de première réponse proportionnels au fichier.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "csv" in content_type:
+        input_format = "csv"
+    elif "json" in content_type:
+        input_format = "ndjson"
+    else:
+        raise HTTPException(status_code=415, detail="Content-Type attendu: text/csv ou application/x-ndjson")
+    output_format = format or input_format
+    if output_format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format inconnu: {output_format} (csv ou ndjson)")
+
+    # Une seule version pour tout le fichier, même si une autre est activée pendant le traitement
+    version = registry.active()
+    scorer = BulkScorer(version, input_format, output_format)
+    results = score_stream(request.stream(), scorer,
+                           chunk_rows=int(os.getenv("PREDICT_STREAM_CHUNK_ROWS", "5000")))
+    try:
+        if buffered:
+            spooled = await spool(results)
+        else:
+            first = await anext(results, b"")
+    except BulkInputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if buffered:
+        return StreamingResponse(
+            iter_file(spooled),
+            media_type=FORMATS[output_format],
+            headers={"X-Rows-Scored": str(scorer.rows), "X-Model-Version": version.name},
+        )
+    return DuplexStreamingResponse(
+        _stream_results(first, results),
+        media_type=FORMATS[output_format],
+        headers={"X-Model-Version": version.name},
+    )
+
+@router.get("/forecast")
+def forecast(departement: str):
+    """Courbe d'humidité prédite sur les prévisions à 5 jours (pas de 3h) d'un département"""
+    location = find_location(departement)
+    if location is None:
+        raise HTTPException(status_code=404, detail=f"Département inconnu: {departement}")
+    api_key = os.getenv("OPENWEATHER_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=503, detail="OPENWEATHER_API_KEY manquante")
+    try:
+        curve = predict_forecast(api_key, location)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+    steps = [
+        {
+            "date": step["date"],
+            "weather": step["weather"],
+            "temperature": step["temperature"],
+            "wind_speed": step["wind_speed"],
+            **classify_humidity(step["humidity"]),
+        }
+        for step in curve["steps"]
+    ]
+    return {
+        "region": location["region"],
+        "departement": location["departement"],
+        "model_version": curve["model_version"],
+        "fetched_at": datetime.fromtimestamp(curve["fetched_at"], timezone.utc).isoformat(),
+        "expires_at": datetime.fromtimestamp(curve["expires_at"], timezone.utc).isoformat(),
+        "count": len(steps),
+        "peak": max(steps, key=lambda step: step["humidity"]) if steps else None,
+        "forecast": steps,
+    }
+
+# Fenêtre par défaut de /history selon la granularité
+HISTORY_DEFAULT_RANGE = {"hour": timedelta(days=7), "day": timedelta(days=90)}
+
+def _utc_naive(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(tzinfo=None) if moment.tzinfo else moment
+
+@router.get("/history")
+def history(
+    departement: str,
+    granularity: str = Query("hour", pattern="^(hour|day)$"),
+    start: datetime = None,
+    end: datetime = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Humidité prédite par le scheduler pour un département : min / max / moyenne et nombre
+    de prédictions par heure ou par jour (UTC) sur [start, end[.
+
+    Lu depuis les agrégats tenus à jour à chaque cycle, sans parcourir les prédictions brutes.
+    Par défaut : les 7 derniers jours par heure, les 90 derniers jours par jour.
+    """
+    location = find_location(departement)
+    if location is None:
+        raise HTTPException(status_code=404, detail=f"Département inconnu: {departement}")
+    end = _utc_naive(end) if end else datetime.now(timezone.utc).replace(tzinfo=None)
+    start = _utc_naive(start) if start else end - HISTORY_DEFAULT_RANGE[granularity]
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start doit précéder end")
+
+    buckets = query_history(db, location["departement"], granularity, start, end)
+    return {
+        "region": location["region"],
+        "departement": location["departement"],
+        "granularity": granularity,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "count": len(buckets),
+        "history": buckets,
+    }
+
+@router.get("/cache/stats")
+def cache_stats():
+    """Statistiques du cache de prédictions (hits, misses, taille, évictions)"""
+    return get_prediction_cache().stats()
+
+@router.get("/batching/stats")
+def batching_stats():
+    """Regroupement des prédictions unitaires : fenêtre, taille max, nombre de lots et taille moyenne"""
+    batcher = get_predict_batcher()
+    return batcher.stats() if batcher is not None else {"enabled": False}
+
+@router.get("/models")
+def list_models():
+    """Versions du modèle : active, shadow, disponibles, et statistiques par version"""
+    return registry.stats()
+
+@router.post("/models/{version}/activate")
+def activate_model(version: str):
+    """Charge, valide et active une version à chaud (écrit aussi app/ml/models/ACTIVE)"""
+    try:
+        registry.promote(version)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return registry.stats()
+
+@router.post("/models/shadow")
+def set_shadow_model(version: str = None):
+    """Score le trafic avec une version candidate hors du chemin de la requête (sans version : désactive)"""
+    try:
+        registry.set_shadow(version)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return registry.stats()
+
+@router.post("/check-dakar-now", status_code=202)
+async def check_dakar_now():
+    """Lance un cycle de surveillance (fetch + predict + alert) sans l'attendre.
+
+    Si un cycle est déjà en file ou en cours (manuel ou horaire), la demande le rejoint :
+    même job_id et `coalesced: true`. Suivi via GET /humidity/checks/{job_id}.
+    """
+    run, coalesced = get_check_runner().submit("manual")
+    return {
+        "job_id": run["job_id"],
+        "status": run["status"],
+        "coalesced": coalesced,
+        "status_url": f"/humidity/checks/{run['job_id']}",
+    }
+
+@router.get("/checks")
+def list_checks(limit: int = Query(20, ge=1, le=100)):
+    """Derniers cycles de surveillance de ce processus, plus récents d'abord"""
+    return {"checks": get_check_runner().recent(limit)}
+
+@router.get("/checks/{job_id}")
+def get_check(job_id: str):
+    """Statut d'un cycle : queued / running / succeeded / failed, durée de chaque étape (ms) et résultats"""
+    run = get_check_runner().get(job_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Cycle inconnu de ce processus")
+    return run
\ No newline at end of file
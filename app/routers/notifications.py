@@ -1,126 +1,215 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, tuple_, union_all
 from sqlalchemy.orm import Session
-from app.db.database import SessionLocal
-from app.models.notifications import Notification
+from app.dependencies import get_db
+from app.db.database import engine
+from app.models.notifications import Notification, NotificationArchive
+from app.core.retention import NOTIFICATION_COLUMNS
+from app.core.outbox import enqueue_sms
+from app.core.sms import get_sms_sender
 from datetime import datetime
-import os
-try:
-    from twilio.rest import Client
-except Exception:
-    Client = None
+import base64
+import csv
+import io
+import json
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
 
-def get_db():
-    """Dependency pour obtenir une session de base de données"""
-    db = SessionLocal()
+@router.post("/send_sms/", status_code=202)
+def send_sms(message: str, to: str, db: Session = Depends(get_db)):
+    """Met le SMS en file d'attente (statut pending) ; l'envoi est fait par les workers de l'outbox"""
     try:
-        yield db
-    finally:
-        db.close()
+        get_sms_sender().check_configured()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    notification, = enqueue_sms(db, [(message, to)])
+
+    return {
+        "notification_id": notification.id,
+        "status": "pending"
+    }
 
 
-@router.post("/send_sms/")
-async def send_sms(message: str, to: str, db: Session = Depends(get_db)):
-    account_sid = os.getenv("TWILIO_ACCOUNT_SID", "")
-    auth_token = os.getenv("TWILIO_AUTH_TOKEN", "")
-    from_number = os.getenv("TWILIO_FROM_NUMBER", "")
+def serialize_notification(notif) -> dict:
+    return {
+        "id": notif.id,
+        "message": notif.message,
+        "recipient": notif.recipient,
+        "notification_type": notif.notification_type,
+        "status": notif.status,
+        "twilio_sid": notif.twilio_sid,
+        "error_message": notif.error_message,
+        "created_at": notif.created_at.isoformat() if notif.created_at else None,
+        "sent_at": notif.sent_at.isoformat() if notif.sent_at else None
+    }
 
-    if not account_sid or not auth_token or not from_number:
-        raise HTTPException(status_code=500, detail="Twilio credentials or from number not configured")
 
-    if Client is None:
-        raise HTTPException(status_code=500, detail="twilio package is not installed; please pip install twilio")
+def encode_cursor(created_at: datetime, notification_id: int) -> str:
+    """Curseur opaque (base64) pointant sur la dernière ligne (created_at, id) d'une page"""
+    raw = json.dumps([created_at.isoformat(), notification_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
 
-    # Créer l'enregistrement de notification dans la base de données (statut: pending)
-    notification = Notification(
-        message=message,
-        recipient=to,
-        notification_type="sms",
-        status="pending"
-    )
-    db.add(notification)
-    db.commit()
-    db.refresh(notification)
 
+def decode_cursor(cursor: str) -> tuple:
     try:
-        # Envoi SMS
-        client = Client(account_sid, auth_token)
-        sms = client.messages.create(body=message, from_=from_number, to=to)
-        
-        # Mettre à jour la notification : statut = sent, twilio_sid, sent_at
-        notification.status = "sent"
-        notification.twilio_sid = sms.sid
-        notification.sent_at = datetime.now()
-        db.commit()
-        
-        return {
-            "sid": sms.sid,
-            "notification_id": notification.id,
-            "status": "sent"
-        }
-    except Exception as e:
-        # En cas d'erreur lors de l'envoi, mettre à jour le statut à "failed"
-        notification.status = "failed"
-        notification.error_message = str(e)
-        db.commit()
-        raise HTTPException(status_code=500, detail=f"Erreur lors de l'envoi SMS: {str(e)}")
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, notification_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(notification_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+
+
+def count_notifications(db: Session, statement, mode: str):
+    """Total des notifications filtrées : exact (COUNT), approx (estimation du planner PostgreSQL) ou none"""
+    if mode == "none":
+        return None
+    if mode == "approx" and db.get_bind().dialect.name == "postgresql":
+        # Paramètres liés passés au driver : les filtres de l'utilisateur ne sont jamais inlinés dans le SQL
+        compiled = statement.compile(dialect=db.get_bind().dialect)
+        plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+        return int(plan[0]["Plan"]["Plan Rows"])
+    return db.execute(select(func.count()).select_from(statement.subquery())).scalar()
+
+
+def filtered_select(model, status: str = None, recipient: str = None, cursor: tuple = None,
+                    created_from: datetime = None, created_to: datetime = None):
+    """SELECT des colonnes de notification de `model` (table chaude ou archive) avec filtres et curseur"""
+    statement = select(*[getattr(model, c) for c in NOTIFICATION_COLUMNS])
+    if status:
+        statement = statement.where(model.status == status)
+    if recipient:
+        statement = statement.where(model.recipient == recipient)
+    if created_from:
+        statement = statement.where(model.created_at >= created_from)
+    if created_to:
+        statement = statement.where(model.created_at < created_to)
+    if cursor:
+        statement = statement.where(tuple_(model.created_at, model.id) < tuple_(*cursor))
+    return statement
 
 
 @router.get("/")
-async def get_notifications(
-    skip: int = 0,
-    limit: int = 100,
+def get_notifications(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
     status: str = None,
+    recipient: str = None,
+    cursor: str = None,
+    count: str = Query("exact", pattern="^(exact|approx|none)$"),
+    include_archived: bool = False,
     db: Session = Depends(get_db)
 ):
     """
-    Récupère la liste des notifications avec possibilité de filtrer par statut
+    Récupère la liste des notifications (plus récentes d'abord) avec filtres par statut / destinataire.
+
+    Pagination par curseur : passer `next_cursor` de la réponse précédente dans `cursor`
+    (keyset sur (created_at, id), coût constant quelle que soit la profondeur de page).
+    `skip` (OFFSET) reste accepté sans curseur mais ne peut pas être combiné avec lui.
+    `count=approx` donne une estimation rapide du total sur PostgreSQL, `count=none` l'omet.
+    Par défaut seule la table chaude est lue ; `include_archived=true` inclut notifications_archive.
     """
-    query = db.query(Notification)
-    
-    if status:
-        query = query.filter(Notification.status == status)
-    
-    notifications = query.order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
+    if cursor and skip:
+        raise HTTPException(status_code=400, detail="skip et cursor ne peuvent pas être combinés")
+    models = [Notification, NotificationArchive] if include_archived else [Notification]
+
+    def listing(cursor_values=None):
+        selects = [filtered_select(m, status, recipient, cursor_values) for m in models]
+        return selects[0] if len(selects) == 1 else union_all(*selects)
+
+    total = count_notifications(db, listing(), count)
+
+    rows = listing(decode_cursor(cursor) if cursor else None).subquery()
+    statement = select(rows).order_by(rows.c.created_at.desc(), rows.c.id.desc())
+    notifications = db.execute(statement.offset(skip).limit(limit + 1)).all()
+    has_more = len(notifications) > limit
+    notifications = notifications[:limit]
+    last = notifications[-1] if notifications else None
     
     return {
-        "total": len(notifications),
-        "notifications": [
-            {
-                "id": notif.id,
-                "message": notif.message,
-                "recipient": notif.recipient,
-                "notification_type": notif.notification_type,
-                "status": notif.status,
-                "twilio_sid": notif.twilio_sid,
-                "error_message": notif.error_message,
-                "created_at": notif.created_at.isoformat() if notif.created_at else None,
-                "sent_at": notif.sent_at.isoformat() if notif.sent_at else None
-            }
-            for notif in notifications
-        ]
+        "total": total,
+        "next_cursor": encode_cursor(last.created_at, last.id) if has_more else None,
+        "notifications": [serialize_notification(notif) for notif in notifications]
     }
 
+
+EXPORT_FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+# Dates en ISO 8601 ; appelé par le JSONEncoder pour les seules valeurs non sérialisables
+_export_encoder = json.JSONEncoder(ensure_ascii=False, default=datetime.isoformat)
+
+
+def export_chunks(statement, output_format: str, batch_size: int = 5000):
+    """Lignes de `statement` sérialisées par blocs, lues via un curseur côté serveur.
+
+    Connexion dédiée (la session de la requête est fermée avant la fin du flux) ;
+    yield_per active stream_results : le driver ne garde qu'un lot en mémoire.
+    Les lignes sont des tuples Core, écrits tels quels, sans objet ORM.
+    """
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=batch_size).execute(statement)
+        if output_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            writer.writerow(NOTIFICATION_COLUMNS)
+            for rows in result.partitions():
+                # str(datetime) : ISO 8601 avec un espace entre date et heure
+                writer.writerows(rows)
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                # Export vide : l'en-tête seul
+                yield buffer.getvalue().encode("utf-8")
+        else:
+            encode = _export_encoder.encode
+            for rows in result.partitions():
+                yield "".join(
+                    encode(dict(zip(NOTIFICATION_COLUMNS, row))) + "\n" for row in rows
+                ).encode("utf-8")
+
+
+@router.get("/export")
+def export_notifications(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    status: str = None,
+    recipient: str = None,
+    created_from: datetime = None,
+    created_to: datetime = None,
+    include_archived: bool = False,
+):
+    """
+    Export complet des notifications filtrées (statut, destinataire, created_at dans
+    [created_from, created_to[), en CSV ou NDJSON, dans l'ordre chronologique.
+
+    Le résultat est envoyé en flux au fil de la lecture : la mémoire utilisée ne dépend
+    pas du nombre de lignes exportées.
+    """
+    models = [Notification, NotificationArchive] if include_archived else [Notification]
+    selects = [filtered_select(m, status, recipient, created_from=created_from, created_to=created_to) for m in models]
+    rows = (selects[0] if len(selects) == 1 else union_all(*selects)).subquery()
+    statement = select(rows).order_by(rows.c.created_at, rows.c.id)
+    filename = f"notifications-{datetime.now():%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(
+        export_chunks(statement, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.get("/{notification_id}")
-async def get_notification(notification_id: int, db: Session = Depends(get_db)):
+def get_notification(notification_id: int, include_archived: bool = False, db: Session = Depends(get_db)):
     """
-    Récupère une notification spécifique par son ID
+    Récupère une notification spécifique par son ID (cherche aussi dans l'archive si include_archived)
     """
     notification = db.query(Notification).filter(Notification.id == notification_id).first()
+    if not notification and include_archived:
+        notification = db.query(NotificationArchive).filter(NotificationArchive.id == notification_id).first()
     
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
-    return {
-        "id": notification.id,
-        "message": notification.message,
-        "recipient": notification.recipient,
-        "notification_type": notification.notification_type,
-        "status": notification.status,
-        "twilio_sid": notification.twilio_sid,
-        "error_message": notification.error_message,
-        "created_at": notification.created_at.isoformat() if notification.created_at else None,
-        "sent_at": notification.sent_at.isoformat() if notification.sent_at else None
-    }
\ No newline at end of file
+    return serialize_notification(notification)
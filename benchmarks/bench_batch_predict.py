@@ -0,0 +1,71 @@
+"""
+Benchmark : prédiction ligne par ligne vs prédiction par lot,
+et encodage NumPy vs encodage pandas historique
+Utilisation: python -m benchmarks.bench_batch_predict
+"""
+import os
+import random
+import time
+
+# Mesure du modèle lui-même : cache des prédictions désactivé
+os.environ.setdefault("PREDICTION_CACHE_SIZE", "0")
+
+from app.ml.predictor import get_bundle, predict_humidity, predict_humidity_batch, predict_humidity_pandas
+
+SIZES = [1, 100, 10000]
+
+
+def make_rows(n: int, seed: int = 42) -> list:
+    """Génère n entrées valides à partir des encoders du modèle"""
+    rng = random.Random(seed)
+    encoders = get_bundle().encoders
+    regions = list(encoders['region_dict'])
+    departements = list(encoders['departement_dict'])
+    weathers = list(encoders['weather_order'])
+    return [
+        {
+            'region': rng.choice(regions),
+            'departement': rng.choice(departements),
+            'weather': rng.choice(weathers),
+            'temperature': round(rng.uniform(18, 42), 1),
+            'wind_speed': round(rng.uniform(0, 12), 1),
+            'date': f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00",
+        }
+        for _ in range(n)
+    ]
+
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def single_row_latency(func, row: dict, repeat: int = 500) -> float:
+    """Latence moyenne d'une prédiction unitaire, en microsecondes"""
+    func(row)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(row)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    rows = make_rows(1000)
+    mismatches = sum(predict_humidity(r) != predict_humidity_pandas(r) for r in rows)
+    print(f"Parité encodage NumPy / pandas sur {len(rows)} lignes: {mismatches} écart(s)")
+    fast = single_row_latency(predict_humidity, rows[0])
+    slow = single_row_latency(predict_humidity_pandas, rows[0])
+    print(f"Latence unitaire: NumPy {fast:.0f} µs | pandas {slow:.0f} µs | gain {slow / fast:.1f}x\n")
+
+    print(f"{'lignes':>8} | {'par ligne (s)':>14} | {'par lot (s)':>12} | {'gain':>8}")
+    print("-" * 52)
+    for n in SIZES:
+        rows = make_rows(n)
+        per_row = timed(lambda rs: [predict_humidity(r) for r in rs], rows)
+        batch = timed(predict_humidity_batch, rows)
+        print(f"{n:>8} | {per_row:>14.4f} | {batch:>12.4f} | {per_row / batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
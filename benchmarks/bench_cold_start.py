@@ -0,0 +1,63 @@
+"""
+Benchmark : démarrage à froid de l'API (nouveau processus à chaque mesure)
+Mesure le temps d'import de main.py, la première réponse de /health,
+le passage de /ready à 200 (modèle chargé + warm-up) et la première prédiction.
+Utilisation: python -m benchmarks.bench_cold_start [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROBE = r"""
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    client.get("/health")
+    health = time.perf_counter()
+    while client.get("/ready").status_code != 200:
+        time.sleep(0.005)
+    ready = time.perf_counter()
+    payload = {"region": "Dakar", "departement": "Dakar", "weather": "clear sky",
+               "temperature": 28.5, "wind_speed": 5.2, "date": "2025-01-15 14:00:00"}
+    before = time.perf_counter()
+    client.post("/humidity/predict", json=payload)
+    predicted = time.perf_counter()
+print("RESULT " + json.dumps({
+    "import_s": imported - start,
+    "health_s": health - start,
+    "ready_s": ready - start,
+    "first_predict_ms": (predicted - before) * 1000,
+}))
+"""
+
+
+def run_once(env: dict) -> dict:
+    output = subprocess.run([sys.executable, "-W", "ignore", "-c", PROBE], env=env,
+                            capture_output=True, text=True, check=True).stdout
+    line = next(l for l in output.splitlines() if l.startswith("RESULT "))
+    return json.loads(line[len("RESULT "):])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=os.getenv("DATABASE_URL", f"sqlite:///{tmp}/cold_start.db"))
+        results = [run_once(env) for _ in range(args.runs)]
+
+    for key in results[0]:
+        values = [r[key] for r in results]
+        print(f"{key:>18}: médiane {statistics.median(values):.3f} (min {min(values):.3f}, max {max(values):.3f})")
+
+
+if __name__ == "__main__":
+    main()
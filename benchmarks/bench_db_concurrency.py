@@ -0,0 +1,70 @@
+"""
+Test de charge : débit de GET /notifications/ selon le niveau de concurrence
+Utilisation:
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_db_concurrency
+    python -m benchmarks.bench_db_concurrency --url http://localhost:8000   # serveur déjà lancé
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+LEVELS = [1, 4, 16, 64]
+
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, total: int) -> float:
+    """Envoie `total` requêtes avec `concurrency` clients simultanés ; retourne le débit (req/s)"""
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            response = await client.get("/notifications/", params={"limit": 20})
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return total / (time.perf_counter() - start)
+
+
+def seed(rows: int):
+    """Ajoute des notifications de test si la table en contient moins que `rows`"""
+    from app.db.database import SessionLocal
+    from app.models.notifications import Notification
+
+    db = SessionLocal()
+    try:
+        missing = rows - db.query(Notification).count()
+        if missing > 0:
+            db.bulk_insert_mappings(Notification, [
+                {"message": f"bench {i}", "recipient": f"+22177{i % 1000:07d}", "status": "sent"}
+                for i in range(missing)
+            ])
+            db.commit()
+    finally:
+        db.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="URL d'un serveur déjà lancé (sinon application en processus)")
+    parser.add_argument("--requests", type=int, default=500, help="requêtes par niveau de concurrence")
+    parser.add_argument("--seed", type=int, default=10000, help="nombre de notifications à garantir en base")
+    args = parser.parse_args()
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+    else:
+        import main as api
+        seed(args.seed)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://bench", timeout=60)
+
+    async with client:
+        print(f"{'concurrence':>12} | {'req/s':>10}")
+        print("-" * 26)
+        for level in LEVELS:
+            print(f"{level:>12} | {await run_level(client, level, args.requests):>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
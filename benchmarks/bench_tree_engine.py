@@ -0,0 +1,47 @@
+"""
+Benchmark : moteur d'inférence numpy (arbres aplatis) vs inplace_predict XGBoost,
+sur le modèle actif, avec vérification de la parité des prédictions
+Utilisation: python -m benchmarks.bench_tree_engine
+"""
+import time
+
+import numpy as np
+
+from app.ml.predictor import get_bundle
+from app.ml.tree_engine import TreeEnsemble, parity_sample, verify_parity
+from benchmarks.bench_batch_predict import make_rows
+
+SIZES = [1, 2, 4, 8, 16, 64]
+
+
+def median_us(predict, X: np.ndarray, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predict(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1e6
+
+
+def main():
+    bundle = get_bundle()
+    booster = bundle.booster
+    ensemble = TreeEnsemble.from_booster(booster)
+    X = bundle.prepare(bundle.encode(make_rows(10000)))
+
+    sample = parity_sample(X)
+    diff = verify_parity(ensemble, booster, sample)
+    print(f"Parité : écart max {diff:.2e} sur {len(sample)} lignes "
+          f"({ensemble.n_trees} arbres, profondeur {ensemble.depth})")
+
+    print(f"{'lignes':>8} | {'xgboost':>12} | {'numpy':>12} | gain")
+    for size in SIZES:
+        batch = X[:size]
+        repeat = 2000 if size <= 64 else 200
+        xgb_us = median_us(booster.inplace_predict, batch, repeat)
+        numpy_us = median_us(ensemble.predict, batch, repeat)
+        print(f"{size:>8} | {xgb_us:>9.1f} µs | {numpy_us:>9.1f} µs | x{xgb_us / numpy_us:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Serveurs locaux qui remplacent OpenWeather et Twilio pendant les benchmarks.
+
+Réponses au format des vraies API (champs utilisés par app/ml/weather.py et
+app/core/sms.py), avec une latence simulée configurable.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+WEATHERS = [
+    ("Clear", "clear sky"),
+    ("Clouds", "scattered clouds"),
+    ("Clouds", "broken clouds"),
+    ("Rain", "light rain"),
+]
+
+
+class _Server(ThreadingHTTPServer):
+    # File d'attente de connexions assez longue pour 64 clients simultanés (5 par défaut)
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class FakeServer:
+    """Serveur HTTP local sur un port libre, arrêté à la sortie du bloc with"""
+
+    def __init__(self, handler_class, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(handler_class):
+            fake = server
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = _Server(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def count(self) -> int:
+        """Compte un appel et renvoie son numéro (unique même entre requêtes concurrentes)"""
+        with self._lock:
+            self.calls += 1
+            return self.calls
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _JsonHandler(BaseHTTPRequestHandler):
+    fake = None
+
+    def send_json(self, body: dict, status: int = 200):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class OpenWeatherHandler(_JsonHandler):
+    """/data/2.5/weather et /data/2.5/forecast, valeurs déterministes par lieu"""
+
+    def do_GET(self):
+        self.fake.count()
+        if self.fake.latency:
+            time.sleep(self.fake.latency)
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        rng = random.Random(json.dumps(sorted(query.items())))
+        now = int(time.time())
+        if url.path == "/data/2.5/weather":
+            self.send_json(self._observation(rng, now - now % 600))
+        elif url.path == "/data/2.5/forecast":
+            start = now - now % 10800 + 10800
+            steps = []
+            for i in range(40):
+                step = self._observation(rng, start + i * 10800)
+                step["dt_txt"] = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(step["dt"]))
+                steps.append(step)
+            self.send_json({"cnt": len(steps), "list": steps})
+        else:
+            self.send_json({"message": "not found"}, 404)
+
+    @staticmethod
+    def _observation(rng: random.Random, dt: int) -> dict:
+        main, description = rng.choice(WEATHERS)
+        return {
+            "dt": dt,
+            "weather": [{"main": main, "description": description}],
+            "main": {"temp": round(rng.uniform(20, 40), 1), "humidity": rng.randint(30, 100)},
+            "wind": {"speed": round(rng.uniform(0, 12), 1)},
+            "rain": {"1h": round(rng.uniform(0, 5), 1)} if main == "Rain" else {},
+        }
+
+
+class TwilioHandler(_JsonHandler):
+    """POST /2010-04-01/Accounts/{sid}/Messages.json -> {"sid": ...}"""
+
+    # Destinataires refusés comme le ferait Twilio (400, code 21211 "invalid 'To' number")
+    INVALID_PREFIX = "+000"
+
+    def do_POST(self):
+        call = self.fake.count()
+        form = parse_qs(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode())
+        if self.fake.latency:
+            time.sleep(self.fake.latency)
+        if form.get("To", [""])[0].startswith(self.INVALID_PREFIX):
+            self.send_json({"code": 21211, "message": "The 'To' number is not a valid phone number.", "status": 400}, 400)
+            return
+        self.send_json({"sid": f"SMbench{call:08d}", "status": "queued"}, 201)
+
+
+def fake_openweather(latency: float = 0.05) -> FakeServer:
+    return FakeServer(OpenWeatherHandler, latency)
+
+
+def fake_twilio(latency: float = 0.1) -> FakeServer:
+    return FakeServer(TwilioHandler, latency)
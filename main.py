@@ -1,16 +1,84 @@
 from dotenv import load_dotenv
 import os
 load_dotenv()
-from fastapi import FastAPI
-from app.db.database import Base, engine
-from app.models import user, notifications as notifications_model
+from contextlib import asynccontextmanager
+import anyio
+from fastapi import FastAPI, Response
+from fastapi.responses import PlainTextResponse
+from app.db.database import Base, engine, get_pool_stats
+from app.models import user, notifications as notifications_model, scheduler_lease, observations, alert_state, predictions, retrain_state
 from app.routers import users, notifications, humidity
-from apscheduler.schedulers.background import BackgroundScheduler
-from twilio.rest import Client
-from app.ml.predictor import fetch_weather_dakar, predict_humidity
-from app.core.scheduler import check_humidity_periodically
-app = FastAPI()
-Base.metadata.create_all(bind=engine)
+from app.ml.predictor import is_ready, warm_up
+from app.ml.batcher import get_predict_batcher
+from app.core.jobs import start_scheduler
+from app.core.alerts import get_alert_tracker
+from app.core.leader import start_leader_election, stop_leader_election
+from app.core.outbox import start_outbox_workers, stop_outbox_workers
+from app.core import metrics
+from app.core.profiler import SlowRequestProfiler
+import asyncio
+import threading
+
+
+_scheduler = None
+# Boucle de l'application, sur laquelle tourne le scheduler (fixée par le lifespan)
+_loop = None
+
+
+def on_elected():
+    """Ce processus devient leader : il démarre le scheduler (appelé depuis le thread d'élection)"""
+    global _scheduler
+    # Les états d'alerte ont pu changer pendant qu'un autre processus était leader
+    get_alert_tracker().invalidate()
+    _scheduler = start_scheduler(_loop)
+
+
+def on_demoted():
+    global _scheduler
+    if _scheduler is not None:
+        # L'arrêt est transmis à la boucle de l'application
+        _scheduler.shutdown(wait=False)
+        _scheduler = None
+        print("🕐 Scheduler arrêté: ce processus n'est plus leader")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Les handlers synchrones (DB, modèle) tournent dans le threadpool d'anyio :
+    # on l'aligne sur la capacité du pool de connexions (THREADPOOL_SIZE pour forcer)
+    pool = get_pool_stats()
+    default_threads = max(40, pool.get("size", 0) + (pool.get("max_overflow") or 0))
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = int(os.getenv("THREADPOOL_SIZE", default_threads))
+    global _loop
+    _loop = asyncio.get_running_loop()
+
+    Base.metadata.create_all(bind=engine)
+    # Chargement + warm-up du modèle en arrière-plan : /health répond tout de suite,
+    # /ready passe à 200 quand la première prédiction a été faite
+    threading.Thread(target=warm_up, name="model-warmup", daemon=True).start()
+    # Un seul processus (le leader élu en base) exécute les jobs planifiés ;
+    # SCHEDULER_ENABLED=false pour qu'une réplique ne se présente jamais
+    if os.getenv("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes"):
+        start_leader_election(on_elected=on_elected, on_demoted=on_demoted)
+    start_outbox_workers()
+    # Regroupement des prédictions unitaires concurrentes, dans la boucle de l'application
+    batcher = get_predict_batcher()
+    if batcher is not None:
+        batcher.start()
+    yield
+    if batcher is not None:
+        await batcher.stop()
+    # Attente du thread d'élection et libération du bail hors de la boucle ; on_demoted
+    # transmet l'arrêt du scheduler à la boucle, traité ci-dessous
+    await anyio.to_thread.run_sync(stop_leader_election)
+    # Laisse la boucle traiter l'arrêt du scheduler demandé par on_demoted
+    await asyncio.sleep(0)
+    stop_outbox_workers()
+
+app = FastAPI(lifespan=lifespan)
+# Durée des requêtes par route (+ profil des requêtes lentes si PROFILE_SAMPLE_RATE > 0)
+app.add_middleware(metrics.MetricsMiddleware, profiler=SlowRequestProfiler.from_env())
 
 
 
@@ -21,6 +89,24 @@ app.include_router(humidity.router)
 def health():
     return {"status": "ok working girl"}
 
+@app.get("/ready")
+def ready(response: Response):
+    """Prêt à servir des prédictions : modèle chargé et warm-up terminé (503 sinon)"""
+    if not is_ready():
+        response.status_code = 503
+        return {"status": "warming up"}
+    return {"status": "ready"}
+
+@app.get("/health/db")
+def health_db():
+    """Utilisation du pool de connexions à la base de données"""
+    return get_pool_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Métriques au format Prometheus (histogrammes par étape, compteurs, pool DB)"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # def check_humidity_periodically():
 #     """Fonction appelée périodiquement : fetch → predict → alert SMS si besoin"""
 #     try:
@@ -57,13 +143,3 @@ def health():
     
 #     except Exception as e:
 #         print(f"❌ Erreur dans le scheduler: {e}")
-
-scheduler = BackgroundScheduler()
-scheduler.add_job(
-    func=check_humidity_periodically,
-    trigger="interval",
-     hours=1  
-)
-scheduler.start()
-
-print("🕐 Scheduler démarré: check toutes les heures pour Dakar")
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""
+Configuration commune des tests : base SQLite jetable (sauf DATABASE_URL déjà fixée),
+serveurs OpenWeather / Twilio locaux de benchmarks/fakes.py.
+
+Lancement : python -m pytest -q
+"""
+import os
+import tempfile
+
+# app.db.database crée le moteur à l'import : la variable doit être posée avant
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='samatoll-tests-')}/test.db")
+os.environ.setdefault("MODEL_RELOAD_INTERVAL", "0")
+
+import pytest
+
+from benchmarks.fakes import fake_openweather, fake_twilio
+
+
+@pytest.fixture
+def db():
+    """Session sur des tables recréées à vide pour chaque test"""
+    from app.db.database import Base, SessionLocal, engine
+    from app.models import alert_state, notifications, observations, predictions, retrain_state, scheduler_lease  # noqa: F401
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def openweather():
+    with fake_openweather(0) as server:
+        yield server
+
+
+@pytest.fixture
+def twilio():
+    with fake_twilio(0) as server:
+        yield server
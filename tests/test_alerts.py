@@ -0,0 +1,74 @@
+"""Machine à états des alertes : hystérésis, cooldown des SMS, persistance des transitions"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.alerts import AlertTracker
+from app.models.alert_state import AlertState
+
+T0 = datetime(2025, 6, 1, 12)
+
+
+@pytest.fixture
+def tracker():
+    return AlertTracker(thresholds=(80, 90), hysteresis=5, cooldown=timedelta(hours=6))
+
+
+def cycle(tracker, db, humidity: float, now: datetime, departement: str = "Dakar") -> list:
+    """Un cycle de surveillance : évaluation, écriture et mise à jour du cache"""
+    transitions = tracker.evaluate(db, [(departement, humidity)], now)
+    tracker.save(db, transitions)
+    db.commit()
+    tracker.remember(transitions)
+    return transitions
+
+
+@pytest.mark.parametrize("current, humidity, expected", [
+    (0, 80, 0),     # seuil non dépassé
+    (0, 80.5, 1),
+    (0, 95, 2),     # montée de deux niveaux d'un coup
+    (1, 76, 1),     # entre seuil - hystérésis et seuil : on reste
+    (1, 74.9, 0),
+    (2, 86, 2),
+    (2, 84, 1),
+    (2, 70, 0),
+])
+def test_level_hysteresis(tracker, current, humidity, expected):
+    assert tracker.level_for(current, humidity) == expected
+
+
+def test_oscillation_around_threshold_sends_one_sms(tracker, db):
+    sent = []
+    for hour, humidity in enumerate([82, 79, 81, 78, 83]):
+        sent += [t for t in cycle(tracker, db, humidity, T0 + timedelta(hours=hour)) if t["notify"]]
+    assert len(sent) == 1
+
+
+def test_cooldown_suppresses_repeat_of_same_level(tracker, db):
+    assert cycle(tracker, db, 85, T0)[0]["notify"]
+    assert cycle(tracker, db, 60, T0 + timedelta(hours=1))[0]["level"] == 0
+    # Nouvelle montée au même niveau pendant le cooldown : pas de SMS
+    again = cycle(tracker, db, 85, T0 + timedelta(hours=2))[0]
+    assert again["level"] == 1 and not again["notify"]
+    # Niveau supérieur : annoncé malgré le cooldown
+    assert cycle(tracker, db, 95, T0 + timedelta(hours=3))[0]["notify"]
+    cycle(tracker, db, 60, T0 + timedelta(hours=4))
+    # Après le cooldown, le niveau 1 est annoncé de nouveau
+    assert cycle(tracker, db, 85, T0 + timedelta(hours=10))[0]["notify"]
+
+
+def test_stable_level_writes_nothing(tracker, db):
+    cycle(tracker, db, 85, T0)
+    assert cycle(tracker, db, 88, T0 + timedelta(hours=1)) == []
+    assert db.get(AlertState, "Dakar").since == T0
+
+
+def test_states_are_reloaded_after_invalidate(tracker, db):
+    cycle(tracker, db, 85, T0)
+    # Un autre processus (nouveau tracker) reprend l'état depuis la base : pas de second SMS
+    other = AlertTracker(thresholds=(80, 90), hysteresis=5, cooldown=timedelta(hours=6))
+    assert cycle(other, db, 86, T0 + timedelta(hours=1)) == []
+    cycle(other, db, 60, T0 + timedelta(hours=2))
+    assert cycle(tracker, db, 60, T0 + timedelta(hours=2))[0]["level"] == 0  # cache périmé
+    tracker.invalidate()
+    assert cycle(tracker, db, 60, T0 + timedelta(hours=3)) == []
@@ -0,0 +1,42 @@
+"""Format de service du modèle (manifest.json + modèle natif) face aux pickles historiques"""
+import shutil
+
+import numpy as np
+import pytest
+
+from app.ml import tree_engine
+from app.ml.artifacts import MANIFEST_FILE, export_native, load_bundle, load_legacy_bundle
+from app.ml.predictor import MODEL_DIR
+
+LEGACY_FILES = ("best_humidity_model.pkl", "scaler.pkl", "encoders.pkl", "feature_columns.pkl", "model_metadata.pkl")
+
+
+@pytest.fixture(scope="module")
+def legacy():
+    return load_legacy_bundle(MODEL_DIR)
+
+
+@pytest.fixture(scope="module")
+def rows(legacy):
+    return tree_engine.sample_rows(legacy.encoders, 200, seed=11)
+
+
+def test_native_bundle_matches_legacy_pickles(legacy, rows):
+    native = load_bundle(MODEL_DIR)
+    assert native.features == list(legacy.features)
+    X = native.encode(rows)
+    np.testing.assert_allclose(native.predict(X), legacy.predict(legacy.encode(rows)), atol=1e-4)
+
+
+def test_export_native_round_trip(tmp_path, legacy, rows):
+    for name in LEGACY_FILES:
+        shutil.copy(MODEL_DIR / name, tmp_path / name)
+    # Sans manifeste : chargement historique
+    assert not (tmp_path / MANIFEST_FILE).exists()
+    expected = legacy.predict(legacy.encode(rows))
+    np.testing.assert_allclose(load_bundle(tmp_path).predict(legacy.encode(rows)), expected)
+    export_native(tmp_path)
+    exported = load_bundle(tmp_path)
+    assert exported.booster is not None
+    assert exported.metadata["use_scaler"] == legacy.metadata["use_scaler"]
+    np.testing.assert_allclose(exported.predict(exported.encode(rows)), expected, atol=1e-4)
@@ -0,0 +1,88 @@
+"""Regroupement des prédictions unitaires (MicroBatcher)"""
+import asyncio
+import time
+
+from app.ml.batcher import MicroBatcher
+
+
+class Model:
+    """predict_batch de test : double chaque entrée, refuse les négatives, note la taille des lots"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+
+    def __call__(self, rows: list) -> list:
+        self.calls.append(len(rows))
+        time.sleep(self.delay)
+        if any(row < 0 for row in rows):
+            raise ValueError("entrée négative")
+        return [row * 2 for row in rows]
+
+
+def run(batcher, scenario):
+    """Exécute scenario(batcher) dans une boucle neuve, puis arrête le batcher"""
+    async def main():
+        try:
+            return await scenario(batcher)
+        finally:
+            await batcher.stop()
+
+    return asyncio.run(main())
+
+
+def test_requests_arriving_during_a_batch_are_scored_together():
+    model = Model(delay=0.05)
+    batcher = MicroBatcher(model, window=0.01, max_batch_size=64)
+
+    async def scenario(batcher):
+        first = asyncio.ensure_future(batcher.submit(0))
+        await asyncio.sleep(0.01)
+        # Le premier lot (une seule requête, pas de fenêtre) est en cours : les suivantes s'accumulent
+        rest = await asyncio.gather(*(batcher.submit(i) for i in range(1, 21)))
+        return [await first] + rest
+
+    assert run(batcher, scenario) == [i * 2 for i in range(21)]
+    assert model.calls == [1, 20]
+    assert batcher.stats()["mean_batch_size"] == 10.5
+
+
+def test_batches_are_capped_at_max_batch_size():
+    model = Model()
+    batcher = MicroBatcher(model, window=0.01, max_batch_size=4)
+
+    async def scenario(batcher):
+        return await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+
+    assert run(batcher, scenario) == [i * 2 for i in range(10)]
+    assert model.calls == [4, 4, 2]
+
+
+def test_invalid_row_fails_only_its_own_request():
+    model = Model()
+    batcher = MicroBatcher(model, window=0.01, max_batch_size=8)
+
+    async def scenario(batcher):
+        return await asyncio.gather(*(batcher.submit(row) for row in (1, -1, 2)), return_exceptions=True)
+
+    ok_1, error, ok_2 = run(batcher, scenario)
+    assert (ok_1, ok_2) == (2, 4)
+    assert isinstance(error, ValueError)
+    # Un appel pour le lot, puis une ligne à la fois
+    assert model.calls == [3, 1, 1, 1]
+
+
+def test_stop_fails_pending_requests():
+    batcher = MicroBatcher(Model(delay=0.05), window=0.01, max_batch_size=1)
+
+    async def scenario(batcher):
+        first = asyncio.ensure_future(batcher.submit(1))
+        second = asyncio.ensure_future(batcher.submit(2))
+        await asyncio.sleep(0.01)
+        await batcher.stop()
+        return await asyncio.gather(first, second, return_exceptions=True)
+
+    # Lot en cours de scoring et entrée encore en file : les deux échouent au lieu d'attendre indéfiniment
+    first, second = run(batcher, scenario)
+    assert isinstance(first, RuntimeError)
+    assert isinstance(second, RuntimeError)
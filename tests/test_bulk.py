@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.ml.bulk import BulkInputError, RecordSplitter
+from app.routers import humidity
+
+HEADER = "region,departement,weather,temperature,wind_speed,date,note\n"
+ROW = 'Dakar,Dakar,clear sky,30,5,2025-06-15 14:00:00,"ligne 1\nligne 2, avec virgule"\n'
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = FastAPI()
+    app.include_router(humidity.router)
+    return TestClient(app)
+
+
+def test_splitter_keeps_quoted_newlines_and_line_numbers():
+    splitter = RecordSplitter(quoted=True)
+    data = (HEADER + ROW + ROW).encode()
+    # Morceaux arbitraires, coupés au milieu des enregistrements
+    records = []
+    for i in range(0, len(data), 7):
+        records += splitter.feed(data[i:i + 7])
+    records += splitter.feed(b"", final=True)
+    assert [line for line, _ in records] == [1, 2, 4]
+    assert records[1][1] == ROW
+
+
+def test_splitter_decodes_multibyte_characters_split_across_chunks():
+    splitter = RecordSplitter(quoted=False)
+    data = '{"departement": "Thiès"}\n'.encode()
+    cut = data.index("è".encode()) + 1
+    records = splitter.feed(data[:cut]) + splitter.feed(data[cut:], final=True)
+    assert json.loads(records[0][1]) == {"departement": "Thiès"}
+
+
+def test_splitter_rejects_unterminated_quote():
+    splitter = RecordSplitter(quoted=True)
+    splitter.feed(HEADER.encode())
+    with pytest.raises(BulkInputError, match="Ligne 2"):
+        splitter.feed(b'Dakar,"ouvert\n', final=True)
+
+
+def test_csv_stream_scores_every_row(client, monkeypatch):
+    monkeypatch.setenv("PREDICT_STREAM_CHUNK_ROWS", "7")
+    response = client.post("/humidity/predict/stream", content=(HEADER + ROW * 20).encode(),
+                           headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 20
+    assert rows[0]["note"] == "ligne 1\nligne 2, avec virgule"
+    assert rows[0]["level"] in ("info", "success", "warning", "danger")
+    assert response.headers["X-Model-Version"]
+
+
+def test_ndjson_output_from_csv(client):
+    response = client.post("/humidity/predict/stream?format=ndjson", content=(HEADER + ROW).encode(),
+                           headers={"Content-Type": "text/csv"})
+    line = json.loads(response.text.splitlines()[0])
+    assert isinstance(line["predicted_humidity"], float)
+
+
+def test_error_in_first_batch_is_a_400(client):
+    response = client.post("/humidity/predict/stream",
+                           content=(HEADER + "Dakar,Dakar,clear sky,chaud,5,2025-06-15,x\n").encode(),
+                           headers={"Content-Type": "text/csv"})
+    assert response.status_code == 400
+    assert "Ligne 2" in response.json()["detail"]
+
+
+def test_error_after_first_batch_interrupts_the_response(client, monkeypatch):
+    monkeypatch.setenv("PREDICT_STREAM_CHUNK_ROWS", "2")
+    body = (HEADER + ROW * 4 + "{pas du csv\n").encode()
+    with pytest.raises(BulkInputError):
+        client.post("/humidity/predict/stream", content=body, headers={"Content-Type": "text/csv"})
+
+
+def test_buffered_mode_reports_row_count_and_late_errors(client, monkeypatch):
+    monkeypatch.setenv("PREDICT_STREAM_CHUNK_ROWS", "2")
+    response = client.post("/humidity/predict/stream?buffered=true", content=(HEADER + ROW * 5).encode(),
+                           headers={"Content-Type": "text/csv"})
+    assert response.headers["X-Rows-Scored"] == "5"
+    body = (HEADER + ROW * 4 + "{pas du csv\n").encode()
+    response = client.post("/humidity/predict/stream?buffered=true", content=body,
+                           headers={"Content-Type": "text/csv"})
+    assert response.status_code == 400
+    assert "Ligne 10" in response.json()["detail"]
+
+
+def test_unsupported_content_type(client):
+    response = client.post("/humidity/predict/stream", content=b"x", headers={"Content-Type": "text/plain"})
+    assert response.status_code == 415
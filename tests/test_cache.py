@@ -0,0 +1,61 @@
+"""Cache LRU + TTL des prédictions"""
+import os
+import time
+
+import numpy as np
+
+from app.ml.cache import PredictionCache
+
+FEATURES = ["region", "temperature", "wind_speed", "month"]
+
+
+def row(temperature: float, wind_speed: float = 5.0, region: float = 1.0):
+    return np.array([region, temperature, wind_speed, 6], dtype=np.float32)
+
+
+def test_key_quantizes_temperature_and_wind_and_normalizes_nan():
+    cache = PredictionCache(FEATURES, temperature_step=0.1, wind_step=0.5)
+    assert cache.key(row(30.01, 5.1)) == cache.key(row(29.99, 4.9))
+    assert cache.key(row(30.2)) != cache.key(row(30.0))
+    # NaN != NaN : la clé doit rester égale à elle-même
+    assert cache.key(row(30.0, region=np.nan)) == cache.key(row(30.0, region=np.nan))
+
+
+def test_lru_eviction_and_hit_rate():
+    cache = PredictionCache(FEATURES, maxsize=2)
+    cache.set("a", 1.0)
+    cache.set("b", 2.0)
+    assert cache.get("a") == 1.0          # "a" devient la plus récente
+    cache.set("c", 3.0)                   # évince "b"
+    assert cache.get("b") is None
+    assert cache.get("c") == 3.0
+    stats = cache.stats()
+    assert (stats["size"], stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 1, 1)
+    assert stats["hit_rate"] == round(2 / 3, 4)
+
+
+def test_expired_entries_are_misses():
+    cache = PredictionCache(FEATURES, ttl=0.01)
+    cache.set("a", 1.0)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_disabled_cache_stores_nothing():
+    cache = PredictionCache(FEATURES, maxsize=0)
+    cache.set("a", 1.0)
+    assert not cache.enabled
+    assert cache.get("a") is None
+
+
+def test_cache_is_cleared_when_model_files_change(tmp_path):
+    model = tmp_path / "best_humidity_model.ubj"
+    model.write_bytes(b"v1")
+    cache = PredictionCache(FEATURES, watch_dir=tmp_path, check_interval=0)
+    cache.set("a", 1.0)
+    assert cache.get("a") == 1.0
+    model.write_bytes(b"version 2")
+    os.utime(model, ns=(time.time_ns(), time.time_ns() + 10**9))
+    assert cache.get("a") is None
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+
+from app.core.checks import CheckRunner
+from app.core.leader import LeaderElector
+
+
+def slow_check(calls: list, duration: float = 0.2):
+    active = []
+    lock = threading.Lock()
+
+    def check(report):
+        with lock:
+            active.append(1)
+            calls.append(len(active))
+        time.sleep(duration)
+        report["stages"]["weather"] = duration * 1000
+        report["locations"] = 1
+        with lock:
+            active.pop()
+        return "ok"
+
+    return check
+
+
+def test_concurrent_requests_join_the_running_cycle():
+    calls = []
+    runner = CheckRunner(slow_check(calls))
+
+    async def scenario():
+        run, coalesced = runner.submit("manual")
+        joined = await asyncio.gather(runner.run("scheduled"), runner.run("manual"))
+        return run, coalesced, joined
+
+    run, coalesced, joined = asyncio.run(scenario())
+    assert not coalesced
+    assert len(calls) == 1
+    assert all(other is run for other in joined)
+    assert run["requests"] == 3
+    assert run["status"] == "succeeded"
+    assert run["stages"]["weather"] == 200
+    assert run["details"] == {"locations": 1}
+
+
+def test_history_is_bounded_and_failures_reported():
+    def failing(report):
+        raise RuntimeError("OpenWeather indisponible")
+
+    runner = CheckRunner(failing, history_size=2)
+
+    async def scenario():
+        return [await runner.run("manual") for _ in range(3)]
+
+    runs = asyncio.run(scenario())
+    assert [run["status"] for run in runs] == ["failed"] * 3
+    assert runs[-1]["error"] == "OpenWeather indisponible"
+    assert runner.get(runs[0]["job_id"]) is None
+    assert [run["job_id"] for run in runner.recent()] == [runs[2]["job_id"], runs[1]["job_id"]]
+
+
+def test_cycles_are_serialized_across_processes(db):
+    # Deux runners = deux processus : même bail en base, détenteurs différents
+    calls = []
+    check = slow_check(calls)
+    runners = [
+        CheckRunner(check, lease=LeaderElector(name="humidity_check", holder=f"worker-{i}", ttl=60),
+                    lock_poll_interval=0.02)
+        for i in range(2)
+    ]
+
+    async def scenario():
+        return await asyncio.gather(*(runner.run("manual") for runner in runners))
+
+    first, second = asyncio.run(scenario())
+    # Jamais deux cycles en même temps ; le second a attendu le bail
+    assert calls == [1, 1]
+    assert {first["status"], second["status"]} == {"succeeded"}
+    assert max(first["stages"]["lock"], second["stages"]["lock"]) >= 150
+
+
+def test_alert_cache_is_reloaded_only_after_another_holder(db):
+    from app.core.alerts import get_alert_tracker
+
+    tracker = get_alert_tracker()
+    seen = []
+
+    def check(report):
+        seen.append(tracker._states is None)
+        # Comme un vrai cycle : le cache est (re)chargé pendant l'évaluation
+        tracker._states = {}
+        return "ok"
+
+    mine = CheckRunner(check, lease=LeaderElector(name="humidity_check", holder="worker-0", ttl=60))
+    other = CheckRunner(check, lease=LeaderElector(name="humidity_check", holder="worker-1", ttl=60))
+    tracker._states = {}
+    try:
+        for runner in (mine, mine, other, mine):
+            asyncio.run(runner.run("manual"))
+    finally:
+        tracker.invalidate()
+    # Création du bail, cycle suivant en cache, puis relecture à chaque changement de détenteur
+    assert seen == [True, False, True, True]
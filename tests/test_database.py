@@ -0,0 +1,43 @@
+"""Pool de connexions configurable et ses statistiques"""
+import inspect
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+from app.db import database
+from app.routers import notifications
+
+
+def test_pool_options_from_env(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "4")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "6")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "no")
+    options = database._engine_options("postgresql://user@localhost/db")
+    assert (options["pool_size"], options["max_overflow"], options["pool_pre_ping"]) == (4, 6, False)
+    assert options["pool_recycle"] == 1800
+    # SQLite : pool par défaut du dialecte
+    assert database._engine_options("sqlite:///test.db") == {}
+
+
+def test_pool_stats_follow_checkouts(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/pool.db", poolclass=QueuePool, pool_size=2, max_overflow=3)
+    monkeypatch.setattr(database, "engine", engine)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        stats = database.get_pool_stats()
+        assert (stats["pool"], stats["size"], stats["checkedout"], stats["max_overflow"]) == ("QueuePool", 2, 1, 3)
+    assert database.get_pool_stats()["checkedout"] == 0
+    gauges = {name: value for name, _, _, value, _ in database._collect_pool_metrics()}
+    assert gauges["db_pool_size"] == 2 and gauges["db_pool_max_overflow"] == 3
+
+
+def test_commit_duration_is_recorded(db):
+    count = database.COMMIT_SECONDS._series.get((), [None, 0, 0])[2]
+    db.commit()
+    assert database.COMMIT_SECONDS._series[()][2] == count + 1
+
+
+def test_database_handlers_run_in_the_threadpool():
+    # Un handler async ferait ses appels SQLAlchemy bloquants sur la boucle d'événements
+    for route in notifications.router.routes:
+        assert not inspect.iscoroutinefunction(route.endpoint), route.path
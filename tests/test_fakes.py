@@ -0,0 +1,19 @@
+"""Faux serveurs des benchmarks"""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+
+from benchmarks.fakes import fake_twilio
+
+
+def send(twilio, i: int) -> str:
+    with urlopen(f"{twilio.url}/2010-04-01/Accounts/AC/Messages.json", data=f"To=%2B2217700{i:05d}".encode()) as r:
+        return json.load(r)["sid"]
+
+
+def test_twilio_sids_are_unique_under_concurrency():
+    # Latence : d'autres requêtes sont comptées pendant qu'une réponse est préparée
+    with fake_twilio(0.05) as twilio, ThreadPoolExecutor(32) as pool:
+        sids = list(pool.map(lambda i: send(twilio, i), range(200)))
+    assert len(set(sids)) == 200
+    assert twilio.calls == 200
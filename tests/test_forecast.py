@@ -0,0 +1,49 @@
+"""GET /humidity/forecast : tous les pas des prévisions scorés en un seul passage"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.locations import find_location
+from app.ml import predictor, weather
+from app.ml.weather import WeatherClient
+from app.routers import humidity
+
+
+@pytest.fixture
+def client(openweather, monkeypatch):
+    monkeypatch.setenv("OPENWEATHER_API_KEY", "test")
+    monkeypatch.setattr(weather, "_client", WeatherClient(base_url=openweather.url, max_retries=0))
+    app = FastAPI()
+    app.include_router(humidity.router)
+    return TestClient(app)
+
+
+def test_forecast_scores_every_step(client, openweather):
+    body = client.get("/humidity/forecast", params={"departement": "Thiès"}).json()
+    assert body["departement"] == "Thiès"
+    assert body["count"] == len(body["forecast"]) == 40
+    steps = weather.get_weather_client().forecast(find_location("Thiès"))["steps"]
+    expected = predictor.predict_humidity_batch(steps)
+    assert [step["humidity"] for step in body["forecast"]] == [round(h, 1) for h in expected]
+    assert body["peak"]["humidity"] == max(step["humidity"] for step in body["forecast"])
+    assert openweather.calls == 1
+
+
+def test_curve_is_reused_while_the_forecast_is_cached(client, openweather):
+    location = find_location("Dakar")
+    first = predictor.predict_forecast("test", location)
+    # Même série de prévisions, même version : la courbe déjà scorée est renvoyée telle quelle
+    assert predictor.predict_forecast("test", location) is first
+    assert openweather.calls == 1
+    assert client.get("/humidity/forecast", params={"departement": "Dakar"}).json()["count"] == len(first["steps"])
+
+
+def test_unknown_departement_and_missing_key(client, monkeypatch):
+    assert client.get("/humidity/forecast", params={"departement": "Atlantide"}).status_code == 404
+    monkeypatch.delenv("OPENWEATHER_API_KEY")
+    assert client.get("/humidity/forecast", params={"departement": "Dakar"}).status_code == 503
+
+
+def test_upstream_failure_is_a_bad_gateway(client, monkeypatch):
+    monkeypatch.setattr(weather, "_client", WeatherClient(base_url="http://127.0.0.1:9", max_retries=0))
+    assert client.get("/humidity/forecast", params={"departement": "Kolda"}).status_code == 502
@@ -0,0 +1,67 @@
+"""Élection du leader par bail en base (scheduler_leases)"""
+from sqlalchemy import update
+
+from app.core.leader import LeaderElector, _utcnow
+from app.models.scheduler_lease import SchedulerLease
+
+
+def elector(holder: str, events: list = None, ttl: float = 30) -> LeaderElector:
+    events = events if events is not None else []
+    return LeaderElector(name="test", holder=holder, ttl=ttl,
+                         on_elected=lambda: events.append((holder, "elected")),
+                         on_demoted=lambda: events.append((holder, "demoted")))
+
+
+def expire(db, name: str = "test"):
+    """Simule un leader mort : son bail est échu"""
+    db.execute(update(SchedulerLease).where(SchedulerLease.name == name).values(expires_at=_utcnow()))
+    db.commit()
+
+
+def test_single_leader_among_processes(db):
+    events = []
+    workers = [elector(f"worker-{i}", events) for i in range(3)]
+    for _ in range(2):
+        for worker in workers:
+            worker.step()
+    assert [w.is_leader() for w in workers] == [True, False, False]
+    assert events == [("worker-0", "elected")]
+
+
+def test_lease_is_taken_over_after_expiry(db):
+    events = []
+    first, second = elector("worker-0", events), elector("worker-1", events)
+    first.step()
+    second.step()
+    expire(db)
+    second.step()
+    assert second.is_leader()
+    # L'ancien leader constate la perte du bail au tour suivant
+    first.step()
+    assert not first.is_leader()
+    assert events == [("worker-0", "elected"), ("worker-1", "elected"), ("worker-0", "demoted")]
+
+
+def test_release_hands_over_without_waiting_for_ttl(db):
+    first, second = elector("worker-0"), elector("worker-1")
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    first.release()
+    assert second.try_acquire()
+    # Le détenteur renouvelle son propre bail
+    assert second.try_acquire()
+    assert db.get(SchedulerLease, "test").holder == "worker-1"
+
+
+def test_leader_keeps_local_lease_when_database_is_unavailable(db):
+    def broken_session():
+        raise RuntimeError("base indisponible")
+
+    leader = elector("worker-0")
+    leader.step()
+    leader.session_factory = broken_session
+    leader.step()
+    assert leader.is_leader()
+    leader._valid_until = 0
+    leader.step()
+    assert not leader.is_leader()
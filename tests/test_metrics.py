@@ -0,0 +1,62 @@
+"""Exposition Prometheus (GET /metrics) et middleware de durée des requêtes"""
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+
+
+def exposed(name: str) -> list:
+    return [line for line in metrics.render().splitlines() if line.startswith(name)]
+
+
+def test_counter_series_and_label_escaping():
+    counter = metrics.counter("test_events", "Événements de test", ("kind",))
+    counter.inc(kind='a"b')
+    counter.inc(2, kind='a"b')
+    assert exposed("test_events_total") == ['test_events_total{kind="a\\"b"} 3']
+    assert "# TYPE test_events_total counter" in metrics.render()
+    # Redéclaration (module rechargé) : même série
+    assert metrics.counter("test_events", "Événements de test", ("kind",)) is counter
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.histogram("test_duration_seconds", "Durées de test", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 5.0):
+        histogram.observe(value)
+    assert exposed("test_duration_seconds") == [
+        'test_duration_seconds_bucket{le="0.1"} 1',
+        'test_duration_seconds_bucket{le="1.0"} 3',
+        'test_duration_seconds_bucket{le="+Inf"} 4',
+        "test_duration_seconds_sum 6.25",
+        "test_duration_seconds_count 4",
+    ]
+
+
+def test_failing_collector_does_not_break_the_scrape():
+    def broken():
+        raise RuntimeError("source indisponible")
+        yield
+
+    metrics.register_collector(broken)
+    metrics.register_collector(lambda: iter([("test_gauge", "gauge", "Jauge de test", 7, {"pool": "db"})]))
+    assert exposed("test_gauge") == ['test_gauge{pool="db"} 7']
+
+
+def test_middleware_labels_requests_by_route_template():
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404)
+        return {"id": item_id}
+
+    client = TestClient(app)
+    for item_id in (1, 2, 0):
+        client.get(f"/items/{item_id}")
+    client.get("/nulle-part")
+    counts = exposed("http_request_duration_seconds_count")
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="200"} 2' in counts
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="404"} 1' in counts
+    assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 1' in counts
@@ -0,0 +1,110 @@
+"""Pagination keyset de GET /notifications/ (table chaude et archive) et export en flux"""
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.core.retention import NOTIFICATION_COLUMNS
+from app.models.notifications import Notification, NotificationArchive
+from app.routers import notifications
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(notifications.router)
+    return TestClient(app)
+
+
+@pytest.fixture
+def rows(db):
+    start = datetime(2025, 1, 1)
+    # Horodatages en double : l'id départage les lignes d'une même seconde
+    for i in range(23):
+        db.add(Notification(message=f"m{i}", recipient="+221770000000" if i % 2 else "+221780000000",
+                            status="sent", created_at=start + timedelta(seconds=i // 3)))
+    db.add(NotificationArchive(id=1000, message="archivée", recipient="+221770000000", notification_type="sms",
+                               status="sent", created_at=start - timedelta(days=30)))
+    db.commit()
+    return db.query(Notification).all()
+
+
+def walk(client, **params) -> list:
+    """Toutes les pages, en suivant next_cursor"""
+    pages, cursor = [], None
+    while True:
+        body = client.get("/notifications/", params=dict(params, cursor=cursor) if cursor else params).json()
+        pages.append([n["id"] for n in body["notifications"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def expected_ids(notifications) -> list:
+    return [n.id for n in sorted(notifications, key=lambda n: (n.created_at, n.id), reverse=True)]
+
+
+def test_cursor_walks_every_row_once_in_order(client, rows):
+    pages = walk(client, limit=5)
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    assert sum(pages, []) == expected_ids(rows)
+
+
+def test_cursor_with_filter_and_archive(client, rows):
+    pages = walk(client, limit=4, recipient="+221770000000", include_archived="true")
+    expected = expected_ids([n for n in rows if n.recipient == "+221770000000"]) + [1000]
+    assert sum(pages, []) == expected
+
+
+def test_archive_is_read_only_on_request(client, rows):
+    assert client.get("/notifications/1000").status_code == 404
+    assert client.get("/notifications/1000", params={"include_archived": "true"}).json()["message"] == "archivée"
+
+
+def test_total_is_an_exact_count_unless_disabled(client, rows):
+    assert client.get("/notifications/", params={"limit": 5, "recipient": "+221770000000"}).json()["total"] == 11
+    assert client.get("/notifications/", params={"limit": 5, "count": "none"}).json()["total"] is None
+
+
+def test_skip_is_rejected_with_cursor(client, rows):
+    first = client.get("/notifications/", params={"limit": 5}).json()
+    response = client.get("/notifications/", params={"limit": 5, "skip": 5, "cursor": first["next_cursor"]})
+    assert response.status_code == 400
+    # Sans curseur, skip reste un OFFSET classique
+    offset = client.get("/notifications/", params={"limit": 5, "skip": 5, "count": "none"}).json()
+    assert [n["id"] for n in offset["notifications"]] == expected_ids(rows)[5:10]
+    assert offset["total"] is None
+
+
+def test_invalid_cursor(client, rows):
+    assert client.get("/notifications/", params={"cursor": "pas-un-curseur"}).status_code == 400
+
+
+def test_export_streams_every_row_in_chronological_order(client, rows):
+    response = client.get("/notifications/export", params={"format": "ndjson", "include_archived": "true"})
+    assert response.status_code == 200
+    assert response.headers["content-disposition"].endswith('.ndjson"')
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    assert [n["id"] for n in exported] == [1000] + expected_ids(rows)[::-1]
+    assert exported[0]["created_at"] == "2024-12-02T00:00:00"
+
+
+def test_export_csv_in_batches(rows):
+    statement = select(*[getattr(Notification, c) for c in NOTIFICATION_COLUMNS]).order_by(
+        Notification.created_at, Notification.id)
+    chunks = list(notifications.export_chunks(statement, "csv", batch_size=10))
+    # En-tête avec le premier lot, puis un bloc par lot de 10 lignes
+    assert len(chunks) == 3
+    records = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert records[0] == NOTIFICATION_COLUMNS
+    assert [int(r[0]) for r in records[1:]] == expected_ids(rows)[::-1]
+
+
+def test_empty_export_has_only_the_header(client, db):
+    response = client.get("/notifications/export", params={"status": "failed"})
+    assert response.text == ",".join(NOTIFICATION_COLUMNS) + "\n"
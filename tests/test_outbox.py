@@ -0,0 +1,97 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.outbox import OutboxWorkerPool, claim_pending, reclaim_stale
+from app.core.sms import PermanentSmsError, SmsSender, TokenBucket
+from app.db.database import SessionLocal
+from app.models.notifications import Notification
+
+
+def add(db, recipient="+221770000000", **values):
+    notification = Notification(message="test", recipient=recipient, notification_type="sms", **values)
+    db.add(notification)
+    db.commit()
+    return notification
+
+
+def statuses(db) -> dict:
+    db.expire_all()
+    return {n.recipient: (n.status, n.attempts) for n in db.query(Notification)}
+
+
+def make_pool(twilio, **kwargs) -> OutboxWorkerPool:
+    sender = SmsSender("ACtest", "token", "+15550000000", api_url=twilio.url)
+    options = dict(rate_per_second=1000, burst=1000, backoff_base=0, max_retries=2, sender=sender)
+    options.update(kwargs)
+    return OutboxWorkerPool(session_factory=SessionLocal, **options)
+
+
+def test_claim_marks_rows_sending_once(db):
+    add(db, "+1")
+    add(db, "+2")
+    assert len(claim_pending(db, 10)) == 2
+    assert claim_pending(db, 10) == []
+    assert statuses(db) == {"+1": ("sending", 1), "+2": ("sending", 1)}
+    assert all(n.claimed_at is not None for n in db.query(Notification))
+
+
+def test_reclaim_requeues_expired_claims_only(db):
+    add(db, "+1")
+    claim_pending(db, 10)
+    add(db, "+2", status="sending", attempts=1,
+        claimed_at=datetime.now(timezone.utc) - timedelta(hours=1))
+    assert reclaim_stale(db, lease=600, max_attempts=3) == (1, 0)
+    assert statuses(db) == {"+1": ("sending", 1), "+2": ("pending", 1)}
+
+
+def test_reclaim_abandons_after_max_attempts(db):
+    old = datetime.now(timezone.utc) - timedelta(hours=1)
+    add(db, "+1", status="sending", attempts=3, claimed_at=old)
+    add(db, "+2", status="sending", attempts=2, claimed_at=old)
+    assert reclaim_stale(db, lease=600, max_attempts=3) == (1, 1)
+    assert statuses(db) == {"+1": ("failed", 3), "+2": ("pending", 2)}
+
+
+def test_reclaim_picks_up_rows_claimed_before_the_lease_column(db):
+    add(db, "+1", status="sending")
+    assert reclaim_stale(db, lease=600, max_attempts=3) == (1, 0)
+
+
+def test_pool_sends_and_records_sid(db, twilio):
+    add(db, "+221770000001")
+    assert make_pool(twilio).process_batch() == 1
+    notification = db.query(Notification).one()
+    db.refresh(notification)
+    assert notification.status == "sent"
+    assert notification.twilio_sid.startswith("SMbench")
+
+
+def test_permanent_twilio_error_is_not_retried(db, twilio):
+    add(db, "+000123")
+    pool = make_pool(twilio, max_retries=3)
+    assert pool.process_batch() == 1
+    notification = db.query(Notification).one()
+    db.refresh(notification)
+    assert notification.status == "failed"
+    assert "400" in notification.error_message
+    assert twilio.calls == 1
+
+
+def test_sender_classifies_4xx_as_permanent(twilio):
+    sender = SmsSender("ACtest", "token", "+15550000000", api_url=twilio.url)
+    with pytest.raises(PermanentSmsError):
+        sender.send("+000123", "test")
+
+
+def test_token_bucket_allows_burst_then_rate():
+    bucket = TokenBucket(rate=50, capacity=5)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.05
+    for _ in range(5):
+        bucket.acquire()
+    # 5 jetons au-delà de la rafale à 50/s : au moins ~100 ms
+    assert time.monotonic() - start >= 0.08
@@ -0,0 +1,55 @@
+"""POST /humidity/predict/batch : un passage du modèle, mêmes résultats que la prédiction unitaire"""
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.ml import tree_engine
+from app.ml.predictor import _build_features_pandas, encode_features, get_bundle, predict_humidity, predict_humidity_batch, predict_humidity_pandas
+from app.routers import humidity
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = FastAPI()
+    app.include_router(humidity.router)
+    return TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def inputs():
+    return tree_engine.sample_rows(get_bundle().encoders, 50, seed=3)
+
+
+def test_batch_matches_single_predictions_in_order(client, inputs):
+    response = client.post("/humidity/predict/batch", json={"inputs": inputs})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["count"] == len(inputs)
+    expected = [humidity.classify_humidity(predict_humidity(row)) for row in inputs]
+    assert body["predictions"] == expected
+
+
+def test_batch_matches_pandas_reference(inputs):
+    assert predict_humidity_batch(inputs[:10]) == pytest.approx(
+        [predict_humidity_pandas(row) for row in inputs[:10]], abs=1e-3)
+
+
+def test_fast_encoder_matches_pandas(inputs):
+    bundle = get_bundle()
+    X = encode_features(inputs)
+    if bundle.use_scaler:
+        X = (X - bundle.scaler_mean) / bundle.scaler_scale
+    expected = np.asarray(_build_features_pandas(inputs), dtype=np.float32)
+    np.testing.assert_allclose(X, expected, rtol=1e-6, atol=1e-6)
+
+
+def test_batch_size_limits(client, inputs):
+    assert client.post("/humidity/predict/batch", json={"inputs": []}).status_code == 422
+    too_many = {"inputs": inputs[:1] * (humidity.MAX_BATCH_SIZE + 1)}
+    assert client.post("/humidity/predict/batch", json=too_many).status_code == 422
+
+
+def test_invalid_row_is_rejected(client, inputs):
+    bad = dict(inputs[0], date="pas une date")
+    assert client.post("/humidity/predict/batch", json={"inputs": [inputs[1], bad]}).status_code == 400
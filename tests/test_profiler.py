@@ -0,0 +1,49 @@
+"""Profiler des requêtes lentes : finish() ne bloque pas l'appelant"""
+import threading
+import time
+from pathlib import Path
+
+from app.core.profiler import SlowRequestProfiler
+
+
+def busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_finish_returns_before_the_profile_is_written(tmp_path, monkeypatch):
+    profiler = SlowRequestProfiler(sample_rate=1, slow_threshold=0, interval=0.001, output_dir=tmp_path)
+    gate = threading.Event()
+    write_text = Path.write_text
+
+    def slow_write(path, data):
+        gate.wait(5)
+        return write_text(path, data)
+
+    monkeypatch.setattr(Path, "write_text", slow_write)
+    session = profiler.maybe_start()
+    busy(0.05)
+    start = time.perf_counter()
+    profiler.finish(session, 0.05, "GET /humidity/predict")
+    assert time.perf_counter() - start < 0.01
+    # Écriture en cours : pas de second profil en parallèle
+    assert profiler.maybe_start() is None
+    gate.set()
+    session.join(5)
+    profile, = tmp_path.glob("*-GET-humidity-predict-50ms.collapsed")
+    assert "busy (test_profiler.py" in profile.read_text()
+    assert profiler.saved == 1
+    session = profiler.maybe_start()
+    assert session is not None
+    profiler.finish(session, 0, "GET /")
+    session.join(5)
+
+
+def test_fast_request_is_not_saved(tmp_path):
+    profiler = SlowRequestProfiler(sample_rate=1, slow_threshold=1, interval=0.001, output_dir=tmp_path)
+    session = profiler.maybe_start()
+    profiler.finish(session, 0.01, "GET /")
+    session.join(5)
+    assert profiler.saved == 0
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,88 @@
+import shutil
+
+import pytest
+
+from app.ml.predictor import MODEL_DIR
+from app.ml.registry import ACTIVE_FILE, BASE_VERSION, ModelRegistry
+
+MODEL_FILES = ("manifest.json", "best_humidity_model.ubj")
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    for name in MODEL_FILES:
+        shutil.copy(MODEL_DIR / name, tmp_path / name)
+    return tmp_path
+
+
+def add_version(model_dir, name: str):
+    (model_dir / name).mkdir()
+    for file in MODEL_FILES:
+        shutil.copy(MODEL_DIR / file, model_dir / name / file)
+
+
+def test_new_version_on_disk_is_a_shadow_candidate_not_activated(model_dir, monkeypatch):
+    monkeypatch.delenv("MODEL_VERSION", raising=False)
+    registry = ModelRegistry(model_dir)
+    assert registry.active().name == BASE_VERSION
+    add_version(model_dir, "v20990101-000000")
+    registry.reload()
+    stats = registry.stats()
+    assert stats["active"] == BASE_VERSION
+    assert stats["shadow"] == "v20990101-000000"
+    # Une candidate plus récente remplace la précédente
+    add_version(model_dir, "v20990201-000000")
+    registry.reload()
+    assert registry.stats()["shadow"] == "v20990201-000000"
+
+
+def test_manual_shadow_is_kept(model_dir, monkeypatch):
+    monkeypatch.delenv("MODEL_VERSION", raising=False)
+    add_version(model_dir, "v20990101-000000")
+    registry = ModelRegistry(model_dir)
+    registry.active()
+    registry.set_shadow("v20990101-000000")
+    add_version(model_dir, "v20990201-000000")
+    registry.reload()
+    assert registry.stats()["shadow"] == "v20990101-000000"
+
+
+def test_promotion_writes_active_and_other_processes_follow(model_dir, monkeypatch):
+    monkeypatch.delenv("MODEL_VERSION", raising=False)
+    add_version(model_dir, "v20990101-000000")
+    registry = ModelRegistry(model_dir)
+    other = ModelRegistry(model_dir)
+    registry.reload()
+    other.reload()
+    registry.promote("v20990101-000000")
+    assert (model_dir / ACTIVE_FILE).read_text().strip() == "v20990101-000000"
+    assert registry.stats()["shadow"] is None
+    assert other.reload().name == "v20990101-000000"
+
+
+def test_model_version_env_selects_the_version(model_dir, monkeypatch):
+    add_version(model_dir, "v20990101-000000")
+    add_version(model_dir, "v20990201-000000")
+    monkeypatch.setenv("MODEL_VERSION", "v20990101-000000")
+    assert ModelRegistry(model_dir).active().name == "v20990101-000000"
+
+
+def test_shadow_compares_against_the_active_version(model_dir, monkeypatch):
+    monkeypatch.delenv("MODEL_VERSION", raising=False)
+    registry = ModelRegistry(model_dir)
+    active = registry.active()
+    add_version(model_dir, "v20990101-000000")
+    registry.set_shadow("v20990101-000000")
+    X = active.bundle.encode([{'region': 'Dakar', 'departement': 'Dakar', 'weather': 'clear sky',
+                               'temperature': 28.0, 'wind_speed': 4.0, 'date': '2025-06-15 14:00:00'}])
+    registry.shadow_score(X, active.predict(X))
+    registry._shadow_executor.shutdown(wait=True)
+    comparison = registry.stats()["shadow_comparison"]
+    assert comparison["rows"] == 1
+    # Même modèle copié : aucun écart
+    assert comparison["mean_abs_diff"] == 0
+
+
+def test_unknown_engine_is_rejected(model_dir):
+    with pytest.raises(ValueError):
+        ModelRegistry(model_dir, engine="gpu")
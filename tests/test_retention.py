@@ -0,0 +1,43 @@
+"""Rétention des notifications : archivage et export, dates de coupure en UTC"""
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+from app.core.retention import _utc, archive_notifications, export_archive
+from app.models.notifications import Notification, NotificationArchive
+
+DAKAR_SUMMER = timezone(timedelta(hours=2))
+
+
+def add(db, created_at: datetime, status: str = "sent"):
+    db.add(Notification(message="m", recipient="+221770000000", status=status, created_at=created_at))
+    db.commit()
+
+
+def test_utc_normalizes_naive_and_aware_dates():
+    naive = datetime(2025, 3, 1, 12)
+    assert _utc(naive) == datetime(2025, 3, 1, 12, tzinfo=timezone.utc)
+    assert _utc(datetime(2025, 3, 1, 14, tzinfo=DAKAR_SUMMER)).hour == 12
+    assert _utc(naive).tzinfo is timezone.utc
+
+
+def test_archive_cutoff_is_the_same_instant_whatever_its_timezone(db):
+    add(db, datetime(2025, 3, 1, 11, 30))
+    add(db, datetime(2025, 3, 1, 12, 30))
+    add(db, datetime(2025, 3, 1, 10), status="pending")
+    # 14:00 à UTC+2 = 12:00 UTC : seule la notification terminée de 11:30 UTC est archivée
+    assert archive_notifications(db, datetime(2025, 3, 1, 14, tzinfo=DAKAR_SUMMER), chunk_size=1) == 1
+    assert archive_notifications(db, datetime(2025, 3, 1, 12)) == 0
+    assert db.query(NotificationArchive).count() == 1
+    assert {n.status for n in db.query(Notification)} == {"sent", "pending"}
+
+
+def test_export_writes_only_complete_months(db, tmp_path):
+    for created_at in (datetime(2025, 1, 5), datetime(2025, 1, 31, 23), datetime(2025, 2, 10)):
+        add(db, created_at)
+    archive_notifications(db, datetime(2025, 3, 1, tzinfo=timezone.utc))
+    files = export_archive(db, datetime(2025, 2, 15, tzinfo=timezone.utc), tmp_path)
+    assert [(f["file"].rsplit("/", 1)[1], f["rows"]) for f in files] == [("notifications-2025-01.ndjson.gz", 2)]
+    with gzip.open(files[0]["file"], "rt") as f:
+        assert [json.loads(line)["created_at"][:10] for line in f] == ["2025-01-05", "2025-01-31"]
+    assert db.query(NotificationArchive).count() == 1
@@ -0,0 +1,80 @@
+"""Relevés observés et watermark du réentraînement incrémental : il avance à chaque tentative, promue ou non"""
+import shutil
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import func, select
+
+from app.core.observations import record_observations
+from app.ml import retrain, tree_engine
+from app.ml.predictor import MODEL_DIR
+from app.ml.registry import BASE_VERSION, ModelRegistry
+from app.models.observations import WeatherObservation
+from app.models.retrain_state import RetrainState
+
+ROWS = 250
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.delenv("MODEL_VERSION", raising=False)
+    for name in ("manifest.json", "best_humidity_model.ubj"):
+        shutil.copy(MODEL_DIR / name, tmp_path / name)
+    return ModelRegistry(tmp_path)
+
+
+def add_observations(db, encoders, n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    start = datetime(2025, 1, 1) + timedelta(days=seed)
+    for i, row in enumerate(tree_engine.sample_rows(encoders, n, seed=seed)):
+        db.add(WeatherObservation(
+            region=row["region"], departement=row["departement"], weather=row["weather"],
+            temperature=row["temperature"], wind_speed=row["wind_speed"],
+            humidity=float(rng.uniform(20, 100)), observed_at=start + timedelta(minutes=i),
+        ))
+    db.commit()
+
+
+def test_same_reading_is_stored_once(db):
+    reading = {
+        "region": "Dakar", "departement": "Dakar", "weather": "clear sky", "temperature": 28.0,
+        "wind_speed": 4.0, "observed_humidity": 70, "observed_at": 1735689600,
+    }
+    record_observations(db, [reading, {**reading, "observed_humidity": None}])
+    record_observations(db, [reading])
+    assert db.scalar(select(func.count()).select_from(WeatherObservation)) == 1
+
+
+def test_rejected_candidate_advances_the_watermark(db, registry):
+    encoders = registry.active().bundle.encoders
+    add_observations(db, encoders, ROWS, seed=1)
+
+    # Tolérance négative : le candidat est toujours rejeté
+    result = retrain.retrain(registry, db, min_rows=100, rounds=2, tolerance=-1)
+    assert result["status"] == "rejected"
+    assert registry.active().name == BASE_VERSION
+    state = db.get(RetrainState, BASE_VERSION)
+    assert state.status == "rejected"
+    assert state.watermark == result["train_rows"]
+    watermark = state.watermark
+
+    # Seuls les relevés d'évaluation restent après le watermark, pas toute la fenêtre rejetée
+    result = retrain.retrain(registry, db, min_rows=100, rounds=2, tolerance=-1)
+    assert result == {"status": "skipped", "version": BASE_VERSION, "rows": ROWS - watermark}
+
+    add_observations(db, encoders, ROWS, seed=2)
+    result = retrain.retrain(registry, db, min_rows=100, rounds=2, tolerance=-1)
+    assert result["train_rows"] + result["eval_rows"] == 2 * ROWS - watermark
+
+
+def test_promoted_version_starts_from_its_own_watermark(db, registry):
+    add_observations(db, registry.active().bundle.encoders, ROWS, seed=1)
+    result = retrain.retrain(registry, db, min_rows=100, rounds=2, tolerance=float("inf"))
+    assert result["status"] == "promoted"
+    promoted = registry.active()
+    assert promoted.name == result["version"]
+    assert promoted.bundle.metadata[retrain.WATERMARK_KEY] == result["train_rows"]
+    assert db.get(RetrainState, BASE_VERSION).status == "promoted"
+    result = retrain.retrain(registry, db, min_rows=1, rounds=2)
+    assert result["train_rows"] + result["eval_rows"] == ROWS - promoted.bundle.metadata[retrain.WATERMARK_KEY]
@@ -0,0 +1,71 @@
+"""Cycle de surveillance de tous les départements (check_humidity_periodically)"""
+import time
+
+import pytest
+
+from app.core import scheduler
+from app.core.alerts import get_alert_tracker
+from app.core.locations import get_monitored_locations
+from app.ml import weather
+from app.ml.weather import WeatherClient
+from app.models.notifications import Notification
+from app.models.predictions import HumidityPrediction
+from benchmarks.fakes import fake_openweather
+
+
+@pytest.fixture
+def environment(db, openweather, monkeypatch):
+    monkeypatch.setenv("OPENWEATHER_API_KEY", "test")
+    monkeypatch.setenv("ALERT_PHONE", "+221770000000")
+    monkeypatch.setattr(weather, "_client", WeatherClient(base_url=openweather.url, max_retries=0))
+    get_alert_tracker().invalidate()
+    yield openweather
+    get_alert_tracker().invalidate()
+
+
+def test_weather_is_fetched_in_parallel(monkeypatch):
+    locations = get_monitored_locations()[:20]
+    with fake_openweather(0.1) as server:
+        monkeypatch.setattr(weather, "_client", WeatherClient(base_url=server.url, max_retries=0))
+        start = time.perf_counter()
+        rows = scheduler.fetch_all_weather("test", locations)
+        elapsed = time.perf_counter() - start
+    assert [row["departement"] for row in rows] == [location["departement"] for location in locations]
+    assert server.calls == 20
+    # Séquentiel : 20 x 0,1 s
+    assert elapsed < 1.0
+
+
+def test_unavailable_locations_are_dropped(monkeypatch):
+    monkeypatch.setattr(weather, "_client", WeatherClient(base_url="http://127.0.0.1:9", max_retries=0))
+    assert scheduler.fetch_all_weather("test", get_monitored_locations()[:3]) == []
+
+
+def test_cycle_scores_every_location_in_one_batch(environment, db):
+    locations = get_monitored_locations()
+    report = {}
+    result = scheduler.check_humidity_periodically(report)
+    assert result in ("ok", "alert")
+    assert report["weather_rows"] == report["locations"] == len(locations)
+    assert set(report["stages"]) == {"weather", "observations", "predict", "history", "alerts"}
+    assert environment.calls == len(locations)
+    assert db.query(HumidityPrediction).count() == len(locations)
+    assert db.query(Notification).count() == report["sms"]
+
+    # Même météo au cycle suivant : aucune transition, aucun SMS de plus
+    again = {}
+    scheduler.check_humidity_periodically(again)
+    assert again["transitions"] == again["sms"] == 0
+    assert db.query(Notification).count() == report["sms"]
+
+
+def test_cycle_without_weather_is_an_error(environment, monkeypatch):
+    monkeypatch.setattr(weather, "_client", WeatherClient(base_url="http://127.0.0.1:9", max_retries=0))
+    report = {}
+    assert scheduler.check_humidity_periodically(report) == "error"
+    assert report["weather_rows"] == 0
+
+
+def test_cycle_is_skipped_without_configuration(monkeypatch):
+    monkeypatch.delenv("ALERT_PHONE", raising=False)
+    assert scheduler.check_humidity_periodically() == "skipped"
@@ -0,0 +1,54 @@
+"""Entraînement des candidats et publication d'une version (app/ml/train.py)"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ml import train
+from app.ml.artifacts import load_bundle
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 300
+    weather = list(train.WEATHER_ORDER)
+    df = pd.DataFrame({
+        "region": rng.choice(["Dakar", "Thies", "Saint-Louis"], n),
+        "departement": rng.choice(["Dakar", "Mbour", "Podor", "Rufisque"], n),
+        "weather": rng.choice(weather, n),
+        "temperature": rng.uniform(20, 40, n).round(1),
+        "wind_speed": rng.uniform(0, 12, n).round(1),
+        "date": pd.date_range("2024-01-01", periods=n, freq="h").astype(str),
+    })
+    df["humidity"] = (90 - 1.5 * df["temperature"] + rng.normal(0, 2, n)).round(1)
+    path = tmp_path / "meteo.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_prepared_data_is_read_back_from_the_cache(csv_path, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    first = train.load_dataset(csv_path, cache_dir)
+    assert len(list(cache_dir.glob("features-*.npz"))) == 1
+
+    def no_preprocess(path):
+        raise AssertionError("le CSV ne doit pas être relu")
+
+    monkeypatch.setattr(train, "preprocess", no_preprocess)
+    cached = train.load_dataset(csv_path, cache_dir)
+    for key in ("X_train", "X_test", "y_train", "y_test", "scaler_mean", "scaler_scale"):
+        np.testing.assert_array_equal(cached[key], first[key])
+    assert cached["encoders"] == first["encoders"]
+
+
+def test_saved_version_predicts_like_the_fitted_model(csv_path, tmp_path):
+    data = train.load_dataset(csv_path)
+    results = train.fit_candidates(data, ["Linear Regression", "Decision Tree"], jobs=1, threads_per_model=1)
+    assert {r["name"] for r in results} == {"Linear Regression", "Decision Tree"}
+    best = min(results, key=lambda r: r["metrics"]["RMSE"])
+
+    version_dir = train.save_version(best, results, data, tmp_path / "models", "v-test")
+    bundle = load_bundle(version_dir)
+    assert bundle.metadata["model_name"] == best["name"]
+    assert bundle.metadata["data_hash"] == data["data_hash"]
+    assert (version_dir / "model_summary.txt").exists()
@@ -0,0 +1,57 @@
+"""Parité du moteur numpy (INFERENCE_ENGINE=numpy) avec XGBoost"""
+import numpy as np
+import pytest
+
+from app.ml import tree_engine
+from app.ml.predictor import MODEL_DIR
+from app.ml.registry import ModelRegistry
+
+TOLERANCE = 1e-3
+
+
+@pytest.fixture(scope="module")
+def versions():
+    return {engine: ModelRegistry(MODEL_DIR, engine=engine).active() for engine in tree_engine.ENGINES}
+
+
+@pytest.fixture(scope="module")
+def rows(versions):
+    return tree_engine.sample_rows(versions["xgboost"].bundle.encoders, 300, seed=42)
+
+
+def test_numpy_engine_is_attached(versions):
+    assert versions["numpy"].bundle.tree_engine is not None
+    assert versions["xgboost"].bundle.tree_engine is None
+
+
+def test_numpy_engine_matches_xgboost_row_by_row(versions, rows):
+    X = versions["xgboost"].bundle.encode(rows)
+    expected = versions["xgboost"].predict(X)
+    # Une ligne par appel : chemin servi par les arbres aplatis (len(X) <= block_rows)
+    actual = np.array([versions["numpy"].predict(X[i:i + 1])[0] for i in range(len(X))])
+    np.testing.assert_allclose(actual, expected, atol=TOLERANCE)
+
+
+def test_numpy_engine_matches_xgboost_with_missing_values(versions, rows):
+    bundle = versions["xgboost"].bundle
+    X = tree_engine.parity_sample(bundle.prepare(bundle.encode(rows)), seed=7)
+    assert np.isnan(X).any()
+    expected = bundle.booster.inplace_predict(X)
+    np.testing.assert_allclose(versions["numpy"].bundle.tree_engine.predict(X), expected, atol=TOLERANCE)
+
+
+def comb_tree(depth: int) -> dict:
+    """Arbre en peigne : splits 0..depth-1 enchaînés à gauche, feuilles depth..2*depth"""
+    left = [i + 1 if i + 1 < depth else 2 * depth for i in range(depth)] + [-1] * (depth + 1)
+    right = [depth + i for i in range(depth)] + [-1] * (depth + 1)
+    return {"left_children": left, "right_children": right}
+
+
+def test_depth_follows_both_children():
+    tree = comb_tree(3)
+    assert tree_engine._depth(tree["left_children"], tree["right_children"]) == 3
+
+
+def test_too_deep_trees_are_rejected():
+    with pytest.raises(ValueError):
+        tree_engine.TreeEnsemble([comb_tree(tree_engine.MAX_DEPTH + 1)], base_score=0.0, num_feature=1)
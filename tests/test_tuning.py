@@ -0,0 +1,54 @@
+"""Recherche d'hyperparamètres par successive halving (app/ml/tuning.py)"""
+import time
+
+import numpy as np
+import pytest
+
+from app.ml import tuning
+
+
+@pytest.fixture(scope="module")
+def validation():
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 1, size=(400, 5)).astype(np.float32)
+    y = (60 + 30 * X[:, 0] - 20 * X[:, 1] + rng.normal(0, 2, 400)).astype(np.float32)
+    return tuning.split_validation({"X_train": X, "y_train": y})
+
+
+def runner(validation, log_path=None, budget: float = 300) -> tuning.TrialRunner:
+    return tuning.TrialRunner(validation, jobs=1, threads=1, log_path=log_path, deadline=time.monotonic() + budget)
+
+
+def test_each_rung_keeps_the_best_third_with_more_trees(validation, tmp_path):
+    log = tmp_path / "tuning.jsonl"
+    rungs = tuning.successive_halving(runner(validation, log), "XGBoost", 9, "data")
+    assert [len(rung) for rung in rungs] == [9, 3, 1]
+    assert [rung[0]["resource"] for rung in rungs] == [50, 150, 450]
+    for previous, rung in zip(rungs, rungs[1:]):
+        best = [r["params"] for r in previous[:len(rung)]]
+        assert sorted(map(str, best)) == sorted(str(r["params"]) for r in rung)
+    assert all(rung == sorted(rung, key=lambda r: r["rmse"]) for rung in rungs)
+    assert len(log.read_text().splitlines()) == 13
+
+
+def test_interrupted_search_resumes_from_the_log(validation, tmp_path):
+    log = tmp_path / "tuning.jsonl"
+    first = tuning.successive_halving(runner(validation, log), "XGBoost", 9, "data")
+    again = runner(validation, log)
+    assert tuning.successive_halving(again, "XGBoost", 9, "data") == first
+    assert again.reused == 13
+    assert len(log.read_text().splitlines()) == 13
+
+
+def test_no_trial_starts_after_the_deadline(validation):
+    assert tuning.successive_halving(runner(validation, budget=0), "XGBoost", 9, "data") == []
+
+
+def test_select_best_respects_the_latency_limit():
+    fast = {"rmse": 3.0, "latency_single_ms": 0.1}
+    slow = {"rmse": 2.0, "latency_single_ms": 5.0}
+    rungs = [[slow, fast], [slow]]
+    assert tuning.select_best(rungs) is slow
+    # Aucun essai du dernier tour n'est assez rapide : on remonte au tour précédent
+    assert tuning.select_best(rungs, max_latency_ms=1) is fast
+    assert tuning.select_best(rungs, max_latency_ms=0.01) is None
@@ -0,0 +1,52 @@
+import pytest
+
+from app.ml.weather import WeatherClient
+
+DAKAR = {'region': 'Dakar', 'departement': 'Dakar'}
+
+
+def make_client(url: str) -> WeatherClient:
+    return WeatherClient(api_key="test", base_url=url, max_retries=0, ttl=600, stale_ttl=3600)
+
+
+def test_fresh_entry_served_from_cache(openweather):
+    client = make_client(openweather.url)
+    first = client.current(DAKAR)
+    assert client.current(DAKAR) == first
+    assert openweather.calls == 1
+    assert client.stats()["hits"] == 1
+
+
+def test_max_age_zero_always_calls_upstream(openweather):
+    client = make_client(openweather.url)
+    client.current(DAKAR)
+    client.current(DAKAR, max_age=0)
+    client.current(DAKAR, max_age=0)
+    assert openweather.calls == 3
+    assert client.stats()["stale_served"] == 0
+
+
+def test_expired_entry_is_refetched_not_served_stale(openweather):
+    client = make_client(openweather.url)
+    client.current(DAKAR)
+    key = client._location_key(DAKAR)
+    fetched_at, weather = client._cache[key]
+    client._cache[key] = (fetched_at - 1200, weather)
+    client.current(DAKAR)
+    assert openweather.calls == 2
+    assert client.stats()["stale_served"] == 0
+
+
+def test_stale_entry_served_only_when_upstream_fails(openweather):
+    client = make_client(openweather.url)
+    cached = client.current(DAKAR)
+    client.base_url = "http://127.0.0.1:9"
+    assert client.current(DAKAR, max_age=0) == cached
+    assert client.stats()["stale_served"] == 1
+    assert client.stats()["upstream_errors"] == 1
+
+
+def test_unreachable_upstream_without_cache_raises():
+    client = make_client("http://127.0.0.1:9")
+    with pytest.raises(Exception, match="OpenWeather"):
+        client.current(DAKAR)